@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of docktors against a fake docker engine, see ``python -m benchmarks.run --help``.
+"""
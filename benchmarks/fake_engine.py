@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Fake docker engine module.
+
+This module is design to serve a stand-in of the Docker Engine API on a unix socket, so docktors can be benchmarked
+without a docker daemon. Only the endpoints used to run, wait for, inspect and stop a container are implemented.
+
+The containers don't run anything : their published ports are opened on the host after ``port_delay`` seconds and
+their ``log_lines`` are written after ``log_delay`` seconds. Each request is answered after ``latency`` seconds.
+"""
+import binascii
+import json
+import os
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn, UnixStreamServer
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+    from urlparse import parse_qs, urlparse
+
+API_VERSION = '1.41'
+
+# Stream type of the multiplexed logs frames
+STDOUT_STREAM = 1
+
+_VERSION_PREFIX = re.compile(r'^/v[0-9.]+')
+
+
+class FakeContainer(object):
+    """
+    Container of the fake engine.
+    """
+
+    def __init__(self, engine, config, name=None):
+        self.id = binascii.hexlify(os.urandom(32)).decode('ascii')
+        self.name = name or 'fake_%s' % self.id[:12]
+        self.config = config
+        self.status = 'created'
+        self.created = time.time()
+        self.logs = []
+        self.events = []
+        self.host_ports = dict()
+        self.changed = threading.Condition()
+        self._engine = engine
+        self._sockets = []
+
+    def start(self):
+        """Start the container : its ports are bound, listening after the port delay, and its logs are scheduled."""
+        bindings = (self.config.get('HostConfig') or {}).get('PortBindings') or {}
+        for port, binding in bindings.items():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('127.0.0.1', int((binding or [{}])[0].get('HostPort') or 0)))
+            self._sockets.append(sock)
+            self.host_ports[port] = sock.getsockname()[1]
+        with self.changed:
+            self.status = 'running'
+            self._event('start')
+        self._later(self._engine.port_delay, self._listen)
+        self._later(self._engine.log_delay, self._write_logs)
+
+    def stop(self, action='die'):
+        """Stop the container and close its ports."""
+        for sock in self._sockets:
+            sock.close()
+        with self.changed:
+            if self.status == 'running':
+                self.status = 'exited'
+                self._event(action)
+
+    def remove(self):
+        """Remove the container, ending its streams."""
+        self.stop()
+        with self.changed:
+            self.status = 'removed'
+            self.changed.notify_all()
+
+    def inspect(self):
+        """:return: the container attributes"""
+        ports = dict(
+            (port, [dict(HostIp='0.0.0.0', HostPort=str(host_port))]) for port, host_port in self.host_ports.items()
+        )
+        return dict(
+            Id=self.id,
+            Name='/' + self.name,
+            Image='sha256:' + self.id,
+            Created=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.created)),
+            State=dict(Status=self.status, Running=self.status == 'running', ExitCode=0),
+            Config=dict(Image=self.config.get('Image'), Labels=self.config.get('Labels') or {}, Tty=False),
+            HostConfig=dict(LogConfig=dict(Type='json-file')),
+            NetworkSettings=dict(IPAddress='127.0.0.1', Ports=ports),
+        )
+
+    def _event(self, action):
+        self.events.append(dict(
+            Type='container', Action=action, status=action, id=self.id, time=int(time.time()),
+            Actor=dict(ID=self.id, Attributes=dict(exitCode='0') if action == 'die' else dict())
+        ))
+        self.changed.notify_all()
+
+    def _listen(self):
+        for sock in self._sockets:
+            try:
+                sock.listen(128)
+            except socket.error:
+                pass  # Closed in the meantime
+
+    def _write_logs(self):
+        with self.changed:
+            self.logs.extend(line.encode('utf-8') + b'\n' for line in self._engine.log_lines)
+            self.changed.notify_all()
+
+    @staticmethod
+    def _later(delay, func):
+        if not delay:
+            func()
+            return
+        timer = threading.Timer(delay, func)
+        timer.daemon = True
+        timer.start()
+
+
+class FakeEngine(ThreadingMixIn, UnixStreamServer):
+    """
+    Fake docker engine, serving the API on a unix socket from a background thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, path, latency=0.0, log_lines=('ready',), log_delay=0.0, port_delay=0.0):
+        """
+        Class constructor for the engine.
+
+        :param path: the path of the unix socket
+        :param latency: the delay in seconds before answering each request
+        :param log_lines: the lines written in the logs of each started container
+        :param log_delay: the delay in seconds after the start before writing the logs
+        :param port_delay: the delay in seconds after the start before the published ports accept connections
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        UnixStreamServer.__init__(self, path, _EngineHandler)
+        self.path = path
+        self.latency = latency
+        self.log_lines = list(log_lines)
+        self.log_delay = log_delay
+        self.port_delay = port_delay
+        self.containers = dict()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], socket.error):
+            UnixStreamServer.handle_error(self, request, client_address)
+
+    @property
+    def base_url(self):
+        """:return: the url to give as ``DOCKER_HOST``"""
+        return 'unix://' + self.path
+
+    def start(self):
+        """
+        Serve the API in a background thread.
+
+        :return: the engine itself
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-docker-engine')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving the API, remove all the containers and the socket.
+        """
+        self.shutdown()
+        self.server_close()
+        for container in list(self.containers.values()):
+            container.remove()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def create(self, config, name=None):
+        """:return: a new container"""
+        container = FakeContainer(self, config, name=name)
+        with self._lock:
+            self.containers[container.id] = container
+        return container
+
+    def get(self, container_id):
+        """:return: the container by id, prefix or name, None when it is not found"""
+        if not container_id:
+            return None
+        with self._lock:
+            for container in self.containers.values():
+                if container.id.startswith(container_id) or container.name == container_id.lstrip('/'):
+                    return container
+        return None
+
+    def delete(self, container):
+        """Remove a container."""
+        with self._lock:
+            self.containers.pop(container.id, None)
+        container.remove()
+
+
+class _EngineHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake engine"""
+    protocol_version = 'HTTP/1.1'
+
+    routes = [
+        ('GET', re.compile(r'^/_ping$'), '_ping'),
+        ('GET', re.compile(r'^/version$'), '_version'),
+        ('GET', re.compile(r'^/events$'), '_events'),
+        ('GET', re.compile(r'^/containers/json$'), '_list'),
+        ('POST', re.compile(r'^/containers/create$'), '_create'),
+        ('POST', re.compile(r'^/containers/(?P<cid>[^/]+)/start$'), '_start'),
+        ('POST', re.compile(r'^/containers/(?P<cid>[^/]+)/(?:stop|kill)$'), '_stop'),
+        ('POST', re.compile(r'^/containers/(?P<cid>[^/]+)/rename$'), '_no_content'),
+        ('GET', re.compile(r'^/containers/(?P<cid>[^/]+)/json$'), '_inspect'),
+        ('GET', re.compile(r'^/containers/(?P<cid>[^/]+)/logs$'), '_logs'),
+        ('DELETE', re.compile(r'^/containers/(?P<cid>[^/]+)$'), '_delete'),
+    ]
+
+    def do_GET(self):  # pylint: disable=locally-disabled, invalid-name
+        self._dispatch('GET')
+
+    def do_POST(self):  # pylint: disable=locally-disabled, invalid-name
+        self._dispatch('POST')
+
+    def do_DELETE(self):  # pylint: disable=locally-disabled, invalid-name
+        self._dispatch('DELETE')
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self, method):
+        engine = self.server
+        with engine._lock:  # pylint: disable=locally-disabled, protected-access
+            engine.requests += 1
+        if engine.latency:
+            time.sleep(engine.latency)
+        url = urlparse(self.path)
+        path, query = _VERSION_PREFIX.sub('', url.path), parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8')) if length else None
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                container = None
+                if 'cid' in match.groupdict():
+                    container = engine.get(match.group('cid'))
+                    if container is None:
+                        return self._json(404, dict(message='No such container: %s' % match.group('cid')))
+                return getattr(self, handler)(container=container, query=query, body=body)
+        return self._json(404, dict(message='page not found'))
+
+    def _ping(self, **_):
+        self._send(200, b'OK', 'text/plain')
+
+    def _version(self, **_):
+        self._json(200, dict(ApiVersion=API_VERSION, MinAPIVersion='1.12', Version='20.10.0-fake'))
+
+    def _list(self, **_):
+        self._json(200, [])
+
+    def _create(self, query, body, **_):
+        container = self.server.create(body or {}, name=(query.get('name') or [None])[0])
+        self._json(201, dict(Id=container.id, Warnings=[]))
+
+    def _start(self, container, **_):
+        container.start()
+        self._no_content()
+
+    def _stop(self, container, **_):
+        container.stop()
+        self._no_content()
+
+    def _delete(self, container, **_):
+        self.server.delete(container)
+        self._no_content()
+
+    def _inspect(self, container, **_):
+        self._json(200, container.inspect())
+
+    def _logs(self, container, query, **_):
+        follow = query.get('follow', ['0'])[0] in ('1', 'true', 'True')
+        self._start_chunks('application/vnd.docker.raw-stream')
+        position = 0
+        while True:
+            with container.changed:
+                if not follow or container.status != 'running':
+                    # Send the logs already written and end the stream
+                    follow = False
+                elif position == len(container.logs):
+                    container.changed.wait(1)
+                lines = container.logs[position:]
+            position += len(lines)
+            for line in lines:
+                if not self._chunk(struct.pack('>BxxxL', STDOUT_STREAM, len(line)) + line):
+                    return
+            if not follow:
+                break
+        self._end_chunks()
+
+    def _events(self, query, **_):
+        filters = json.loads((query.get('filters') or ['{}'])[0])
+        container = self.server.get((filters.get('container') or [''])[0])
+        self._start_chunks('application/json')
+        if container is None:
+            return self._end_chunks()
+        position = 0
+        while True:
+            with container.changed:
+                if position == len(container.events) and container.status != 'removed':
+                    container.changed.wait(1)
+                events, removed = container.events[position:], container.status == 'removed'
+            position += len(events)
+            for event in events:
+                if not self._chunk(json.dumps(event).encode('utf-8') + b'\n'):
+                    return
+            if removed:
+                break
+        self._end_chunks()
+
+    def _no_content(self, **_):
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _json(self, status, data):
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_chunks(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+
+    def _chunk(self, data):
+        try:
+            self.wfile.write(('%x\r\n' % len(data)).encode('ascii') + data + b'\r\n')
+            self.wfile.flush()
+        except socket.error:
+            # The client has closed the stream
+            self.close_connection = True
+            return False
+        return True
+
+    def _end_chunks(self):
+        try:
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except socket.error:
+            self.close_connection = True
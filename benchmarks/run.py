@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks runner.
+
+This module measures docktors against a :class:`benchmarks.fake_engine.FakeEngine` and writes the results as JSON :
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --output results.json --baseline previous.json --threshold 0.25
+
+With a baseline, the exit status is 1 when a benchmark is slower than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import docker
+
+from docktors.client import close_clients
+from docktors.core import DecWrapper, decorated
+from docktors.metrics import MetricsHook, add_hook, remove_hook
+from docktors.reaper import flush_reaper
+from docktors.wdocker import DockerContainer
+
+from .fake_engine import FakeEngine
+
+# Image name given to the containers of the fake engine
+IMAGE = 'docktors-benchmark'
+
+
+class _NoopWrapper(DecWrapper):
+    """Wrapper doing nothing, to measure the cost of the decorator itself"""
+
+    def __init__(self):
+        super(_NoopWrapper, self).__init__(name='noop', inputs=dict(), props=dict())
+
+    def start(self):
+        pass
+
+    def get_args(self):
+        return []
+
+    def shutdown(self):
+        pass
+
+
+class _SpanCollector(MetricsHook):
+    """Hook keeping the durations of the spans by phase"""
+
+    def __init__(self):
+        self.durations = dict()
+        self._lock = threading.Lock()
+
+    def on_span(self, span):
+        with self._lock:
+            self.durations.setdefault(span.name, []).append(span.duration)
+
+
+def _stats(durations, unit=1000.0):
+    ordered = sorted(durations)
+    return dict(
+        value=ordered[len(ordered) // 2] * unit,
+        mean=sum(ordered) / len(ordered) * unit,
+        p95=ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * unit,
+        min=ordered[0] * unit,
+        max=ordered[-1] * unit,
+        samples=len(ordered),
+    )
+
+
+def _timed_calls(func, iterations):
+    durations = []
+    for _ in range(iterations):
+        begin = time.time()
+        func()
+        durations.append(time.time() - begin)
+    return durations
+
+
+def bench_decorator_overhead(iterations):
+    """Time added to each call by the decorator, without any container."""
+
+    def noop():
+        pass
+
+    wrapped = decorated(_NoopWrapper(), noop)
+    count = iterations * 100
+    begin = time.time()
+    for _ in range(count):
+        noop()
+    bare = time.time() - begin
+    begin = time.time()
+    for _ in range(count):
+        wrapped()
+    total = time.time() - begin
+    return dict(unit='us', better='lower', value=max(total - bare, 0.0) / count * 1e6, samples=count)
+
+
+def bench_keep_alive_call(iterations):
+    """Latency of a call reusing a kept alive container."""
+    wrapper = DockerContainer(image=IMAGE, keep_alive=True)
+    wrapped = decorated(wrapper, lambda: None)
+    wrapped()
+    result = dict(unit='ms', better='lower', **_stats(_timed_calls(wrapped, iterations)))
+    # The kept alive container must be stopped while the fake engine is running
+    wrapper._shutdown_at_exit()  # pylint: disable=locally-disabled, protected-access
+    return result
+
+
+def bench_start_shutdown(iterations):
+    """Latency of a call starting, then stopping and removing, a container without readiness wait."""
+    wrapped = decorated(DockerContainer(image=IMAGE, background_shutdown=False), lambda: None)
+    return dict(unit='ms', better='lower', **_stats(_timed_calls(wrapped, iterations)))
+
+
+def bench_readiness_wait(engine, iterations, delay):
+    """Time between the opening of the port, or the writing of the logs, and the end of the readiness wait."""
+    collector = add_hook(_SpanCollector())
+    engine.port_delay = engine.log_delay = delay
+    try:
+        for options in (dict(publish_ports=80, wait_for_port=80), dict(wait_for_log='ready')):
+            wrapped = decorated(DockerContainer(image=IMAGE, **options), lambda: None)
+            _timed_calls(wrapped, iterations)
+    finally:
+        engine.port_delay = engine.log_delay = 0.0
+        remove_hook(collector)
+    flush_reaper()
+    lags = [max(d - delay, 0.0) for name in ('wait.tcp:80', 'wait.log') for d in collector.durations.get(name, [])]
+    return dict(unit='ms', better='lower', delay=delay * 1000.0, **_stats(lags))
+
+
+def bench_throughput(callers, iterations):
+    """Calls per second, each call starting and stopping a container, made by concurrent callers."""
+    wrapped = decorated(DockerContainer(image=IMAGE), lambda: None)
+    errors = []
+
+    def caller():
+        try:
+            for _ in range(iterations):
+                wrapped()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            errors.append(ex)
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    begin = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    flush_reaper()
+    elapsed = time.time() - begin
+    if errors:
+        raise errors[0]
+    return dict(unit='calls/s', better='higher', value=callers * iterations / elapsed, callers=callers,
+                samples=callers * iterations)
+
+
+def run_benchmarks(iterations=20, callers=8, latency=0.0, delay=0.1):
+    """
+    Run all the benchmarks against a fake docker engine.
+
+    :param iterations: the number of measured calls by benchmark (and by caller for the throughput)
+    :param callers: the number of concurrent callers for the throughput
+    :param latency: the latency in seconds of each request to the fake engine
+    :param delay: the delay in seconds before the ports are opened and the logs written for the readiness wait
+    :return: the results as a dict
+    """
+    directory = tempfile.mkdtemp(prefix='docktors-bench-')
+    engine = FakeEngine(os.path.join(directory, 'docker.sock'), latency=latency).start()
+    previous_host = os.environ.get('DOCKER_HOST')
+    os.environ['DOCKER_HOST'] = engine.base_url
+    try:
+        benchmarks = dict(
+            decorator_overhead=bench_decorator_overhead(iterations),
+            keep_alive_call=bench_keep_alive_call(iterations),
+            start_shutdown=bench_start_shutdown(iterations),
+            readiness_wait=bench_readiness_wait(engine, iterations, delay),
+            throughput=bench_throughput(callers, iterations),
+        )
+        requests = engine.requests
+    finally:
+        if previous_host is None:
+            del os.environ['DOCKER_HOST']
+        else:
+            os.environ['DOCKER_HOST'] = previous_host
+        close_clients()
+        engine.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+    return dict(
+        meta=dict(
+            timestamp=time.time(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            docker_sdk=docker.__version__,
+            config=dict(iterations=iterations, callers=callers, latency=latency, delay=delay),
+            engine_requests=requests,
+        ),
+        benchmarks=benchmarks,
+    )
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline.
+
+    :param results: the results of run_benchmarks()
+    :param baseline: the results of a previous run
+    :param threshold: the accepted slowdown ratio, 0.25 accepting benchmarks 25% slower than the baseline
+    :return: the list of regression messages
+    """
+    regressions = []
+    for name, result in sorted(results['benchmarks'].items()):
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or not previous.get('value') or not result.get('value'):
+            continue
+        ratio = result['value'] / previous['value']
+        slowdown = ratio - 1 if result['better'] == 'lower' else 1 / ratio - 1
+        if slowdown > threshold:
+            regressions.append('%s : %.3f %s instead of %.3f %s (%+.0f%%)' % (
+                name, result['value'], result['unit'], previous['value'], previous['unit'], slowdown * 100
+            ))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command line entry point running the benchmarks.
+
+    :param argv: the command line arguments (default: ``sys.argv[1:]``)
+    :return: the exit status
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmark docktors')
+    parser.add_argument('--output', help='file where to write the JSON results (default: standard output)')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25, help='accepted slowdown ratio (default: 0.25)')
+    parser.add_argument('--iterations', type=int, default=20, help='measured calls by benchmark (default: 20)')
+    parser.add_argument('--callers', type=int, default=8, help='concurrent callers (default: 8)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before each API response (default: 0)')
+    parser.add_argument('--delay', type=float, default=0.1,
+                        help='seconds before the ports and logs are available (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(iterations=args.iterations, callers=args.callers, latency=args.latency,
+                             delay=args.delay)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            sys.stderr.write('Regression of %s\n' % regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
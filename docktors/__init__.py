@@ -2,4 +2,4 @@
 """
 Docktors modules.
 """
-from .decorators import docker  # NOQA
+from .decorators import docker, docker_group  # NOQA
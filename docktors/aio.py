@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio module.
+
+This module is design to decorate coroutine functions. It requires Python 3.7+, for ``contextvars`` and
+``asyncio.get_running_loop()``, and is only imported when a coroutine function is decorated.
+
+The docker SDK being synchronous, its calls are made in the default executor. The readiness waits don't hold any
+thread : the port is probed with asyncio connections and the captured logs are polled. Only the docker events of the
+container are followed in a thread, so the waits stop as soon as the container dies.
+"""
+import asyncio
+import errno
+import functools
+import logging
+import sys
+import time
+from collections import OrderedDict
+from errno import errorcode
+
+from .core import contextvars
+from .logs import LogMatcher
+from .metrics import record, span
+from .readiness import ContainerWatcher, backoff_delay
+from .wdocker import DockerContainerError, UNSUPPORTED_SOCKET_ERRORS
+
+if sys.version_info < (3, 7):
+    raise ImportError('[docktors] : Decorating a coroutine function requires Python 3.7+')
+
+logger = logging.getLogger(__name__)
+
+# Delay in seconds between two polls of the container logs or state
+POLL_INTERVAL = 0.1
+
+
+def decorated_async(wrapping, func):
+    """
+    Decorate a coroutine function with a wrapping class.
+
+    Wrapping classes providing ``start_async()`` and ``shutdown_async()`` are natively awaited. Otherwise, the
+    synchronous ``start()`` and ``shutdown()`` are run in the default executor.
+
+    :param wrapping: the wrapping class use to decorate the function
+    :param func: the coroutine function to decorate
+    :return: the decorated coroutine function
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        """Wrapper for decorated coroutine function."""
+        w_name, f_name = wrapping.__class__.__name__, func.__name__
+        native = hasattr(wrapping, 'start_async') and hasattr(wrapping, 'shutdown_async')
+        # A dedicated context keeps the call state of the synchronous wrapper between executor threads
+        context = contextvars.copy_context() if not native else None
+
+        logger.debug('[%s] Starting before \'%s\' coroutine', w_name, f_name)
+        if native:
+            await wrapping.start_async()
+        else:
+            await _in_thread(wrapping.start, context=context)
+        try:
+            logger.debug('[%s] Executing \'%s\' coroutine', w_name, f_name)
+            wrapping_args = context.run(wrapping.get_args) if context else wrapping.get_args()
+            func_args = tuple(wrapping_args) + args if wrapping.inject_arg else args
+            with span('function', wrapping.span_label(), function=f_name):
+                return await func(*func_args, **kwargs)
+        except Exception as ex:
+            logger.error('[%s] Error in \'%s\' coroutine : %s', w_name, f_name, str(ex))
+            raise ex
+        finally:
+            logger.debug('[%s] Shutdown after \'%s\' coroutine', w_name, f_name)
+            if native:
+                await wrapping.shutdown_async()
+            else:
+                await _in_thread(wrapping.shutdown, context=context)
+
+    return wrapper
+
+
+async def _in_thread(func, *args, context=None, **kwargs):
+    """
+    Run a blocking function in the default executor.
+
+    The function is run in the given context or a copy of the current one.
+    """
+    context = context or contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def start_container(wrapper):
+    """
+    Start a container and wait for it without blocking the event loop.
+
+    :param wrapper: the :class:`docktors.wdocker.DockerContainer` to start
+    :return: the started container
+    """
+    # pylint: disable=locally-disabled, protected-access
+    image = wrapper.p('image')
+    prestarted = wrapper._take_prestarted()
+    if prestarted is not None:
+        with span('eager', image):
+            call = await _in_thread(prestarted.result)
+        wrapper._state.push(call)
+        return wrapper.get_container()
+    wrapper._state.push()
+    try:
+        with span('start', image):
+            if wrapper.p('keep_alive'):
+                with span('reuse', image):
+                    reused = await _in_thread(wrapper._reuse_container)
+                if reused is not None:
+                    wrapper._state.replace(reused)
+                    return wrapper.get_container()
+
+            since = int(time.time())
+            wrapper._state.current()['since'] = since
+            client, container = await _in_thread(wrapper._run_container)
+            wrapper._client, wrapper._container = client, container
+            wrapper._capture_logs()
+            with span('wait', image):
+                wrapper._state.current()['readiness'] = await wait_until_ready(wrapper, client, container)
+            with span('ready', image):
+                await _in_thread(wrapper._container_ready)
+    except Exception:
+        await _in_thread(wrapper._stop_call, wrapper._state.pop())
+        raise
+    return container
+
+
+async def shutdown_container(wrapper):
+    """
+    Shutdown a container without blocking the event loop.
+
+    :param wrapper: the :class:`docktors.wdocker.DockerContainer` to shutdown
+    """
+    # pylint: disable=locally-disabled, protected-access
+    call = wrapper._state.pop()
+    with span('shutdown', wrapper.p('image')):
+        if wrapper.p('keep_alive'):
+            await _in_thread(wrapper._keep_idle, call)
+            return
+        await _in_thread(wrapper._dispose_container, call['container'])
+
+
+async def wait_until_ready(wrapper, client, container):
+    """
+    Wait concurrently for all the readiness probes of a container.
+
+    :param wrapper: the :class:`docktors.wdocker.DockerContainer` defining the probes
+    :param client: the docker client
+    :param container: the started container
+    :return: a dict with the latency in seconds by probe name, None when there is no probe
+    """
+    # pylint: disable=locally-disabled, protected-access
+    image, begin, capture = wrapper.p('image'), time.time(), wrapper._state.get('logs')
+    probes = await _readiness_probes(wrapper, client, container, capture)
+    if not probes:
+        return None
+
+    async def _timed(probe):
+        await probe
+        return time.time() - begin
+
+    async def _ready():
+        gathered = asyncio.gather(*[_timed(p) for p in probes.values()])
+        watching = asyncio.ensure_future(watch_failure(wrapper, watcher))
+        try:
+            # The probes stop as soon as the container dies, with its last logs
+            await asyncio.wait([gathered, watching], return_when=asyncio.FIRST_COMPLETED)
+            return watching.result() if watching.done() else gathered.result()
+        finally:
+            gathered.cancel()
+            watching.cancel()
+
+    timeout = wrapper.p('wait_timeout')
+    watcher = ContainerWatcher(client, container, image, since=wrapper._state.get('since')).start()
+    wrapper._state.current()['watcher'] = watcher
+    try:
+        latencies = await asyncio.wait_for(_ready(), timeout)
+    except asyncio.TimeoutError:
+        raise DockerContainerError('[%s] Timeout after %.1fs waiting for %s. Container logs :\n%s' % (
+            image, timeout, ', '.join(probes), capture.tail().decode('utf-8', 'replace')
+        ))
+    finally:
+        watcher.close()
+        del wrapper._state.current()['watcher']
+    for name, latency in zip(probes, latencies):
+        record('wait.%s' % name, image, latency)
+    return OrderedDict(zip(probes, latencies))
+
+
+async def _readiness_probes(wrapper, client, container, capture):
+    """Create the probe coroutines of a container, by probe name."""
+    # pylint: disable=locally-disabled, protected-access
+    image, probes = wrapper.p('image'), OrderedDict()
+    if wrapper.p('wait_for_port') or wrapper.p('wait_for_http'):
+        container_info = await _in_thread(client.containers.get, container.id)
+        for port in wrapper.p('wait_for_port') or []:
+            host, host_port = wrapper._probe_address(client, container_info.attrs, port)
+            probes['tcp:%d' % port] = wait_for_port(image, capture, host, host_port)
+        for port, path, status in wrapper.p('wait_for_http') or []:
+            host, host_port = wrapper._probe_address(client, container_info.attrs, port)
+            probes['http:%d%s' % (port, path)] = wait_for_http(image, capture, host, host_port, path, status)
+    if wrapper.p('wait_for_log') or wrapper.p('wait_for_log_regex'):
+        matcher = LogMatcher(wrapper.p('wait_for_log') or [], wrapper.p('wait_for_log_regex') or [])
+        probes['log'] = wait_for_log(image, container, matcher, capture)
+    if wrapper.p('wait_for_healthy'):
+        probes['healthy'] = wait_for_healthy(image, container, capture)
+    return probes
+
+
+async def watch_failure(wrapper, watcher):
+    """
+    Wait for the container to die or to be killed on out of memory.
+
+    :param wrapper: the :class:`docktors.wdocker.DockerContainer` of the container
+    :param watcher: the :class:`docktors.readiness.ContainerWatcher` of the container
+    """
+    # pylint: disable=locally-disabled, protected-access
+    while not watcher.is_failed():
+        await asyncio.sleep(POLL_INTERVAL)
+    await _in_thread(wrapper._check_not_failed)
+
+
+async def wait_for_log(image, container, matcher, capture):
+    """
+    Wait for logs to be present in the container logs by polling their capture.
+
+    :param image: the image name, for logging purpose
+    :param container: the container to check
+    :param matcher: the :class:`docktors.logs.LogMatcher` with the logs to wait for
+    :param capture: the :class:`docktors.logs.LogCapture` of the container logs
+    """
+    position = 0
+    while True:
+        logs, position, ended = capture.read(position)
+        if matcher.feed(logs):
+            break
+        if ended:
+            await _in_thread(container.reload)
+            raise DockerContainerError('[%s] Container %s is %s before log \'%s\' appears. Container logs :\n%s' % (
+                image, container.id, container.status, "', '".join(matcher.remaining),
+                capture.tail().decode('utf-8', 'replace')
+            ))
+        await asyncio.sleep(POLL_INTERVAL)
+    logger.debug('[%s] Logs have been found in container logs', image)
+
+
+async def wait_for_port(image, capture, ip_address, wait_port):
+    """
+    Wait for a port of the container to accept connections.
+
+    :param image: the image name, for logging purpose
+    :param capture: the :class:`docktors.logs.LogCapture` of the container logs
+    :param ip_address: the container ip address, or the docker host for a published port
+    :param wait_port: the port to wait for
+    """
+    _, writer = await _connect(image, capture, ip_address, wait_port)
+    writer.close()
+    logger.debug('[%s] Port %d is now responding.', image, wait_port)
+
+
+async def wait_for_http(image, capture, ip_address,  # pylint: disable=locally-disabled, too-many-arguments
+                        port, path, status):
+    """
+    Wait for an HTTP endpoint of the container to respond with the expected status.
+
+    :param image: the image name, for logging purpose
+    :param capture: the :class:`docktors.logs.LogCapture` of the container logs
+    :param ip_address: the container ip address, or the docker host for a published port
+    :param port: the HTTP port
+    :param path: the HTTP path to request
+    :param status: the expected HTTP status
+    """
+    failures = 0
+    while True:
+        reader, writer = await _connect(image, capture, ip_address, port)
+        try:
+            writer.write(('GET %s HTTP/1.0\r\nHost: %s:%d\r\n\r\n' % (path, ip_address, port)).encode('ascii'))
+            status_line = (await reader.readline()).split()
+        except OSError:
+            status_line = []
+        finally:
+            writer.close()
+        response = int(status_line[1]) if len(status_line) > 1 and status_line[1].isdigit() else None
+        if response == status:
+            break
+        logger.debug('[%s] Waiting for http:%d%s to respond %d (got %s).', image, port, path, status, response)
+        await asyncio.sleep(backoff_delay(failures))
+        failures += 1
+    logger.debug('[%s] Endpoint http:%d%s is now responding.', image, port, path)
+
+
+async def _connect(image, capture, ip_address, port):
+    """Open a connection to a container port, retrying with backoff."""
+    failures = 0
+    while True:
+        try:
+            return await asyncio.open_connection(ip_address, port)
+        except OSError as ex:
+            res = ex.errno or errno.ECONNREFUSED
+            logger.debug(
+                '[%s] Waiting for port %d to respond (code:%d => %s).',
+                image, port, res, errorcode.get(res, '--')
+            )
+            unsupported_error = next((e[1] for e in UNSUPPORTED_SOCKET_ERRORS if e[0] == res), None)
+            if unsupported_error:
+                raise DockerContainerError(unsupported_error.format(
+                    image=image,
+                    port=port,
+                    signal=errorcode.get(res, '--'),
+                    ip=ip_address,
+                    logs=capture.tail().decode('utf-8', 'replace')
+                ))
+        await asyncio.sleep(backoff_delay(failures))
+        failures += 1
+
+
+async def wait_for_healthy(image, container, capture):
+    """
+    Wait for the container healthcheck to succeed by polling the container state.
+
+    :param image: the image name, for logging purpose
+    :param container: the container to check
+    :param capture: the :class:`docktors.logs.LogCapture` of the container logs
+    """
+    while True:
+        await _in_thread(container.reload)
+        health = container.attrs.get('State', {}).get('Health')
+        if health is None:
+            raise DockerContainerError('[%s] Image has no HEALTHCHECK to wait for' % image)
+        if health.get('Status') == 'healthy':
+            break
+        if health.get('Status') == 'unhealthy' or container.status not in ['running', 'created']:
+            raise DockerContainerError('[%s] Container %s is %s. Container logs :\n%s' % (
+                image, container.id, health.get('Status') if container.status == 'running' else container.status,
+                capture.tail().decode('utf-8', 'replace')
+            ))
+        await asyncio.sleep(POLL_INTERVAL)
+    logger.debug('[%s] Container %s is healthy.', image, container.id)
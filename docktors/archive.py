@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Archive module.
+
+This module is design to send host files to the docker daemon as a tar generated on the fly, file by file, so the
+files are never loaded in memory. The content of the files can also be hashed, to avoid sending them again.
+"""
+import hashlib
+import os
+import posixpath
+import stat
+import tarfile
+
+# Size of the blocks read from the files
+CHUNK_SIZE = 64 * 1024
+
+_BLOCK_SIZE = tarfile.BLOCKSIZE
+
+
+class ArchiveError(Exception):
+    """
+    Error raised when a file cannot be archived.
+    """
+    pass
+
+
+def archive_entries(sources):
+    """
+    List the entries of an archive from host paths. The directories are added with all their content.
+
+    :param sources: a list of tuples (host path, path in the archive)
+    :return: the list of tuples (host path, path in the archive), sorted by path in the archive
+    """
+    entries = []
+    for source, target in sources:
+        target = target.strip('/')
+        if not os.path.exists(source):
+            raise ArchiveError('File %s does not exist' % source)
+        entries.append((source, target))
+        if os.path.isdir(source) and not os.path.islink(source):
+            for root, dirs, files in os.walk(source):
+                relative = os.path.relpath(root, source)
+                for name in dirs + files:
+                    path = name if relative == os.curdir else posixpath.join(*(relative.split(os.sep) + [name]))
+                    entries.append((os.path.join(root, name), posixpath.join(target, path) if target else path))
+    return sorted(entries, key=lambda e: e[1])
+
+
+def archive_hash(entries, *extra):
+    """
+    Compute the hash of the content of an archive. Only the paths, the permissions and the contents are hashed, so
+    touching a file doesn't change the hash.
+
+    :param entries: the tuples (host path, path in the archive), see archive_entries()
+    :param extra: some strings to include in the hash
+    :return: the hash as an hexadecimal string
+    """
+    digest = hashlib.sha256()
+    for value in extra:
+        digest.update(('%s\0' % value).encode('utf-8'))
+    for source, target in entries:
+        mode = os.lstat(source).st_mode
+        digest.update(('\0%s\0%o\0' % (target, mode)).encode('utf-8'))
+        if stat.S_ISLNK(mode):
+            digest.update(os.readlink(source).encode('utf-8'))
+        elif stat.S_ISREG(mode):
+            with open(source, 'rb') as source_file:
+                for chunk in iter(lambda f=source_file: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def archive_stream(entries):
+    """
+    Generate the tar of host files.
+
+    :param entries: the tuples (host path, path in the archive), see archive_entries()
+    :return: a generator of the tar blocks
+    """
+    tar = tarfile.TarFile(fileobj=_NullFile(), mode='w')
+    for source, target in entries:
+        info = tar.gettarinfo(source, arcname=target)
+        if info is None:
+            # Sockets and fifos cannot be archived
+            continue
+        info.uid = info.gid = 0
+        info.uname = info.gname = ''
+        yield info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'strict')
+        if info.isreg():
+            remaining = info.size
+            with open(source, 'rb') as source_file:
+                while remaining > 0:
+                    chunk = source_file.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ArchiveError('File %s has changed while being sent' % source)
+                    remaining -= len(chunk)
+                    yield chunk
+            if info.size % _BLOCK_SIZE:
+                yield b'\0' * (_BLOCK_SIZE - info.size % _BLOCK_SIZE)
+    yield b'\0' * (2 * _BLOCK_SIZE)
+
+
+class _NullFile(object):
+    """File discarding what is written, the tar blocks being generated by archive_stream()"""
+
+    def write(self, data):
+        """Discard the data."""
+
+    def tell(self):
+        """:return: 0, nothing being written"""
+        return 0
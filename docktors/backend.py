@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Backend module.
+
+This module is design to choose what runs the containers. A backend creates the clients shared by the wrappers (see
+:func:`docktors.client.get_client`) :
+
+- ``docker`` : the docker SDK client, talking to a docker daemon (default)
+- ``fake`` : the in-process :class:`docktors.fake.FakeBackend`, running simulated services or local subprocesses
+
+The backend is chosen with :func:`set_backend` or with the ``DOCKTORS_BACKEND`` environment variable, giving either
+one of the names above or the ``package.module:attribute`` path of a backend instance or factory.
+"""
+import importlib
+import logging
+import os
+import threading
+
+import docker
+
+logger = logging.getLogger(__name__)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class Backend(object):
+    """
+    Base class of the backends.
+
+    The clients created by a backend provide the subset of the docker SDK used by docktors :
+
+    - run : ``containers.run()``, ``containers.create()`` and ``container.start()``
+    - inspect : ``containers.get()``, ``containers.list()``, ``container.reload()``, ``container.attrs`` and
+      ``container.status``
+    - logs stream : ``container.logs()`` and ``events()``
+    - stop and kill : ``container.stop()``, ``container.kill()`` and ``container.remove()``
+    - exec : ``container.exec_run()`` and ``api.exec_create()``, ``api.exec_start()``, ``api.exec_inspect()``
+    - archive : ``container.put_archive()`` and ``container.get_archive()``
+
+    Images are handled with ``images.get()``, ``api.pull()``, ``api.build()`` and ``container.commit()``. Missing
+    resources raise the ``docker.errors`` exceptions.
+    """
+    name = None
+
+    def client(self, environment, max_pool_size):
+        """
+        Create a client.
+
+        :param environment: the environment variables defining the daemon
+        :param max_pool_size: the maximum number of connections to the daemon
+        :return: the client
+        """
+        raise NotImplementedError("Abstract method should be implemented")
+
+
+class DockerBackend(Backend):
+    """
+    Backend using the docker SDK.
+    """
+    name = 'docker'
+
+    def client(self, environment, max_pool_size):
+        return docker.from_env(environment=environment, max_pool_size=max_pool_size)
+
+
+def get_backend():
+    """
+    Retrieve the backend, loading it from ``DOCKTORS_BACKEND`` on first use.
+
+    :return: the :class:`Backend`
+    """
+    global _backend  # pylint: disable=locally-disabled, global-statement
+    with _backend_lock:
+        if _backend is None:
+            _backend = load_backend(os.environ.get('DOCKTORS_BACKEND') or DockerBackend.name)
+        return _backend
+
+
+def set_backend(backend):
+    """
+    Change the backend. The clients of the previous backend are closed.
+
+    :param backend: the :class:`Backend`, or its name, None to reload it from ``DOCKTORS_BACKEND``
+    :return: the previous backend
+    """
+    global _backend  # pylint: disable=locally-disabled, global-statement
+    from .client import close_clients
+    with _backend_lock:
+        previous, _backend = _backend, load_backend(backend) if backend is not None else None
+    close_clients()
+    return previous
+
+
+def load_backend(name):
+    """
+    Load a backend by name.
+
+    :param name: ``docker``, ``fake`` or the ``package.module:attribute`` path of a backend instance or factory. A
+                 :class:`Backend` instance is returned as is.
+    :return: the :class:`Backend`
+    """
+    if isinstance(name, Backend):
+        return name
+    if name == DockerBackend.name:
+        return DockerBackend()
+    if name == 'fake':
+        from .fake import FakeBackend
+        return FakeBackend()
+    if ':' not in name:
+        raise ValueError("Unknown backend '%s', expecting 'docker', 'fake' or 'package.module:attribute'" % name)
+    module_name, attribute = name.split(':', 1)
+    backend = getattr(importlib.import_module(module_name), attribute)
+    backend = backend if isinstance(backend, Backend) else backend()
+    logger.debug('Backend %s loaded from %s', backend.name, name)
+    return backend
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Build module.
+
+This module is design to build the image of a container from a local build context. The image is tagged with a hash
+of the context content, the files excluded by the ``.dockerignore`` being ignored : the build API is only called when
+the content has changed since the last build.
+
+The build context is sent as a tar generated on the fly, file by file, so it is never loaded in memory. It is hashed
+once per process : the next containers of a same build definition reuse the image built for the first one.
+"""
+import json
+import logging
+import os
+import threading
+
+import docker
+from docker.utils.build import exclude_paths
+
+from .archive import archive_hash, archive_stream
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the tags given to the built images
+BUILD_TAG_PREFIX = 'docktors-'
+
+_build_locks = dict()
+_build_locks_lock = threading.Lock()
+_built_images = dict()
+
+
+class BuildError(Exception):
+    """
+    Error raised when an image cannot be built.
+    """
+    pass
+
+
+def context_files(context, dockerfile=None):
+    """
+    List the files and directories of a build context, except the ones excluded by the ``.dockerignore``.
+
+    :param context: the path of the build context
+    :param dockerfile: the path of the Dockerfile in the context (default: ``Dockerfile``)
+    :return: the sorted list of paths, relative to the context
+    """
+    patterns = []
+    dockerignore = os.path.join(context, '.dockerignore')
+    if os.path.exists(dockerignore):
+        with open(dockerignore) as ignore_file:
+            patterns = [line.strip() for line in ignore_file.read().splitlines()]
+            patterns = [p for p in patterns if p and not p.startswith('#')]
+    return sorted(exclude_paths(context, patterns, dockerfile=dockerfile))
+
+
+def context_hash(context, files, dockerfile=None, buildargs=None):
+    """
+    Compute the hash of a build context content, see :func:`docktors.archive.archive_hash`.
+
+    :param context: the path of the build context
+    :param files: the paths of the context to hash, see context_files()
+    :param dockerfile: the path of the Dockerfile in the context
+    :param buildargs: the build arguments as a dict
+    :return: the hash as an hexadecimal string
+    """
+    options = json.dumps(dict(dockerfile=dockerfile, buildargs=buildargs), sort_keys=True)
+    return archive_hash(_context_entries(context, files), options)
+
+
+def context_tar(context, files):
+    """
+    Generate the tar of a build context.
+
+    :param context: the path of the build context
+    :param files: the paths of the context to include, see context_files()
+    :return: a generator of the tar blocks
+    """
+    return archive_stream(_context_entries(context, files))
+
+
+def _context_entries(context, files):
+    return [(os.path.join(context, path), path.replace(os.sep, '/')) for path in files]
+
+
+def built_image(client, image, context, dockerfile=None, buildargs=None):
+    """
+    Retrieve the image built from a build context, building it on first use in the process.
+
+    :param client: the docker client
+    :param image: the repository of the built image
+    :param context: the path of the build context
+    :param dockerfile: the path of the Dockerfile in the context (default: ``Dockerfile``)
+    :param buildargs: the build arguments as a dict
+    :return: the name of the image
+    """
+    key = (image, os.path.abspath(context), dockerfile, json.dumps(buildargs, sort_keys=True))
+    with _build_lock(key):
+        if key not in _built_images:
+            with span('build', image):
+                _built_images[key] = ImageBuilder(
+                    client, image, context, dockerfile=dockerfile, buildargs=buildargs
+                ).build()
+        return _built_images[key]
+
+
+class ImageBuilder(object):
+    """
+    Image builder class. This class builds an image from a build context, unless it has already been built.
+    """
+
+    def __init__(self, client, image, context, dockerfile=None, buildargs=None):
+        """
+        Class constructor to build an image.
+
+        :param client: the docker client
+        :param image: the repository of the built image
+        :param context: the path of the build context
+        :param dockerfile: the path of the Dockerfile in the context (default: ``Dockerfile``)
+        :param buildargs: the build arguments as a dict
+        """
+        self._client = client
+        self._image = image
+        self._context = context
+        self._dockerfile = dockerfile
+        self._buildargs = buildargs
+
+    def build(self):
+        """
+        Build the image, when there is no image tagged with the hash of the build context.
+
+        :return: the name of the image
+        """
+        files = context_files(self._context, self._dockerfile)
+        tag = BUILD_TAG_PREFIX + context_hash(self._context, files, self._dockerfile, self._buildargs)[:32]
+        name = '%s:%s' % (self._image, tag)
+        with _build_lock(name):
+            try:
+                self._client.images.get(name)
+                logger.debug('[%s] Build context is unchanged, using image %s', self._image, name)
+                return name
+            except docker.errors.ImageNotFound:
+                pass
+            logger.debug('[%s] Building image %s from %s (%d paths)', self._image, name, self._context, len(files))
+            output = self._client.api.build(
+                fileobj=context_tar(self._context, files), custom_context=True, tag=name,
+                dockerfile=self._dockerfile, buildargs=self._buildargs, rm=True, decode=True
+            )
+            lines = []
+            for event in output:
+                if 'error' in event:
+                    raise BuildError('[%s] Unable to build image from %s : %s\n%s' % (
+                        self._image, self._context, event['error'].strip(), ''.join(lines[-20:])
+                    ))
+                if event.get('stream'):
+                    lines.append(event['stream'])
+                    logger.debug('[%s] %s', self._image, event['stream'].rstrip())
+        return name
+
+
+def _build_lock(name):
+    with _build_locks_lock:
+        return _build_locks.setdefault(name, threading.Lock())
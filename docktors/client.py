@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Client module.
+
+This module is design to share the docker clients, and so their HTTP connection pools, between all the wrappers.
+There is one client by docker environment, created by the backend (see :mod:`docktors.backend`). All of them are
+closed when the interpreter exits.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from .backend import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Environment variables defining the docker daemon to use
+DOCKER_ENVIRONMENT_KEYS = ('DOCKER_HOST', 'DOCKER_TLS_VERIFY', 'DOCKER_CERT_PATH')
+
+# Maximum number of HTTP connections kept open to the docker daemon by each client
+MAX_POOL_SIZE = int(os.environ.get('DOCKTORS_MAX_POOL_SIZE', 10))
+
+_clients = dict()
+_clients_lock = threading.Lock()
+
+
+def get_client(environment=None, max_pool_size=None):
+    """
+    Retrieve the shared docker client for a docker environment, creating it on first use.
+
+    :param environment: the environment variables defining the docker daemon (default: ``os.environ``)
+    :param max_pool_size: the maximum number of HTTP connections to the daemon (default: ``MAX_POOL_SIZE``)
+    :return: the docker client
+    """
+    environment = os.environ if environment is None else environment
+    max_pool_size = max_pool_size or MAX_POOL_SIZE
+    backend = get_backend()
+    key = (backend.name,) + tuple(environment.get(k) for k in DOCKER_ENVIRONMENT_KEYS) + (max_pool_size,)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            logger.debug('Creating %s client for %s (max pool size=%d)', backend.name, key[1] or 'default host',
+                         max_pool_size)
+            client = backend.client(environment, max_pool_size)
+            _clients[key] = client
+        return client
+
+
+def close_clients():
+    """
+    Close all the shared docker clients. A new client will be created on the next call of get_client().
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.debug('Unable to close docker client : %s', str(ex))
+
+
+atexit.register(close_clients)
@@ -4,22 +4,39 @@ Core module to define :
 
 * The decorated method for created new decorator
 * The generic wrapper with input parameters validation.
+* The per call state storage of the wrappers.
 """
+import inspect
 import logging
+import threading
 
 import functools
 
+try:
+    import contextvars
+except ImportError:  # Python < 3.7
+    contextvars = None
+
+from .metrics import span
+
 logger = logging.getLogger(__name__)
 
+_is_coroutine_function = getattr(inspect, 'iscoroutinefunction', lambda func: False)
+
 
 def decorated(wrapping, func):
     """
     Decorate a function with a wrapping class.
 
+    Coroutine functions are decorated using the asynchronous start and shutdown of the wrapping class.
+
     :param wrapping: the wrapping class use to decorate the function
     :param func: the function to decorate
     :return: the decorated function
     """
+    if _is_coroutine_function(func):
+        from .aio import decorated_async
+        return decorated_async(wrapping, func)
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
@@ -30,7 +47,8 @@ def decorated(wrapping, func):
         try:
             logger.debug('[%s] Executing \'%s\' function', w_name, f_name)
             func_args = tuple(wrapping.get_args()) + args if wrapping.inject_arg else args
-            return func(*func_args, **kwargs)
+            with span('function', wrapping.span_label(), function=f_name):
+                return func(*func_args, **kwargs)
         except Exception as ex:
             logger.error('[%s] Error in \'%s\' function : %s', w_name, f_name, str(ex))
             raise ex
@@ -41,6 +59,100 @@ def decorated(wrapping, func):
     return wrapper
 
 
+class _ThreadLocalVar(object):
+    """Fallback for context variable when the contextvars module is not available."""
+
+    def __init__(self, default):
+        self._local = threading.local()
+        self._default = default
+
+    def get(self):
+        """:return: the value of the current thread, or the default one"""
+        return getattr(self._local, 'value', self._default)
+
+    def set(self, value):
+        """Change the value of the current thread."""
+        self._local.value = value
+
+
+class CallState(object):
+    """
+    Stack of the running calls of a wrapper and the last ended one. Each call is a dict holding the call state.
+
+    The stack is stored in a context variable so each thread and each asyncio task sees its own calls. With Python
+    older than 3.7, it falls back to a thread local storage.
+    """
+
+    def __init__(self):
+        if contextvars is not None:
+            self._calls = contextvars.ContextVar('docktors_calls', default=())
+            self._last = contextvars.ContextVar('docktors_last', default=None)
+        else:
+            self._calls = _ThreadLocalVar(default=())
+            self._last = _ThreadLocalVar(default=None)
+
+    def push(self, call=None):
+        """
+        Begin a new call.
+
+        :param call: the call state, a new empty one when not specified
+        :return: the call state
+        """
+        call = dict() if call is None else call
+        self._calls.set(self._calls.get() + (call,))
+        return call
+
+    def replace(self, call):
+        """
+        Replace the state of the running call.
+
+        :param call: the new call state
+        """
+        self._calls.set(self._calls.get()[:-1] + (call,))
+
+    def detach(self):
+        """
+        Remove the running call from the stack without ending it, so it can be attached to another thread or task.
+
+        :return: the call state
+        """
+        calls = self._calls.get()
+        self._calls.set(calls[:-1])
+        return calls[-1]
+
+    def pop(self):
+        """
+        End the running call.
+
+        :return: the state of the ended call
+        """
+        calls = self._calls.get()
+        call = calls[-1] if calls else dict()
+        self._calls.set(calls[:-1])
+        self._last.set(call)
+        return call
+
+    def current(self):
+        """
+        Retrieve the state of the running call, beginning a new one when none is running.
+
+        :return: the call state
+        """
+        calls = self._calls.get()
+        return calls[-1] if calls else self.push()
+
+    def get(self, key):
+        """
+        Retrieve a value from the running call or, when no call is running, from the last ended call.
+
+        :param key: the key to retrieve
+        :return: the value or None
+        """
+        calls = self._calls.get()
+        call = calls[-1] if calls else self._last.get()
+        return call.get(key) if call else None
+
+
 class DecWrapper(object):
     """
     Decorator wrapper class for parsing inputs args of any type of decorator.
@@ -52,6 +164,7 @@ class DecWrapper(object):
 
     def __init__(self, name, inputs, props):
         self._inputs = self.__check_inputs(name, inputs, props)
+        self._state = CallState()
         self.inject_arg = self.p('inject_arg')
 
     @staticmethod
@@ -64,11 +177,20 @@ class DecWrapper(object):
                 raise SyntaxError('[{name}] Cannot list containing multiple type'.format(name=name))
             return all(DecWrapper.__is_type(name, item, value_type[0]) for item in value)
 
-        if isinstance(value_type, tuple) and len(value) == len(value_type):
+        if isinstance(value_type, tuple) and isinstance(value, (list, tuple)) and len(value) == len(value_type):
             return all(DecWrapper.__is_type(name, value[i], value_type[i]) for i in range(len(value)))
 
         return False
 
+    @staticmethod
+    def __type_name(value_type):
+        """Format a type definition, such as ``[(int, str)]``, for the error messages."""
+        if isinstance(value_type, list):
+            return '[%s]' % ', '.join(DecWrapper.__type_name(item) for item in value_type)
+        if isinstance(value_type, tuple):
+            return '(%s)' % ', '.join(DecWrapper.__type_name(item) for item in value_type)
+        return getattr(value_type, '__name__', repr(value_type))
+
     def start(self):
         """
         Start method.
@@ -94,6 +216,30 @@ class DecWrapper(object):
         """
         raise NotImplementedError("Abstract method should be implemented")
 
+    def span_label(self):
+        """
+        Retrieve the label of the spans measured around the decorated function, see :mod:`docktors.metrics`.
+
+        :return: the label, None by default
+        """
+        return None
+
+    def detach_call(self):
+        """
+        Detach the call started by start() from the current thread, for example to run the function in another one.
+
+        :return: the call state to give to attach_call()
+        """
+        return self._state.detach()
+
+    def attach_call(self, call):
+        """
+        Attach to the current thread a call detached with detach_call(), so get_args() and shutdown() can be used.
+
+        :param call: the call state returned by detach_call()
+        """
+        self._state.push(call)
+
     def __check_inputs(self, name, inputs, wrapper_props):
         """ Test input arguments """
         props = dict(self._global_props)
@@ -125,13 +271,16 @@ class DecWrapper(object):
             alternatives = prop.get('alternatives', [])
             alt_func = next((alt[1] for alt in alternatives if DecWrapper.__is_type(name, value, alt[0])), None)
             target_value = alt_func(value) if alt_func else value
+            if alt_func and target_value is None:
+                # The alternative leaves the option unset
+                continue
 
             argtype = prop['argtype']
             if not DecWrapper.__is_type(name, target_value, argtype):
                 raise TypeError("[{name}] : Option '{key}' bad type. Expected '{arg}'. Got '{got}' instead.".format(
                     name=name,
                     key=key,
-                    arg=argtype.__name__,
+                    arg=DecWrapper.__type_name(argtype),
                     got=type(target_value).__name__
                 ))
 
@@ -4,33 +4,125 @@ Decorators module
 """
 import logging
 from docktors.core import decorated
-from docktors.wdocker import DockerContainer
+from docktors.group import DockerGroup
+from docktors.pool import DockerContainerPool, DOCKER_POOL_PROPS
+from docktors.warmup import when_pinned
+from docktors.wdocker import DockerContainer, EAGER_WARMUP
 
 logger = logging.getLogger(__name__)
 
 
 def docker(func=None, **kwargs):
     """
-    Decorator to startup and shutdown a docker container.
+    Decorator to startup and shutdown a docker container. Coroutine functions can also be decorated.
 
-    :param image: The name of the image to use.
+    :param image: The name of the image to use, or the repository of the image built with ``build``.
+    :param build: The path of a build context to build the image from. The built image is tagged with a hash of the
+                  context content, without the files excluded by its ``.dockerignore``, and is only built again when
+                  this content changes.
+    :param dockerfile: The path of the Dockerfile in the build context (default: ``Dockerfile``)
+    :param build_args: The build arguments, as a dict or a list of tuples (name, value)
     :param command: The input docker command to run,
     :param ports: The ports bindings to made
     :param volumes: The volumes to mount
+    :param files: The host files or directories to copy in the container before its start, as a dict or a list of
+                  tuples (host path, container path). They are sent in a single streamed archive, which is only sent
+                  again to a reused container when their content has changed.
+    :param publish_ports: A port, or a list of ports, to publish on free host ports. The host ports are available
+                          with the ``host_ports`` attribute of the container and are the ones waited by
+                          ``wait_for_port`` and ``wait_for_http``.
+    :param host_port_range: A tuple (first, last) of host ports to publish the ports (default: ephemeral ports)
     :param environment: The environment value
-    :param wait_for_log: A string to wait in the logs before going into the function
-    :param wait_for_port: A string to wait before going into the function
+    :param wait_for_log: A string, or a list of strings, to wait in the logs before going into the function
+    :param wait_for_log_regex: A regular expression, or a list of them, to wait in the logs before going into the
+                               function
+    :param wait_for_port: A port, or a list of ports, to wait before going into the function
+    :param wait_for_http: A tuple (port, path[, status]), or a list of them, to wait for an HTTP endpoint to respond
+                          with the status (default: 200) before going into the function
+    :param wait_for_healthy: Wait for the image HEALTHCHECK to succeed before going into the function
+    :param wait_timeout: The maximum seconds to wait for the container to be ready
     :param kill_signal: If you want to kill the container, the signal to use. Otherwise, only a stop will be made.
+    :param stop_timeout: The seconds given to the container to stop before it is killed (default: 10)
+    :param remove: Remove the container, and its anonymous volumes, once stopped (default: True)
+    :param background_shutdown: Stop and remove the container in background threads, so the function returns as soon
+                                as its body is over (default: True). The containers bound to fixed host ``ports`` are
+                                always stopped before returning. See :func:`docktors.reaper.flush_reaper`.
+    :param keep_alive: Reuse the container started by the first call for all the next calls of the function
+    :param adopt_orphans: In keep alive mode, reuse the running containers of the same definition left by dead
+                          processes
+    :param idle_ttl: In keep alive mode, the seconds of inactivity before stopping the container (default: at exit)
+    :param log_buffer_size: The maximum bytes of the container logs kept in memory (default: 256 KiB)
+    :param log_file: A file where to write all the container logs. ``{id}`` and ``{image}`` are replaced in the path
+    :param log_file_max_bytes: The maximum size of the log file before its rotation (default: 10 MiB)
+    :param log_file_backups: The number of rotated log files to keep (default: 3)
+    :param reset_paths: A path, or a list of paths, of the container restored between the calls of the function in
+                        keep alive mode or with a recycling pool (requires ``rm`` in the container)
+    :param reset_command: A command executed in the container between the calls of the function in keep alive mode
+                          or with a recycling pool
+    :param snapshot: Commit the container once ready in a local warm image, used by the next starts of the same
+                     container definition
+    :param snapshot_max_images: The maximum number of warm images kept locally (default: 5)
+    :param exec_mode: Inject a :class:`docktors.execution.CommandRunner` sending commands to the container through the
+                      exec API, instead of the container. Without ``command``, the container runs an idle command.
+                      Combined with ``keep_alive``, all the calls run their commands in a same container.
+    :param eager: Start the container of the first call in background as soon as the function is decorated (True),
+                  or once its image has been pinned by :func:`docktors.warmup.warmup` (``'warmup'``). The first call
+                  only waits for the rest of the start. With a pool, the reserve is filled.
+    :param pool_size: The number of ready containers to keep in reserve for concurrent calls
+    :param pool_max_size: The maximum number of containers started by the pool
+    :param pool_refill_workers: The number of threads used to refill the pool
+    :param pool_recycle: Give back the containers to the pool after each call instead of shutting them down
     :param func: the function to be decorated
     :return: the decorated function
     """
-    docker_container = DockerContainer(**kwargs)
+    if any(key in DOCKER_POOL_PROPS for key in kwargs):
+        docker_container = DockerContainerPool(**kwargs)
+    else:
+        docker_container = DockerContainer(**kwargs)
 
     # Decorator in variable assignment : function is undefined
     if func is None:
         def decorator(func):  # pylint: disable=locally-disabled, missing-docstring
+            _start_eagerly(docker_container)
             return decorated(docker_container, func)
 
         return decorator
 
+    _start_eagerly(docker_container)
     return decorated(docker_container, func)
+
+
+def _start_eagerly(docker_container):
+    eager = docker_container.p('eager')
+    if eager is None:
+        return
+    if eager == EAGER_WARMUP and docker_container.p('build') is None:
+        when_pinned(docker_container.p('image'), docker_container.prestart)
+    else:
+        # The built images are never pinned by the warmup
+        docker_container.prestart()
+
+
+def docker_group(func=None, **kwargs):
+    """
+    Decorator to startup and shutdown several docker containers.
+
+    Containers are started in parallel, except the ones depending on other containers which are started once their
+    dependencies are ready. When the argument is injected, it is a dict of the containers by name.
+
+    :param containers: The containers options, by name, as a dict or a list of tuples (name, options). The options
+                       are the ones of the docker decorator, with an additional ``depends_on`` list of names.
+    :param max_workers: The maximum number of containers to start or shutdown at the same time
+    :param func: the function to be decorated
+    :return: the decorated function
+    """
+    docker_containers = DockerGroup(**kwargs)
+
+    # Decorator in variable assignment : function is undefined
+    if func is None:
+        def decorator(func):  # pylint: disable=locally-disabled, missing-docstring
+            return decorated(docker_containers, func)
+
+        return decorator
+
+    return decorated(docker_containers, func)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Execution module.
+
+This module is design to run commands in a running container through the exec API, so many short commands can be run
+in a same container without paying the container creation for each of them.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+STDOUT = 'stdout'
+STDERR = 'stderr'
+
+# Command keeping the container running in exec mode, when no command is given : sleep is available in most images
+IDLE_ENTRYPOINT = ['sleep', '2147483647']
+
+
+class ExecError(Exception):
+    """
+    Error raised when a checked command exits with a non zero code.
+    """
+
+    def __init__(self, message, result):
+        super(ExecError, self).__init__(message)
+        self.result = result
+
+
+class ExecResult(object):
+    """
+    Result of a command executed in a container.
+    """
+
+    def __init__(self, command, exit_code, stdout, stderr):
+        """
+        Class constructor for a command result.
+
+        :param command: the executed command
+        :param exit_code: the exit code of the command
+        :param stdout: the standard output of the command as bytes
+        :param stderr: the error output of the command as bytes
+        """
+        self.command = command
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+
+    @property
+    def ok(self):  # pylint: disable=locally-disabled, invalid-name
+        """
+        :return: True when the command exits with a zero code
+        """
+        return self.exit_code == 0
+
+    def __repr__(self):
+        return 'ExecResult(command=%r, exit_code=%r)' % (self.command, self.exit_code)
+
+
+class ExecProcess(object):
+    """
+    Command running in a container.
+
+    Iterating over the process gives its output as soon as it is written, as ``(stream, data)`` tuples where the
+    stream is ``'stdout'`` or ``'stderr'``. The exit code is available once the whole output has been read.
+    """
+
+    def __init__(self, client, exec_id, command):
+        """
+        Class constructor starting an exec instance.
+
+        :param client: the docker client
+        :param exec_id: the id of the created exec instance
+        :param command: the executed command
+        """
+        self._client = client
+        self._exec_id = exec_id
+        self.command = command
+        self.exit_code = None
+        self._chunks = self._read(client.api.exec_start(exec_id, stream=True, demux=True))
+
+    def _read(self, output):
+        for stdout, stderr in output:
+            if stdout:
+                yield STDOUT, stdout
+            if stderr:
+                yield STDERR, stderr
+        self.exit_code = self._client.api.exec_inspect(self._exec_id).get('ExitCode')
+
+    def __iter__(self):
+        return self._chunks
+
+    def wait(self):
+        """
+        Wait for the end of the command, discarding the output not read yet.
+
+        :return: the exit code of the command
+        """
+        for _ in self._chunks:
+            pass
+        return self.exit_code
+
+
+class CommandRunner(object):
+    """
+    Command runner class. This class sends commands to a running container through the exec API.
+    """
+
+    def __init__(self, client, container, image):
+        """
+        Class constructor to run commands in a container.
+
+        :param client: the docker client
+        :param container: the running container
+        :param image: the image of the container, for the logs
+        """
+        self._client = client
+        self.container = container
+        self._image = image
+
+    def stream(self, command, environment=None, workdir=None, user=''):
+        """
+        Start a command in the container.
+
+        :param command: the command, as a string or a list
+        :param environment: the environment variables of the command as a dict
+        :param workdir: the working directory of the command
+        :param user: the user running the command (default: the container user)
+        :return: the :class:`ExecProcess` to read the output from
+        """
+        logger.debug('[%s] Executing %s in container %s', self._image, command, self.container.id)
+        exec_id = self._client.api.exec_create(
+            self.container.id, command, stdout=True, stderr=True, environment=environment, workdir=workdir, user=user
+        )['Id']
+        return ExecProcess(self._client, exec_id, command)
+
+    def run(self, command, environment=None, workdir=None,  # pylint: disable=locally-disabled, too-many-arguments
+            user='', on_output=None, check=False):
+        """
+        Run a command in the container until its end.
+
+        :param command: the command, as a string or a list
+        :param environment: the environment variables of the command as a dict
+        :param workdir: the working directory of the command
+        :param user: the user running the command (default: the container user)
+        :param on_output: a function called with ``(stream, data)`` each time the command writes some output
+        :param check: raise an :class:`ExecError` when the command exits with a non zero code
+        :return: the :class:`ExecResult`
+        """
+        process = self.stream(command, environment=environment, workdir=workdir, user=user)
+        output = {STDOUT: [], STDERR: []}
+        for stream, data in process:
+            output[stream].append(data)
+            if on_output is not None:
+                on_output(stream, data)
+        result = ExecResult(command, process.exit_code, b''.join(output[STDOUT]), b''.join(output[STDERR]))
+        if check and not result.ok:
+            raise ExecError('[%s] Command %s fails in container %s (exit code %s) :\n%s' % (
+                self._image, command, self.container.id, result.exit_code, result.stderr.decode('utf-8', 'replace')
+            ), result)
+        return result
@@ -0,0 +1,1025 @@
+# -*- coding: utf-8 -*-
+"""
+Fake backend module.
+
+This module is design to run the decorated functions without any docker daemon. The :class:`FakeBackend` keeps its
+containers and images in memory and gives them the subset of the docker SDK used by docktors. What runs in a
+container is a service, chosen by image :
+
+- :class:`SimulatedService` writes some logs, opens some ports, becomes healthy or exits after a delay, and answers
+  the executed commands with canned results (default)
+- :class:`SubprocessService` runs the container command as a local subprocess, its output being the container logs
+
+Each container has a temporary directory as filesystem, used by the archive functions. The volumes, the networks and
+the resources limits are ignored.
+
+    from docktors.backend import set_backend
+    from docktors.fake import FakeBackend, SimulatedService, SubprocessService
+
+    set_backend(FakeBackend(services={
+        'postgres': lambda: SimulatedService(logs=['ready to accept connections'], ports=[5432]),
+        'my-api': lambda: SubprocessService(['python', '-m', 'http.server', '8000'], ports=[8000]),
+    }))
+"""
+# pylint: disable=locally-disabled, too-many-lines
+import binascii
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import shlex
+import shutil
+import signal
+import socket
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import docker
+from docker.models.containers import ExecResult
+
+from .archive import CHUNK_SIZE, archive_entries, archive_stream
+from .backend import Backend
+
+logger = logging.getLogger(__name__)
+
+# Base url of the fake clients, so the published ports are probed on the local host
+FAKE_BASE_URL = 'fake://localhost'
+
+
+def _random_id():
+    return binascii.hexlify(os.urandom(32)).decode('ascii')
+
+
+def _image_id(name):
+    return 'sha256:' + hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+def _normalize(name):
+    """Give the ``latest`` tag to an image name without tag."""
+    if name.startswith('sha256:') or ':' in name.rsplit('/', 1)[-1]:
+        return name
+    return name + ':latest'
+
+
+def _repository(name):
+    """Remove the tag of an image name."""
+    repository, _, tag = name.rpartition(':')
+    return repository if repository and '/' not in tag else name
+
+
+def _environment(environment):
+    """Convert an environment given as a list of ``KEY=value`` to a dict."""
+    if not environment:
+        return dict()
+    if isinstance(environment, dict):
+        return dict((k, str(v)) for k, v in environment.items())
+    return dict(e.split('=', 1) if '=' in e else (e, '') for e in environment)
+
+
+def _command(command):
+    """Convert a command given as a string to a list."""
+    if command is None:
+        return []
+    return list(command) if isinstance(command, (list, tuple)) else shlex.split(command)
+
+
+def _port(port):
+    return int(str(port).split('/')[0])
+
+
+def _signal_number(sig):
+    if sig is None:
+        return signal.SIGKILL
+    if isinstance(sig, int):
+        return sig
+    name = sig if sig.startswith('SIG') else 'SIG' + sig
+    return getattr(signal, name.upper())
+
+
+class FakeService(object):
+    """
+    Base class of what runs in a fake container. The service reports to the container with its ``bind()``,
+    ``write_log()``, ``set_health()`` and ``exited()`` methods.
+    """
+
+    def start(self, container):
+        """
+        Start the service.
+
+        :param container: the :class:`FakeContainer`
+        """
+        raise NotImplementedError("Abstract method should be implemented")
+
+    def signal(self, container, signum):
+        """
+        Send a signal to the service.
+
+        :param container: the :class:`FakeContainer`
+        :param signum: the signal number
+        """
+        raise NotImplementedError("Abstract method should be implemented")
+
+    def exec_run(self, container, command, environment=None, workdir=None):
+        """
+        Execute a command in the service.
+
+        :param container: the :class:`FakeContainer`
+        :param command: the command as a list
+        :param environment: the environment variables as a dict
+        :param workdir: the working directory in the container
+        :return: a tuple (exit code, output)
+        """
+        raise NotImplementedError("Abstract method should be implemented")
+
+
+class SimulatedService(FakeService):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Service simulated in-process : nothing runs, the logs are written and the ports opened on schedule.
+    """
+
+    def __init__(self, logs=(), log_delay=0.0, ports=(),  # pylint: disable=locally-disabled, too-many-arguments
+                 port_delay=0.0, healthy_delay=None, exit_code=None, exit_delay=0.0, commands=None):
+        """
+        Class constructor for a simulated service.
+
+        :param logs: the lines written in the logs
+        :param log_delay: the delay in seconds after the start before writing the logs
+        :param ports: the container ports of the service. They are bound to ephemeral ports of the local host, unless
+                      the container publishes them on a given host port.
+        :param port_delay: the delay in seconds after the start before the ports accept connections
+        :param healthy_delay: the delay in seconds after the start before the service is healthy (default: no
+                              healthcheck)
+        :param exit_code: the exit code of the service when it exits by itself (default: it runs until stopped)
+        :param exit_delay: the delay in seconds after the start before the service exits with ``exit_code``
+        :param commands: a dict of the results of the executed commands by command string, a result being a tuple
+                         (exit code, output) or a callable receiving the command list and returning such a tuple.
+                         The other commands succeed without output.
+        """
+        self._logs = list(logs)
+        self._log_delay = log_delay
+        self._ports = list(ports)
+        self._port_delay = port_delay
+        self._healthy_delay = healthy_delay
+        self._exit_code = exit_code
+        self._exit_delay = exit_delay
+        self._commands = dict(commands or {})
+        self._sockets = []
+        self._timers = []
+
+    def start(self, container):
+        requested = container.requested_ports()
+        for port in sorted(set(self._ports) | set(requested)):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(('127.0.0.1', requested.get(port) or 0))
+            except socket.error as ex:
+                sock.close()
+                self._close()
+                raise docker.errors.APIError('Bind for 127.0.0.1:%s failed : %s' % (requested.get(port), str(ex)))
+            self._sockets.append(sock)
+            container.bind(port, sock.getsockname()[1])
+        if self._healthy_delay is not None:
+            container.set_health('starting')
+            self._later(self._healthy_delay, container.set_health, 'healthy')
+        self._later(self._port_delay, self._listen)
+        self._later(self._log_delay, self._write_logs, container)
+        if self._exit_code is not None:
+            self._later(self._exit_delay, self._exit, container, self._exit_code)
+
+    def signal(self, container, signum):
+        self._exit(container, 128 + signum)
+
+    def exec_run(self, container, command, environment=None, workdir=None):
+        result = self._commands.get(' '.join(command), (0, b''))
+        return result(command) if callable(result) else result
+
+    def _exit(self, container, exit_code):
+        self._close()
+        container.exited(exit_code)
+
+    def _close(self):
+        for timer in self._timers:
+            timer.cancel()
+        for sock in self._sockets:
+            sock.close()
+
+    def _listen(self):
+        for sock in self._sockets:
+            try:
+                sock.listen(128)
+            except socket.error:
+                pass  # Closed in the meantime
+
+    def _write_logs(self, container):
+        for line in self._logs:
+            container.write_log(line.encode('utf-8') + b'\n')
+
+    def _later(self, delay, func, *args):
+        if not delay:
+            func(*args)
+            return
+        timer = threading.Timer(delay, func, args)
+        timer.daemon = True
+        self._timers.append(timer)
+        timer.start()
+
+
+class SubprocessService(FakeService):
+    """
+    Service running a local subprocess, in its own process group and in the container directory. The container ports
+    are the ports of the local host the subprocess listens to : they cannot be published on other host ports.
+    """
+
+    def __init__(self, command=None, environment=None, ports=()):
+        """
+        Class constructor for a subprocess service.
+
+        :param command: the command to run, as a list or a string (default: the container entrypoint and command)
+        :param environment: some environment variables added to the container ones
+        :param ports: the ports the subprocess listens to
+        """
+        self._command = command
+        self._environment = _environment(environment)
+        self._ports = list(ports)
+        self._process = None
+
+    def start(self, container):
+        command = _command(self._command) or container.command
+        if not command:
+            raise docker.errors.APIError('No command to run for image %s' % container.image)
+        for port in sorted(set(self._ports) | set(container.requested_ports())):
+            container.bind(port, port)
+        try:
+            self._process = self._popen(container, command, container.environment, None)
+        except OSError as ex:
+            raise docker.errors.APIError('Unable to run %s : %s' % (command, str(ex)))
+        thread = threading.Thread(target=self._read, args=(container,), name='docktors-fake-%s' % container.short_id)
+        thread.daemon = True
+        thread.start()
+
+    def signal(self, container, signum):
+        if self._process is not None and self._process.poll() is None:
+            try:
+                # The signal is sent to all the processes of the container, like a stop of its namespace
+                os.killpg(self._process.pid, signum)
+            except OSError:
+                pass  # Exited in the meantime
+
+    def exec_run(self, container, command, environment=None, workdir=None):
+        process = self._popen(container, command, dict(container.environment, **(environment or {})), workdir)
+        output, _ = process.communicate()
+        return process.returncode, output
+
+    def _popen(self, container, command, environment, workdir):
+        with open(os.devnull, 'rb') as stdin:
+            return subprocess.Popen(  # pylint: disable=locally-disabled, subprocess-popen-preexec-fn
+                command,
+                cwd=container.path(workdir) if workdir else container.root,
+                env=dict(os.environ, **dict(environment, **self._environment)),
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                preexec_fn=os.setsid,
+            )
+
+    def _read(self, container):
+        output = self._process.stdout
+        for chunk in iter(lambda: os.read(output.fileno(), 64 * 1024), b''):
+            container.write_log(chunk)
+        output.close()
+        code = self._process.wait()
+        container.exited(128 - code if code < 0 else code)
+
+
+class FakeContainer(object):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Container of the fake backend, with the methods and attributes of the docker SDK containers.
+    """
+    # The methods keep the signatures of the docker SDK, whatever the arguments they use
+    # pylint: disable=locally-disabled, unused-argument
+
+    def __init__(self, backend, image, command=None,  # pylint: disable=locally-disabled, too-many-arguments
+                 name=None, environment=None, labels=None, ports=None, entrypoint=None, **kwargs):
+        self.id = _random_id()
+        self.short_id = self.id[:12]
+        self.name = name or 'fake_%s' % self.short_id
+        self.image = image
+        self.command = _command(entrypoint) + _command(command)
+        self.environment = _environment(environment)
+        self.labels = dict(labels or {})
+        self.root = tempfile.mkdtemp(prefix='docktors-fake-%s-' % self.short_id)
+        self.status = 'created'
+        self.removed = False
+        self.options = kwargs
+        self._backend = backend
+        self._ports = ports or {}
+        self._host_ports = OrderedDict()
+        self._created = time.time()
+        self._exit_code = 0
+        self._health = None
+        self._logs = []
+        self._events = []
+        self._service = None
+        self._changed = threading.Condition()
+
+    def __repr__(self):
+        return '<FakeContainer: %s>' % self.short_id
+
+    # Methods of the docker SDK containers
+
+    @property
+    def attrs(self):
+        """:return: the container attributes, as given by the docker inspect"""
+        with self._changed:
+            state = dict(Status=self.status, Running=self.status == 'running', ExitCode=self._exit_code)
+            if self._health is not None:
+                state['Health'] = dict(Status=self._health)
+            ports = OrderedDict(
+                ('%d/tcp' % port, [dict(HostIp='127.0.0.1', HostPort=str(host_port))])
+                for port, host_port in self._host_ports.items()
+            )
+        return dict(
+            Id=self.id,
+            Name='/' + self.name,
+            Image=self._backend.image_id(self.image),
+            Created=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self._created)),
+            State=state,
+            Config=dict(Image=self.image, Cmd=self.command, Labels=dict(self.labels),
+                        Env=['%s=%s' % e for e in sorted(self.environment.items())]),
+            HostConfig=dict(LogConfig=dict(Type='json-file')),
+            NetworkSettings=dict(IPAddress='127.0.0.1', Ports=ports),
+        )
+
+    def reload(self):
+        """Check the container still exists : its attributes are always up to date."""
+        if self.removed:
+            raise docker.errors.NotFound('No such container: %s' % self.id)
+
+    def start(self, **kwargs):
+        """Start the service of the container."""
+        self.reload()
+        with self._changed:
+            if self.status == 'running':
+                return
+        self._service = self._backend.service(self.image)
+        self._service.start(self)
+        with self._changed:
+            if self.status == 'created':
+                self.status = 'running'
+                self._event('start')
+
+    def stop(self, timeout=10, **kwargs):
+        """
+        Stop the container with a SIGTERM, then a SIGKILL after the timeout.
+
+        :param timeout: the seconds to wait for the service to exit
+        """
+        self.reload()
+        if self.status != 'running':
+            return
+        self._service.signal(self, signal.SIGTERM)
+        if not self._wait_exit(timeout):
+            self._service.signal(self, signal.SIGKILL)
+            self._wait_exit(None)
+        with self._changed:
+            self._event('stop')
+
+    def kill(self, signal=None):  # pylint: disable=locally-disabled, redefined-outer-name
+        """
+        Send a signal to the container.
+
+        :param signal: the signal name or number (default: SIGKILL)
+        """
+        self.reload()
+        if self.status != 'running':
+            raise docker.errors.APIError('Container %s is not running' % self.id)
+        with self._changed:
+            self._event('kill')
+        self._service.signal(self, _signal_number(signal))
+
+    def remove(self, v=False, link=False, force=False):  # pylint: disable=locally-disabled, invalid-name
+        """
+        Remove the container and its filesystem.
+
+        :param force: True to kill a running container
+        """
+        self.reload()
+        if self.status == 'running':
+            if not force:
+                raise docker.errors.APIError('You cannot remove a running container %s' % self.id)
+            self._service.signal(self, signal.SIGKILL)
+            self._wait_exit(None)
+        self._backend.forget(self)
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._changed:
+            self.removed = True
+            self._event('destroy')
+
+    def rename(self, name):
+        """Rename the container."""
+        self.reload()
+        self.name = name
+
+    def wait(self, timeout=None, **kwargs):
+        """
+        Wait for the container to exit.
+
+        :return: a dict with the ``StatusCode``
+        """
+        self._wait_exit(timeout)
+        return dict(StatusCode=self._exit_code, Error=None)
+
+    def logs(self, stdout=True, stderr=True,  # pylint: disable=locally-disabled, too-many-arguments
+             stream=False, timestamps=False, tail='all', since=None, follow=None, **kwargs):
+        """
+        Retrieve the container logs.
+
+        :param stream: True to get a stream of the logs chunks
+        :param since: the timestamp of the oldest logs
+        :param follow: True to follow the logs until the container stops (default: ``stream``)
+        :return: the logs as bytes, or a stream of bytes
+        """
+        since = _timestamp(since)
+        if stream:
+            follow = stream if follow is None else follow
+            return _FollowStream(self._changed, self._logs, lambda: self.status != 'running' or not follow, since)
+        with self._changed:
+            return b''.join(data for stamp, data in self._logs if since is None or stamp >= since)
+
+    def exec_run(  # pylint: disable=locally-disabled, too-many-arguments, too-many-locals, redefined-outer-name
+            self, cmd, stdout=True, stderr=True, stdin=False, tty=False, privileged=False, user='', detach=False,
+            stream=False, socket=False, environment=None, workdir=None, demux=False):
+        """
+        Execute a command in the container. The ``rm -rf`` of absolute paths are applied to the container directory,
+        the other commands are given to the service.
+
+        :return: an ExecResult tuple (exit code, output)
+        """
+        self.reload()
+        if self.status != 'running':
+            raise docker.errors.APIError('Container %s is not running' % self.id)
+        command = _command(cmd)
+        if command[:2] == ['rm', '-rf'] and all(p.startswith('/') for p in command[2:]):
+            for path in command[2:]:
+                local = self.path(path)
+                if os.path.isdir(local) and not os.path.islink(local):
+                    shutil.rmtree(local)
+                elif os.path.lexists(local):
+                    os.remove(local)
+            exit_code, output = 0, b''
+        else:
+            exit_code, output = self._service.exec_run(self, command, _environment(environment), workdir)
+        return ExecResult(exit_code, (output, None) if demux else output)
+
+    def put_archive(self, path, data):
+        """
+        Extract a tar in the container directory.
+
+        :param path: the directory where to extract the tar
+        :param data: the tar as bytes, a file or an iterable of bytes
+        :return: True
+        """
+        self.reload()
+        target = self.path(path)
+        if not os.path.isdir(target):
+            raise docker.errors.NotFound('Could not find the file %s in container %s' % (path, self.id))
+        with tempfile.TemporaryFile() as buffer:
+            if hasattr(data, 'read'):
+                shutil.copyfileobj(data, buffer)
+            else:
+                for chunk in [data] if isinstance(data, bytes) else data:
+                    buffer.write(chunk)
+            buffer.seek(0)
+            with tarfile.open(fileobj=buffer, mode='r') as tar:
+                for member in tar.getmembers():
+                    if member.name.startswith('/') or '..' in member.name.split('/'):
+                        raise docker.errors.APIError('Invalid path %s in archive' % member.name)
+                kwargs = dict(filter='tar') if hasattr(tarfile, 'tar_filter') else dict()
+                tar.extractall(target, **kwargs)
+        return True
+
+    def get_archive(self, path, chunk_size=None, encode_stream=False):
+        """
+        Archive a path of the container directory.
+
+        :param path: the path to archive
+        :return: a tuple (generator of the tar blocks, stat dict)
+        """
+        self.reload()
+        local = self.path(path)
+        if not os.path.lexists(local):
+            raise docker.errors.NotFound('Could not find the file %s in container %s' % (path, self.id))
+        name = posixpath.basename(path.rstrip('/'))
+        if name:
+            entries = archive_entries([(local, name)])
+        else:
+            entries = archive_entries([(os.path.join(local, n), n) for n in sorted(os.listdir(local))])
+        info = os.lstat(local)
+        stat = dict(name=name or '/', size=info.st_size, mode=info.st_mode, mtime=info.st_mtime, linkTarget='')
+        # The tar is made at once, as the daemon does, and streamed afterwards
+        buffer = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+        for chunk in archive_stream(entries):
+            buffer.write(chunk)
+        buffer.seek(0)
+        return _read_chunks(buffer, chunk_size or CHUNK_SIZE), stat
+
+    def commit(self, repository=None, tag=None, message=None,  # pylint: disable=locally-disabled, too-many-arguments
+               author=None, changes=None, conf=None, **kwargs):
+        """
+        Register an image of the container. Its filesystem is not saved, the image runs the same service.
+
+        :return: the image
+        """
+        self.reload()
+        labels = dict(
+            c[len('LABEL '):].split('=', 1) for c in changes or [] if c.startswith('LABEL ') and '=' in c
+        )
+        name = '%s:%s' % (repository, tag or 'latest') if repository else None
+        return self._backend.register_image(name or _random_id(), labels=labels,
+                                            source=self._backend.image_name(self.image))
+
+    # Methods used by the services
+
+    def requested_ports(self):
+        """:return: a dict of the host port requested by container port, None for an ephemeral port"""
+        requested = dict()
+        for port, host_port in self._ports.items():
+            if isinstance(host_port, (list, tuple)):
+                host_port = host_port[-1]
+            requested[_port(port)] = int(host_port) if host_port else None
+        return requested
+
+    def bind(self, port, host_port):
+        """Report the host port bound to a container port."""
+        with self._changed:
+            self._host_ports[port] = host_port
+
+    def path(self, path):
+        """:return: the local path of a container path"""
+        local = os.path.normpath(os.path.join(self.root, path.lstrip('/')))
+        if local != self.root and not local.startswith(self.root + os.sep):
+            raise docker.errors.APIError('Path %s is outside of container %s' % (path, self.id))
+        return local
+
+    def write_log(self, data):
+        """Append some data to the container logs."""
+        with self._changed:
+            self._logs.append((time.time(), data))
+            self._changed.notify_all()
+
+    def set_health(self, health):
+        """Change the health status of the container."""
+        with self._changed:
+            if self.status in ('created', 'running'):
+                self._health = health
+                self._event('health_status: %s' % health)
+
+    def exited(self, exit_code):
+        """Report the exit of the service."""
+        with self._changed:
+            if self.status in ('created', 'running'):
+                self.status, self._exit_code = 'exited', exit_code
+                self._event('die', exitCode=str(exit_code))
+
+    def events(self, since=None):
+        """:return: a stream of the container events, ending when the container is removed"""
+        return _FollowStream(self._changed, self._events, lambda: self.removed, _timestamp(since))
+
+    def _event(self, action, **attributes):
+        self._events.append((time.time(), dict(
+            Type='container', Action=action, status=action, id=self.id, time=int(time.time()),
+            Actor=dict(ID=self.id, Attributes=dict(attributes, image=self.image, name=self.name))
+        )))
+        self._changed.notify_all()
+
+    def _wait_exit(self, timeout):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._changed:
+            while self.status == 'running':
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+
+class FakeImage(object):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Image of the fake backend, with the methods and attributes of the docker SDK images.
+    """
+    # pylint: disable=locally-disabled, unused-argument
+
+    def __init__(self, backend, image_id, labels=None, source=None):
+        self.id = image_id
+        self.short_id = image_id.split(':')[-1][:12]
+        self.tags = []
+        self.labels = dict(labels or {})
+        self.source = source
+        self._backend = backend
+        self._created = time.time()
+        self._tagged = self._created
+
+    def __repr__(self):
+        return '<FakeImage: %s>' % ', '.join(self.tags)
+
+    @property
+    def attrs(self):
+        """:return: the image attributes, as given by the docker inspect"""
+        return dict(
+            Id=self.id, RepoTags=list(self.tags), Config=dict(Labels=dict(self.labels)),
+            Created=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self._created)),
+            Metadata=dict(LastTagTime='%s.%06dZ' % (
+                time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self._tagged)), int(self._tagged % 1 * 1e6)
+            )),
+        )
+
+    def reload(self):
+        """Nothing to reload : the image attributes are always up to date."""
+
+    def tag(self, repository, tag=None, **kwargs):
+        """Give a new name to the image."""
+        self._backend.tag_image(self, '%s:%s' % (repository, tag or 'latest'))
+        return True
+
+
+class FakeBackend(Backend):
+    """
+    Backend keeping containers and images in memory, running services in-process.
+    """
+    name = 'fake'
+
+    def __init__(self, services=None, default=SimulatedService):
+        """
+        Class constructor for the fake backend.
+
+        :param services: a dict of the service factories by image, an image name without tag matching all its tags.
+                         A factory is a callable without arguments returning a :class:`FakeService`.
+        :param default: the factory of the service of the other images
+        """
+        self._services = dict()
+        self._default = default
+        self._containers = OrderedDict()
+        self._images = OrderedDict()
+        self._execs = dict()
+        self._lock = threading.RLock()
+        for image, factory in (services or {}).items():
+            self.register(image, factory)
+
+    def client(self, environment, max_pool_size):
+        return FakeClient(self)
+
+    def register(self, image, factory):
+        """
+        Register the service factory of an image.
+
+        :param image: the image name, without tag to match all its tags
+        :param factory: a callable without arguments returning a :class:`FakeService`
+        """
+        self._services[image] = factory
+
+    @property
+    def containers(self):
+        """:return: the list of the containers, removed ones excepted"""
+        with self._lock:
+            return list(self._containers.values())
+
+    def clear(self):
+        """Kill and remove all the containers and forget the images."""
+        for container in self.containers:
+            try:
+                container.remove(force=True)
+            except docker.errors.NotFound:
+                pass
+        with self._lock:
+            self._images.clear()
+            self._execs.clear()
+
+    # Methods used by the fake clients
+
+    def service(self, image):
+        """:return: a new service for an image"""
+        name = self.image_name(image)
+        for candidate in (name, _normalize(name), _repository(_normalize(name))):
+            if candidate in self._services:
+                return self._services[candidate]()
+        return self._default()
+
+    def add(self, container):
+        """:return: the container, once kept by the backend"""
+        with self._lock:
+            self._containers[container.id] = container
+        return container
+
+    def forget(self, container):
+        """Forget a removed container."""
+        with self._lock:
+            self._containers.pop(container.id, None)
+
+    def get(self, container_id):
+        """:return: a container by id, id prefix or name"""
+        with self._lock:
+            for container in self._containers.values():
+                if container.id.startswith(container_id) or container.name == container_id.lstrip('/'):
+                    return container
+        raise docker.errors.NotFound('No such container: %s' % container_id)
+
+    def image_name(self, image):
+        """:return: the name of an image given by id, the name of the image it has been committed from"""
+        registered = self.find_image(image)
+        if registered is None:
+            return image
+        return registered.source or (registered.tags[0] if registered.tags else image)
+
+    def image_id(self, name):
+        """:return: the id of an image, registered or not"""
+        with self._lock:
+            image = self.find_image(name)
+        return image.id if image else _image_id(_normalize(name))
+
+    def find_image(self, name):
+        """:return: an image by id or name, None when it is not registered"""
+        normalized = _normalize(name)
+        with self._lock:
+            for image in self._images.values():
+                if image.id == name or normalized in image.tags:
+                    return image
+        return None
+
+    def register_image(self, name, labels=None, source=None):
+        """:return: a new image, with a name taken from its previous image"""
+        image = FakeImage(self, _image_id('%s@%s' % (_normalize(name), time.time())), labels=labels, source=source)
+        with self._lock:
+            self._images[image.id] = image
+            self.tag_image(image, name)
+        return image
+
+    def tag_image(self, image, name):
+        """Give a name to an image, taking it from the image having it."""
+        name = _normalize(name)
+        with self._lock:
+            for other in self._images.values():
+                if name in other.tags:
+                    other.tags.remove(name)
+            image.tags.append(name)
+            image._tagged = time.time()  # pylint: disable=locally-disabled, protected-access
+
+    def remove_image(self, image_id):
+        """Forget an image given by id or name."""
+        with self._lock:
+            image = self.find_image(image_id)
+            if image is None:
+                raise docker.errors.ImageNotFound('No such image: %s' % image_id)
+            del self._images[image.id]
+
+    def images(self):
+        """:return: the list of the images"""
+        with self._lock:
+            return list(self._images.values())
+
+    def exec_create(self, container, command, environment, workdir):
+        """:return: the id of a new command execution in a container"""
+        exec_id = _random_id()
+        with self._lock:
+            self._execs[exec_id] = dict(container=container, command=command, environment=environment,
+                                        workdir=workdir, exit_code=None)
+        return exec_id
+
+    def exec_get(self, exec_id):
+        """:return: a command execution by id"""
+        with self._lock:
+            if exec_id not in self._execs:
+                raise docker.errors.NotFound('No such exec instance: %s' % exec_id)
+            return self._execs[exec_id]
+
+
+class FakeClient(object):
+    """
+    Client of the fake backend, with the methods used by docktors of the docker SDK client.
+    """
+    # pylint: disable=locally-disabled, unused-argument
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.containers = _FakeContainers(backend)
+        self.images = _FakeImages(backend)
+        self.api = _FakeAPI(backend)
+
+    def events(self, since=None, until=None, filters=None, decode=None):
+        """
+        Stream the events of a container, given with the ``container`` filter.
+
+        :return: a stream of events, ending when the container is removed
+        """
+        try:
+            container = self.backend.get((filters or {}).get('container') or '')
+        except docker.errors.NotFound:
+            return iter([])
+        events = container.events(since=since)
+        return events if decode else (json.dumps(e).encode('utf-8') for e in events)
+
+    def ping(self):
+        """:return: True, the fake daemon always answers"""
+        return True
+
+    def close(self):
+        """Nothing to close : the fake client has no connection."""
+
+
+class _FakeContainers(object):
+    """Containers collection of the fake client"""
+    # pylint: disable=locally-disabled, unused-argument
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, image, command=None, **kwargs):
+        """:return: a new container, not started"""
+        return self._backend.add(FakeContainer(self._backend, image, command=command, **kwargs))
+
+    def run(self, image, command=None, stdout=True,  # pylint: disable=locally-disabled, too-many-arguments
+            stderr=False, remove=False, detach=False, **kwargs):
+        """:return: a started container when detached, its logs once exited otherwise"""
+        container = self.create(image, command=command, **kwargs)
+        try:
+            container.start()
+        except Exception:
+            container.remove(force=True)
+            raise
+        if detach:
+            return container
+        container.wait()
+        logs = container.logs()
+        if remove:
+            container.remove()
+        return logs
+
+    def get(self, container_id):
+        """:return: a container by id, id prefix or name"""
+        return self._backend.get(container_id)
+
+    def list(self, all=False, filters=None, **kwargs):  # pylint: disable=locally-disabled, redefined-builtin
+        """:return: the containers matching the ``label`` and ``status`` filters"""
+        filters = filters or {}
+        labels = filters.get('label') or []
+        labels = [labels] if not isinstance(labels, (list, tuple)) else labels
+        statuses = filters.get('status') or ([] if all else ['running'])
+        statuses = [statuses] if not isinstance(statuses, (list, tuple)) else statuses
+        return [
+            c for c in self._backend.containers
+            if (not statuses or c.status in statuses) and _has_labels(c.labels, labels)
+        ]
+
+
+class _FakeImages(object):
+    """Images collection of the fake client"""
+    # pylint: disable=locally-disabled, unused-argument
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def get(self, name):
+        """:return: a registered image by id or name"""
+        image = self._backend.find_image(name)
+        if image is None:
+            raise docker.errors.ImageNotFound('No such image: %s' % name)
+        return image
+
+    def list(self, name=None, all=False, filters=None):  # pylint: disable=locally-disabled, redefined-builtin
+        """:return: the images of a repository matching the ``label`` filters"""
+        labels = (filters or {}).get('label') or []
+        labels = [labels] if not isinstance(labels, (list, tuple)) else labels
+        return [
+            i for i in self._backend.images()
+            if (name is None or _repository(name) in [_repository(t) for t in i.tags]) and _has_labels(i.labels, labels)
+        ]
+
+    def pull(self, repository, tag=None, **kwargs):
+        """:return: the image, registered when it is not yet"""
+        name = '%s:%s' % (repository, tag) if tag else repository
+        return self._backend.find_image(name) or self._backend.register_image(name)
+
+    def remove(self, image, force=False, noprune=False):
+        """Forget an image."""
+        self._backend.remove_image(image)
+
+
+class _FakeAPI(object):
+    """Low level API of the fake client"""
+    # pylint: disable=locally-disabled, unused-argument
+    base_url = FAKE_BASE_URL
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def pull(self, repository, tag=None, stream=False, decode=False, **kwargs):
+        """:return: the pull events of the image, registered when it is not yet"""
+        name = '%s:%s' % (repository, tag) if tag else repository
+        image = self._backend.find_image(name) or self._backend.register_image(name)
+        events = [
+            dict(status='Pulling from %s' % _repository(_normalize(name)), id=_normalize(name).rsplit(':', 1)[-1]),
+            dict(status='Digest: %s' % image.id),
+            dict(status='Status: Downloaded newer image for %s' % _normalize(name)),
+        ]
+        if not stream:
+            return '\n'.join(json.dumps(e) for e in events)
+        return iter(events) if decode else iter(json.dumps(e).encode('utf-8') for e in events)
+
+    def build(self, path=None, tag=None, fileobj=None, decode=False, **kwargs):
+        """:return: the build events of a new image, once the context has been read"""
+        if fileobj is not None:
+            for _ in [fileobj.read()] if hasattr(fileobj, 'read') else fileobj:
+                pass  # The context is consumed like the daemon does
+        image = self._backend.register_image(tag or _random_id())
+        events = [
+            dict(stream='Successfully built %s\n' % image.short_id),
+            dict(aux=dict(ID=image.id)),
+        ]
+        return iter(events) if decode else iter(json.dumps(e).encode('utf-8') for e in events)
+
+    def exec_create(self, container, cmd, stdout=True,  # pylint: disable=locally-disabled, too-many-arguments
+                    stderr=True, stdin=False, tty=False, privileged=False, user='', environment=None, workdir=None,
+                    detach_keys=None):
+        """:return: a dict with the ``Id`` of a new command execution"""
+        container = self._backend.get(getattr(container, 'id', container))
+        container.reload()
+        return dict(Id=self._backend.exec_create(container, cmd, environment, workdir))
+
+    def exec_start(  # pylint: disable=locally-disabled, too-many-arguments, redefined-outer-name
+            self, exec_id, detach=False, tty=False, stream=False, socket=False, demux=False):
+        """:return: the output of a command execution, or a stream of it"""
+        execution = self._backend.exec_get(exec_id.get('Id') if isinstance(exec_id, dict) else exec_id)
+        exit_code, output = execution['container'].exec_run(
+            execution['command'], environment=execution['environment'], workdir=execution['workdir'], demux=demux
+        )
+        execution['exit_code'] = exit_code
+        if not stream:
+            return output
+        return iter([output] if output and (not demux or output[0] or output[1]) else [])
+
+    def exec_inspect(self, exec_id):
+        """:return: a dict with the ``Running`` state and the ``ExitCode`` of a command execution"""
+        execution = self._backend.exec_get(exec_id.get('Id') if isinstance(exec_id, dict) else exec_id)
+        return dict(ID=exec_id, Running=execution['exit_code'] is None, ExitCode=execution['exit_code'])
+
+
+class _FollowStream(object):
+    """Stream of the items of a list growing under a condition, ending when it is closed or the list is complete"""
+
+    def __init__(self, condition, items, complete, since=None):
+        self._condition = condition
+        self._items = items
+        self._complete = complete
+        self._since = since
+        self._position = 0
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._condition:
+            while not self._closed:
+                while self._position < len(self._items):
+                    stamp, item = self._items[self._position]
+                    self._position += 1
+                    if self._since is None or stamp >= self._since:
+                        return item
+                if self._complete():
+                    break
+                self._condition.wait()
+        raise StopIteration()
+
+    next = __next__  # Python 2
+
+    def close(self):
+        """End the stream."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def _read_chunks(buffer, chunk_size):
+    with buffer:
+        for chunk in iter(lambda: buffer.read(chunk_size), b''):
+            yield chunk
+
+
+def _has_labels(labels, filters):
+    """Check the labels match all the label filters, given as ``key`` or ``key=value``."""
+    for label in filters:
+        key, _, value = label.partition('=')
+        if key not in labels or (value and labels[key] != value):
+            return False
+    return True
+
+
+def _timestamp(since):
+    if since is None or isinstance(since, (int, float)):
+        return since
+    return time.mktime(since.timetuple())  # datetime
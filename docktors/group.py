@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Group module.
+
+This module is design to define a wrapper starting several containers, with dependencies between them.
+"""
+import logging
+from collections import OrderedDict
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .core import DecWrapper
+from .wdocker import DockerContainer, DockerContainerError
+
+logger = logging.getLogger(__name__)
+
+DOCKER_GROUP_PROPS = dict(
+    containers=dict(
+        argtype=dict,
+        mandatory=True,
+        alternatives=[
+            ([(str, dict)], OrderedDict)
+        ]
+    ),
+    max_workers=dict(argtype=int),
+)
+
+
+class DockerGroup(DecWrapper):
+    """
+    Docker group class. This class will start several containers and shutdown them.
+
+    Each container is defined by its name and the options of :class:`docktors.wdocker.DockerContainer`, with an
+    additional ``depends_on`` option listing the names of the containers to start before it. Independent containers
+    are started in parallel and all the containers are shutdown in parallel.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Class constructor to start and shutdown a group of containers.
+        """
+        super(DockerGroup, self).__init__(
+            name='docker-group',
+            inputs=kwargs,
+            props=DOCKER_GROUP_PROPS
+        )
+        self._wrappers, self._dependencies = OrderedDict(), OrderedDict()
+        for name, spec in self.p('containers').items():
+            spec = dict(spec)
+            self._dependencies[name] = frozenset(spec.pop('depends_on', []))
+            self._wrappers[name] = DockerContainer(**spec)
+        self._check_dependencies()
+
+    def _check_dependencies(self):
+        for name, dependencies in self._dependencies.items():
+            unknown = sorted(d for d in dependencies if d not in self._dependencies)
+            if unknown:
+                raise SyntaxError("[docker-group] : Container '{name}' depends on unknown containers {unknown}.".format(
+                    name=name, unknown=unknown
+                ))
+        ordered = self.start_order()
+        cycle = [name for name in self._dependencies if name not in ordered]
+        if cycle:
+            raise SyntaxError("[docker-group] : Cyclic dependencies between containers {cycle}.".format(cycle=cycle))
+
+    def start_order(self):
+        """
+        Retrieve a start order of the containers respecting their dependencies.
+
+        :return: the list of container names
+        """
+        ordered = []
+        remaining = OrderedDict(self._dependencies)
+        while True:
+            startable = [name for name, deps in remaining.items() if deps.issubset(ordered)]
+            if not startable:
+                return ordered
+            for name in startable:
+                ordered.append(name)
+                del remaining[name]
+
+    def get_args(self):
+        calls = self._state.get('calls')
+        return [OrderedDict((name, self._member_args(name, calls[name])) for name in self._wrappers)]
+
+    def start(self):
+        """
+        Start the containers, in parallel as soon as their dependencies are ready.
+
+        :return: a dict with the started containers by name
+        """
+        self._state.push(dict(calls=self._start_members()))
+        return self.get_args()[0]
+
+    def shutdown(self):
+        """
+        Shutdown all the containers in parallel.
+        """
+        errors = self._shutdown_members(self._state.pop()['calls'])
+        if errors:
+            raise DockerContainerError('[docker-group] Unable to shutdown containers %s' % sorted(errors), errors)
+
+    def _member_args(self, name, call):
+        wrapper = self._wrappers[name]
+        wrapper.attach_call(call)
+        try:
+            return wrapper.get_args()[0]
+        finally:
+            wrapper.detach_call()
+
+    def _start_member(self, name):
+        logger.debug('[docker-group] Starting container \'%s\'', name)
+        wrapper = self._wrappers[name]
+        wrapper.start()
+        return wrapper.detach_call()
+
+    def _shutdown_member(self, name, call):
+        logger.debug('[docker-group] Shutdown container \'%s\'', name)
+        wrapper = self._wrappers[name]
+        wrapper.attach_call(call)
+        wrapper.shutdown()
+
+    def _start_members(self):
+        calls, futures, error = OrderedDict(), dict(), None
+        remaining = OrderedDict(self._dependencies)
+        with ThreadPoolExecutor(max_workers=self.p('max_workers') or len(self._wrappers)) as executor:
+            while remaining or futures:
+                startable = [name for name, deps in remaining.items() if deps.issubset(calls)] if not error else []
+                for name in startable:
+                    futures[executor.submit(self._start_member, name)] = name
+                    del remaining[name]
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        calls[name] = future.result()
+                    except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+                        logger.error('[docker-group] Unable to start container \'%s\' : %s', name, str(ex))
+                        error = error or ex
+        if error:
+            self._shutdown_members(calls)
+            raise error
+        return calls
+
+    def _shutdown_members(self, calls):
+        errors = dict()
+        if not calls:
+            return errors
+        with ThreadPoolExecutor(max_workers=self.p('max_workers') or len(calls)) as executor:
+            futures = dict((executor.submit(self._shutdown_member, name, call), name) for name, call in calls.items())
+        for future, name in futures.items():
+            if future.exception() is not None:
+                errors[name] = future.exception()
+        return errors
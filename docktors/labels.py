@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Labels module.
+
+This module is design to define the labels set on every container created by docktors, so the containers of a dead
+process can be found and cleaned up.
+"""
+import errno
+import hashlib
+import json
+import os
+import socket
+import time
+
+# Labels set on the containers
+OWNER_PID_LABEL = 'docktors.pid'
+OWNER_HOST_LABEL = 'docktors.host'
+SPEC_LABEL = 'docktors.spec'
+CREATED_LABEL = 'docktors.created'
+
+
+def spec_hash(spec):
+    """
+    Compute a hash of a container specification, independent of the order of its options.
+
+    :param spec: a dict with the options defining the container
+    :return: the hexadecimal hash
+    """
+    content = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def container_labels(spec):
+    """
+    Build the labels of a new container, owned by the current process.
+
+    :param spec: a dict with the options defining the container
+    :return: a dict of labels
+    """
+    return {
+        OWNER_PID_LABEL: str(os.getpid()),
+        OWNER_HOST_LABEL: socket.gethostname(),
+        SPEC_LABEL: spec_hash(spec),
+        CREATED_LABEL: '%.3f' % time.time(),
+    }
+
+
+def is_running(pid):
+    """
+    Check if a process of the local host is running, such as the owner of a container.
+
+    :param pid: the process id
+    :return: True when running
+    """
+    try:
+        os.kill(pid, 0)
+    except OSError as ex:
+        return ex.errno == errno.EPERM
+    return True
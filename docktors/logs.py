@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Logs module.
+
+This module is design to capture the raw logs stream of a container in a bounded buffer, and to search patterns in it
+without decoding it line by line.
+"""
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Maximum bytes of an incomplete line kept between 2 chunks
+MAX_PARTIAL_LINE = 64 * 1024
+
+# Default maximum bytes of logs kept in memory by container
+MAX_BUFFER_SIZE = 256 * 1024
+
+
+def compile_regex(pattern):
+    """
+    Compile a regular expression to search in raw logs.
+
+    :param pattern: the regular expression
+    :return: the compiled regular expression on bytes
+    :raise re.error: when the regular expression is invalid
+    """
+    return re.compile(pattern.encode('utf-8'))
+
+
+class LogMatcher(object):
+    """
+    Log matcher class. This class searches several literal strings and regular expressions in the chunks of a logs
+    stream. Each pattern is compiled on its own, so its flags, backreferences and group names only apply to itself,
+    and is no more searched once found.
+
+    The incomplete last line of a chunk is kept and searched again with the next chunk, so a pattern written across
+    2 chunks is found.
+    """
+
+    def __init__(self, literals=(), regexes=()):
+        """
+        Class constructor to search patterns.
+
+        :param literals: the strings to search
+        :param regexes: the regular expressions to search
+        :raise re.error: when a regular expression is invalid
+        """
+        self._patterns = dict(('l%d' % i, re.compile(re.escape(p.encode('utf-8')))) for i, p in enumerate(literals))
+        self._patterns.update(('r%d' % i, compile_regex(p)) for i, p in enumerate(regexes))
+        self._names = dict(('l%d' % i, p) for i, p in enumerate(literals))
+        self._names.update(('r%d' % i, p) for i, p in enumerate(regexes))
+        self._partial = b''
+
+    @property
+    def remaining(self):
+        """
+        The patterns not found yet.
+        """
+        return [self._names[key] for key in sorted(self._patterns)]
+
+    def is_matched(self):
+        """
+        Check if all the patterns have been found.
+
+        :return: True when all found
+        """
+        return not self._patterns
+
+    def feed(self, chunk):
+        """
+        Search the patterns in a new chunk of logs.
+
+        :param chunk: the raw bytes of logs
+        :return: True when all the patterns have been found
+        """
+        if self.is_matched():
+            return True
+        data = self._partial + chunk if self._partial else chunk
+        found = [key for key, regex in self._patterns.items() if regex.search(data)]
+        if found:
+            logger.debug('Logs %s have been found', [self._names[key] for key in sorted(found)])
+            for key in found:
+                del self._patterns[key]
+        # Searching again the incomplete line is enough as the patterns are not expected across lines
+        self._partial = data[data.rfind(b'\n') + 1:][-MAX_PARTIAL_LINE:]
+        return self.is_matched()
+
+
+class RotatingLogFile(object):
+    """
+    Rotating log file class. This class writes raw logs in a file, renamed with a numeric suffix once it reaches its
+    maximum size, as :class:`logging.handlers.RotatingFileHandler` does.
+    """
+
+    def __init__(self, path, max_bytes, backup_count):
+        """
+        Class constructor to spill logs in files.
+
+        :param path: the path of the file
+        :param max_bytes: the maximum size of a file
+        :param backup_count: the number of rotated files to keep
+        """
+        self.path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._stream = open(path, 'ab')
+
+    def write(self, chunk):
+        """
+        Write a chunk of logs, rotating the file when it is full.
+
+        :param chunk: the raw bytes of logs
+        """
+        if self._stream.tell() and self._stream.tell() + len(chunk) > self._max_bytes:
+            self._rotate()
+        self._stream.write(chunk)
+        self._stream.flush()
+
+    def close(self):
+        """
+        Close the current file.
+        """
+        self._stream.close()
+
+    def _rotate(self):
+        self._stream.close()
+        for i in range(self._backup_count - 1, 0, -1):
+            if os.path.exists('%s.%d' % (self.path, i)):
+                os.rename('%s.%d' % (self.path, i), '%s.%d' % (self.path, i + 1))
+        if self._backup_count > 0:
+            os.rename(self.path, '%s.1' % self.path)
+        self._stream = open(self.path, 'wb')
+
+
+class LogCapture(object):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Log capture class. This class follows the logs stream of a container in a thread and keeps its last bytes in a
+    ring buffer of a fixed size, optionally spilling all of them in a :class:`RotatingLogFile`.
+
+    The captured logs can be read at any time without requesting the docker daemon again.
+    """
+
+    def __init__(self, container, image, since=None, max_size=MAX_BUFFER_SIZE, spill=None):
+        """
+        Class constructor to capture the logs of a container.
+
+        :param container: the container to capture the logs
+        :param image: the image name, for logging purpose
+        :param since: the timestamp of the first logs to capture
+        :param max_size: the maximum number of bytes kept in memory
+        :param spill: the :class:`RotatingLogFile` where to write all the logs
+        """
+        self._container = container
+        self._image = image
+        self._since = since
+        self._max_size = max_size
+        self._spill = spill
+        self._chunks = deque()
+        self._size, self._total, self._ended = 0, 0, False
+        self._stream = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._capture, name='docktors-logs-%s' % image)
+        self._thread.daemon = True
+
+    def start(self):
+        """
+        Start the capture thread.
+
+        :return: the capture
+        """
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Stop the capture.
+        """
+        with self._condition:
+            self._ended = True
+            self._condition.notify_all()
+        if self._stream is not None and hasattr(self._stream, 'close'):
+            self._stream.close()
+
+    def join(self, timeout=None):
+        """
+        Wait for the end of the logs stream, so the last logs of a stopped container are captured.
+
+        :param timeout: the maximum time to wait in seconds
+        :return: True when the stream has ended
+        """
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def tail(self, size=None):
+        """
+        Read the last captured logs.
+
+        :param size: the maximum number of bytes to read (default: all the buffer)
+        :return: the raw bytes of logs
+        """
+        with self._condition:
+            data = b''.join(self._chunks)
+        return data[-size:] if size else data
+
+    def read(self, position=0):
+        """
+        Read the logs captured after a position, without waiting.
+
+        :param position: the number of bytes already read since the start of the capture
+        :return: a tuple with the raw bytes of logs, the new position and True when the stream has ended
+        """
+        with self._condition:
+            return self._read(position)
+
+    def follow(self):
+        """
+        Iterate on the captured logs, waiting for new ones until the end of the stream.
+
+        :return: a generator of raw bytes of logs
+        """
+        position, ended = 0, False
+        while not ended:
+            with self._condition:
+                while self._total <= position and not self._ended:
+                    self._condition.wait()
+                data, position, ended = self._read(position)
+            if data:
+                yield data
+
+    def _read(self, position):
+        first = self._total - self._size
+        if position < first:
+            logger.debug('[%s] %d bytes of logs have been dropped before being read', self._image, first - position)
+        start = max(position - first, 0)
+        data = b''.join(self._chunks)[start:] if start < self._size else b''
+        return data, self._total, self._ended
+
+    def _append(self, chunk):
+        if self._spill is not None:
+            self._spill.write(chunk)
+        chunk = chunk[-self._max_size:]
+        with self._condition:
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            self._total += len(chunk)
+            while self._size > self._max_size:
+                overflow = self._size - self._max_size
+                if len(self._chunks[0]) > overflow:
+                    self._chunks[0] = self._chunks[0][overflow:]
+                    self._size -= overflow
+                else:
+                    self._size -= len(self._chunks.popleft())
+            self._condition.notify_all()
+
+    def _capture(self):
+        try:
+            kwargs = dict(stream=True, follow=True) if self._since is None else \
+                dict(stream=True, follow=True, since=self._since)
+            self._stream = self._container.logs(**kwargs)
+            for chunk in self._stream:
+                if self._ended:
+                    break
+                self._append(chunk)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.debug('[%s] Logs capture ends on error : %s', self._image, str(ex))
+        finally:
+            if self._spill is not None:
+                self._spill.close()
+            with self._condition:
+                self._ended = True
+                self._condition.notify_all()
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics module.
+
+This module is design to measure the phases of the containers life, as timing spans sent to hooks. The spans are named
+after the phase they measure :
+
+- ``pull`` : the pull of an image by the warmup
+- ``build`` : the build of an image, or the check that it is up to date
+- ``start`` : the whole start of a container, made of the ``reuse``, ``snapshot``, ``run``, ``files``, ``wait`` and
+  ``ready`` phases
+- ``wait.<probe>`` : the wait for a readiness probe (``wait.log``, ``wait.tcp:5432``, ...)
+- ``eager`` : the wait of a call for the end of the start made in background by the ``eager`` option
+- ``function`` : the body of the decorated function
+- ``shutdown`` : the shutdown of a container, made of the ``reset``, ``stop`` and ``remove`` phases
+
+Two exporters are provided : :class:`JsonLinesExporter` writes each span as a JSON line and
+:class:`PrometheusExporter` writes the histograms of the durations by image and phase in a file for the textfile
+collector of the node exporter. They can also be enabled with the ``DOCKTORS_METRICS_JSONL`` and
+``DOCKTORS_METRICS_PROMETHEUS`` environment variables, giving the path of the file to write.
+"""
+import atexit
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the histograms buckets
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+PROMETHEUS_DURATION_METRIC = 'docktors_phase_duration_seconds'
+PROMETHEUS_ERRORS_METRIC = 'docktors_phase_errors_total'
+
+_hooks = []
+_hooks_lock = threading.Lock()
+_exit_registered = False
+
+
+class Span(object):
+    """
+    Timing span of a phase.
+    """
+
+    def __init__(self, name, image, start, duration,  # pylint: disable=locally-disabled, too-many-arguments
+                 attributes=None, error=None):
+        """
+        Class constructor for a span.
+
+        :param name: the phase name
+        :param image: the image of the container
+        :param start: the timestamp of the beginning of the phase
+        :param duration: the duration of the phase in seconds
+        :param attributes: a dict with additional information on the phase
+        :param error: the name of the error raised by the phase, None when it succeeds
+        """
+        self.name = name
+        self.image = image
+        self.start = start
+        self.duration = duration
+        self.attributes = attributes or dict()
+        self.error = error
+
+    def to_dict(self):
+        """
+        :return: the span as a dict
+        """
+        return dict(name=self.name, image=self.image, start=self.start, duration=self.duration,
+                    attributes=self.attributes, error=self.error)
+
+    def __repr__(self):
+        return 'Span(name=%r, image=%r, duration=%.3f)' % (self.name, self.image, self.duration)
+
+
+class MetricsHook(object):
+    """
+    Base class of the hooks receiving the spans. The hooks are called from the thread running the phase.
+    """
+
+    def on_span(self, span_):
+        """
+        Receive an ended span.
+
+        :param span_: the :class:`Span`
+        """
+        raise NotImplementedError("Abstract method should be implemented")
+
+    def close(self):
+        """
+        Release the hook resources. Called when the hook is removed and when the interpreter exits.
+        """
+        pass
+
+
+class HistogramHook(MetricsHook):
+    """
+    Hook aggregating the durations of the spans in histograms, by image and phase.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Class constructor for the histograms.
+
+        :param buckets: the upper bounds of the buckets in seconds
+        """
+        self._buckets = tuple(sorted(buckets))
+        self._series = dict()
+        self._lock = threading.Lock()
+
+    def on_span(self, span_):
+        with self._lock:
+            series = self._series.setdefault((span_.image or '', span_.name), dict(
+                buckets=[0] * len(self._buckets), sum=0.0, count=0, errors=0
+            ))
+            for i, bound in enumerate(self._buckets):
+                if span_.duration <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += span_.duration
+            series['count'] += 1
+            if span_.error is not None:
+                series['errors'] += 1
+
+    def histograms(self):
+        """
+        Retrieve the histograms.
+
+        :return: a dict by (image, phase) of dicts with the cumulative ``buckets`` as a list of tuples
+                 (upper bound, count), the ``sum`` of the durations, the ``count`` of spans and of ``errors``
+        """
+        with self._lock:
+            return dict(
+                (key, dict(series, buckets=list(zip(self._buckets, series['buckets']))))
+                for key, series in self._series.items()
+            )
+
+
+class PrometheusExporter(HistogramHook):
+    """
+    Hook writing the histograms in a file using the Prometheus text format. The file is written when the hook is
+    closed or by calling write().
+    """
+
+    def __init__(self, path, buckets=DEFAULT_BUCKETS):
+        """
+        Class constructor for the exporter.
+
+        :param path: the path of the file, usually in the directory of the node exporter textfile collector
+        :param buckets: the upper bounds of the buckets in seconds
+        """
+        super(PrometheusExporter, self).__init__(buckets=buckets)
+        self._path = path
+
+    def write(self):
+        """
+        Write the histograms, atomically, in the file.
+        """
+        lines = [
+            '# HELP %s Duration of the docktors container phases.' % PROMETHEUS_DURATION_METRIC,
+            '# TYPE %s histogram' % PROMETHEUS_DURATION_METRIC,
+        ]
+        histograms = sorted(self.histograms().items())
+        for (image, phase), series in histograms:
+            labels = 'image="%s",phase="%s"' % (_escape(image), _escape(phase))
+            for bound, count in series['buckets']:
+                lines.append('%s_bucket{%s,le="%s"} %d' % (PROMETHEUS_DURATION_METRIC, labels, repr(bound), count))
+            lines.append('%s_bucket{%s,le="+Inf"} %d' % (PROMETHEUS_DURATION_METRIC, labels, series['count']))
+            lines.append('%s_sum{%s} %s' % (PROMETHEUS_DURATION_METRIC, labels, repr(series['sum'])))
+            lines.append('%s_count{%s} %d' % (PROMETHEUS_DURATION_METRIC, labels, series['count']))
+        lines += [
+            '# HELP %s Number of failed docktors container phases.' % PROMETHEUS_ERRORS_METRIC,
+            '# TYPE %s counter' % PROMETHEUS_ERRORS_METRIC,
+        ]
+        for (image, phase), series in histograms:
+            lines.append('%s{image="%s",phase="%s"} %d' % (
+                PROMETHEUS_ERRORS_METRIC, _escape(image), _escape(phase), series['errors']
+            ))
+        # The collector may read the file at any time : it is replaced once fully written
+        temp_path = '%s.%d.tmp' % (self._path, os.getpid())
+        with open(temp_path, 'w') as output:
+            output.write('\n'.join(lines) + '\n')
+        os.rename(temp_path, self._path)
+
+    def close(self):
+        self.write()
+
+
+class JsonLinesExporter(MetricsHook):
+    """
+    Hook appending each span as a JSON line in a file.
+    """
+
+    def __init__(self, path):
+        """
+        Class constructor for the exporter.
+
+        :param path: the path of the file
+        """
+        self._path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def on_span(self, span_):
+        line = json.dumps(span_.to_dict(), sort_keys=True)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path, 'a')
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def add_hook(hook):
+    """
+    Register a hook receiving the spans. The hook is closed when the interpreter exits.
+
+    :param hook: the :class:`MetricsHook`
+    :return: the hook
+    """
+    global _exit_registered  # pylint: disable=locally-disabled, global-statement
+    with _hooks_lock:
+        _hooks.append(hook)
+        if not _exit_registered:
+            atexit.register(_close_hooks)
+            _exit_registered = True
+    return hook
+
+
+def remove_hook(hook):
+    """
+    Unregister and close a hook.
+
+    :param hook: the :class:`MetricsHook`
+    """
+    with _hooks_lock:
+        if hook not in _hooks:
+            return
+        _hooks.remove(hook)
+    hook.close()
+
+
+def record(name, image, duration, start=None, error=None, **attributes):
+    """
+    Send a span measured elsewhere to the hooks.
+
+    :param name: the phase name
+    :param image: the image of the container
+    :param duration: the duration of the phase in seconds
+    :param start: the timestamp of the beginning of the phase (default: now minus the duration)
+    :param error: the name of the error raised by the phase
+    :param attributes: additional information on the phase
+    """
+    if not _hooks:
+        return
+    span_ = Span(name, image, time.time() - duration if start is None else start, duration, attributes, error)
+    for hook in list(_hooks):
+        try:
+            hook.on_span(span_)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Metrics hook %s fails on span %s : %s', image, hook, name, str(ex))
+
+
+@contextlib.contextmanager
+def span(name, image, **attributes):
+    """
+    Measure a phase and send its span to the hooks. Nothing is measured when there is no hook.
+
+    :param name: the phase name
+    :param image: the image of the container
+    :param attributes: additional information on the phase
+    """
+    if not _hooks:
+        yield
+        return
+    start, error = time.time(), None
+    try:
+        yield
+    except BaseException as ex:
+        error = type(ex).__name__
+        raise
+    finally:
+        record(name, image, time.time() - start, start=start, error=error, **attributes)
+
+
+def _close_hooks():
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook.close()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('Unable to close metrics hook %s : %s', hook, str(ex))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+if os.environ.get('DOCKTORS_METRICS_JSONL'):
+    add_hook(JsonLinesExporter(os.environ['DOCKTORS_METRICS_JSONL']))
+if os.environ.get('DOCKTORS_METRICS_PROMETHEUS'):
+    add_hook(PrometheusExporter(os.environ['DOCKTORS_METRICS_PROMETHEUS']))
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Pool module.
+
+This module is design to define a wrapper keeping several ready containers of the same specification in reserve.
+"""
+import atexit
+import logging
+import re
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from .core import DecWrapper
+from .logs import compile_regex
+from .warmup import declare
+from .wdocker import DockerContainer, DockerContainerError, DOCKER_CONTAINER_PROPS, EAGER_DECORATION, EAGER_WARMUP
+
+logger = logging.getLogger(__name__)
+
+DOCKER_POOL_PROPS = dict(
+    pool_size=dict(argtype=int, default=1),
+    pool_max_size=dict(argtype=int),
+    pool_refill_workers=dict(argtype=int, default=1),
+    pool_recycle=dict(argtype=bool, default=False),
+)
+
+
+class DockerContainerPool(DecWrapper):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Docker container pool class.
+
+    This class keeps ``pool_size`` started and ready containers in reserve. Each call checks out one of them and
+    the pool is refilled in background by ``pool_refill_workers`` threads, without ever exceeding ``pool_max_size``
+    containers. Once the call is over, the container is either shutdown or, when ``pool_recycle`` is set, put back
+    in the pool.
+
+    Outside of a decorator, map() spreads items across several containers of the pool.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Class constructor to create the pool. No container is started until the first checkout or a call to fill().
+        """
+        props = dict(DOCKER_CONTAINER_PROPS)
+        props.update(DOCKER_POOL_PROPS)
+        super(DockerContainerPool, self).__init__(
+            name='docker-pool',
+            inputs=kwargs,
+            props=props
+        )
+        if self.p('keep_alive'):
+            raise SyntaxError("[docker-pool] : Option 'keep_alive' cannot be used with a pool.")
+        if self.p('eager') not in (None, EAGER_DECORATION, EAGER_WARMUP):
+            raise SyntaxError("[docker-pool] : Option 'eager' should be True, False or '%s'." % EAGER_WARMUP)
+        for regex in self.p('wait_for_log_regex') or []:
+            try:
+                compile_regex(regex)
+            except re.error as ex:
+                raise SyntaxError(
+                    "[docker-pool] : Option 'wait_for_log_regex' has an invalid regex '%s' : %s" % (regex, ex)
+                )
+        declare(self.p('image'))
+        self._spec = dict((k, v) for k, v in kwargs.items() if k not in DOCKER_POOL_PROPS)
+        self._size = self.p('pool_size')
+        self._max_size = max(self.p('pool_max_size') or self._size, self._size)
+        self._executor = None
+        self._refill_workers = self.p('pool_refill_workers')
+        self._close_registered = False
+        self._condition = threading.Condition()
+        self._ready = []
+        self._pending = 0
+        self._waiting = 0
+        self._checked_out = 0
+        self._error = None
+        self._closed = False
+        self._stats = dict(hits=0, misses=0, wait_time=0.0, started=0, failures=0)
+
+    def get_args(self):
+        return self._state.get('wrapper').get_args()
+
+    def span_label(self):
+        return self.p('image')
+
+    def start(self):
+        """
+        Checkout a ready container from the pool.
+        """
+        wrapper = self.checkout()
+        self._state.push(dict(wrapper=wrapper))
+        return wrapper.get_container()
+
+    def shutdown(self):
+        """
+        Give back the checked out container to the pool.
+        """
+        self.checkin(self._state.pop()['wrapper'])
+
+    def map(self, func, items, workers=None):
+        """
+        Process items with the containers of the pool. Each worker thread checks out a container, on which it calls
+        the function for the items until there is no more, and gives back the container.
+
+        The containers of the workers are started in parallel. The items are consumed lazily and the results are
+        yielded as soon as they are available, in completion order. The first error raised by the function stops the
+        workers and is raised by the generator.
+
+        :param func: the function called with a started container and an item
+        :param items: an iterable of items
+        :param workers: the number of workers, and so of containers (default: ``pool_max_size``)
+        :return: a generator of the function results
+        """
+        workers = workers or self._max_size
+        items, lock, stop = iter(items), threading.Lock(), threading.Event()
+        results = queue.Queue(maxsize=2 * workers)
+        with self._condition:
+            self._grow_refill_workers(min(workers, self._max_size))
+        threads = [
+            threading.Thread(target=self._map_worker, args=(func, items, lock, results, stop),
+                             name='docktors-map-%s-%d' % (self.p('image'), i))
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            running = workers
+            while running:
+                done, result, error = results.get()
+                if done:
+                    running -= 1
+                elif error is not None:
+                    _reraise(error)
+                else:
+                    yield result
+        finally:
+            stop.set()
+            # Unblock the workers waiting for room in the results queue
+            while any(t.is_alive() for t in threads):
+                try:
+                    results.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+
+    def _map_worker(self, func, items, lock, results, stop):
+        wrapper = None
+        try:
+            while not stop.is_set():
+                with lock:
+                    item = next(items, _END)
+                if item is _END:
+                    break
+                # The container is only checked out once there is an item to process
+                if wrapper is None:
+                    wrapper = self.checkout()
+                results.put((False, func(wrapper.get_args()[0], item), None))
+        except Exception:  # pylint: disable=locally-disabled, broad-except
+            results.put((False, None, sys.exc_info()))
+        finally:
+            if wrapper is not None:
+                self.checkin(wrapper)
+            results.put((True, None, None))
+
+    def stats(self):
+        """
+        Retrieve the pool statistics.
+
+        :return: a dict with the number of ``hits`` and ``misses``, the total ``wait_time`` in seconds, the number
+                 of ``started`` and ``failures`` containers and the current ``ready`` and ``checked_out`` counts.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update(ready=len(self._ready), checked_out=self._checked_out)
+            return stats
+
+    def fill(self):
+        """
+        Start the containers missing in the pool reserve without waiting for them.
+        """
+        with self._condition:
+            self._refill()
+
+    def prestart(self):
+        """
+        Start the containers of the pool reserve in background, see fill().
+        """
+        self.fill()
+
+    def checkout(self):
+        """
+        Retrieve a ready container wrapper from the pool. Wait for one when the reserve is empty.
+
+        :return: a started :class:`DockerContainer`, with its call attached to the current thread
+        """
+        begin = time.time()
+        with self._condition:
+            hit = bool(self._ready)
+            self._stats['hits' if hit else 'misses'] += 1
+            self._waiting += 1
+            try:
+                while not self._ready:
+                    if self._closed:
+                        raise DockerContainerError('[%s] Pool has been closed' % self.p('image'))
+                    if self._error is not None:
+                        error, self._error = self._error, None
+                        raise DockerContainerError('[%s] Unable to start a container for the pool' % self.p('image'),
+                                                   error)
+                    self._refill()
+                    self._condition.wait()
+            finally:
+                self._waiting -= 1
+            wrapper, call = self._ready.pop(0)
+            self._checked_out += 1
+            self._stats['wait_time'] += time.time() - begin
+            self._refill()
+        wrapper.attach_call(call)
+        logger.debug('[%s] Container %s checked out from pool (hit=%s)', self.p('image'), wrapper.get_container().id,
+                     hit)
+        return wrapper
+
+    def checkin(self, wrapper):
+        """
+        Give back a container wrapper retrieved from checkout(). A recycled container is reset before being put back.
+
+        :param wrapper: the :class:`DockerContainer` to give back, with its call attached to the current thread
+        """
+        container = wrapper.get_container()
+        with self._condition:
+            self._checked_out -= 1
+            recycle = self.p('pool_recycle') and not self._closed and len(self._ready) < self._size
+        if recycle:
+            container.reload()
+            recycle = container.status == 'running' and self._reset(wrapper)
+        if recycle:
+            call = wrapper.detach_call()
+            with self._condition:
+                self._ready.append((wrapper, call))
+                self._condition.notify()
+            return
+        wrapper.shutdown()
+        with self._condition:
+            self._refill()
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Shutdown all the containers in reserve. The checked out containers will be shutdown on checkin.
+        """
+        with self._condition:
+            self._closed = True
+            ready, self._ready = self._ready, []
+            executor, self._executor = self._executor, None
+            self._condition.notify_all()
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for wrapper, call in ready:
+            wrapper.attach_call(call)
+            wrapper.shutdown()
+
+    def _refill(self):
+        """Schedule container starts. Must be called with the condition acquired."""
+        if self._closed:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._refill_workers)
+            if not self._close_registered:
+                atexit.register(self.close)
+                self._close_registered = True
+        available = len(self._ready) + self._pending
+        wanted = max(self._size, self._waiting) - available
+        for _ in range(min(wanted, self._max_size - available - self._checked_out)):
+            self._pending += 1
+            self._executor.submit(self._start_one)
+
+    def _grow_refill_workers(self, count):
+        """Use at least ``count`` threads to refill the pool. Must be called with the condition acquired."""
+        if count <= self._refill_workers:
+            return
+        self._refill_workers = count
+        if self._executor is not None:
+            # The starts already scheduled are still run by the previous executor
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _start_one(self):
+        wrapper = DockerContainer(**self._spec)
+        try:
+            wrapper.start()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to start a container for the pool : %s', self.p('image'), str(ex))
+            with self._condition:
+                self._pending -= 1
+                self._stats['failures'] += 1
+                if self._waiting:
+                    self._error = ex
+                self._condition.notify_all()
+            return
+        call = wrapper.detach_call()
+        with self._condition:
+            self._pending -= 1
+            self._stats['started'] += 1
+            # Only the failure of the latest start is raised to the waiting checkouts
+            self._error = None
+            if not self._closed:
+                self._ready.append((wrapper, call))
+                self._condition.notify()
+                return
+        wrapper.attach_call(call)
+        wrapper.shutdown()
+
+    def _reset(self, wrapper):
+        try:
+            wrapper.reset()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to reset a container for the pool : %s', self.p('image'), str(ex))
+            return False
+        return True
+
+
+# Marker of the end of the items to map
+_END = object()
+
+
+def _reraise(exc_info):
+    """Raise again an error caught in another thread, with its traceback when possible."""
+    if hasattr(exc_info[1], 'with_traceback'):
+        raise exc_info[1].with_traceback(exc_info[2])
+    raise exc_info[1]
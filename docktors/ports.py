@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Ports module.
+
+This module is design to allocate free host ports from a range, so several containers publishing the same ports can
+run at the same time. The allocated ports are reserved for the process until their container is stopped.
+"""
+import logging
+import random
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PortAllocationError(Exception):
+    """
+    Error raised when there is not enough free ports in a range.
+    """
+    pass
+
+
+class PortAllocator(object):
+    """
+    Port allocator class. This class keeps the host ports reserved by the containers of the process.
+    """
+
+    def __init__(self):
+        """
+        Class constructor to allocate ports.
+        """
+        self._owners = dict()
+        self._lock = threading.Lock()
+
+    def allocate(self, count, first, last, owner=None):
+        """
+        Reserve free host ports in a range. The range is scanned from a random port, so the processes sharing a range
+        don't compete for the same ports.
+
+        :param count: the number of ports
+        :param first: the first port of the range
+        :param last: the last port of the range
+        :param owner: the owner of the ports, see assign()
+        :return: the list of ports
+        """
+        size = last - first + 1
+        offset = random.randrange(size) if size > 0 else 0
+        with self._lock:
+            ports = []
+            for i in range(size):
+                port = first + (offset + i) % size
+                if port not in self._owners and _is_free(port):
+                    ports.append(port)
+                    if len(ports) == count:
+                        break
+            if len(ports) < count:
+                raise PortAllocationError('Only {free} free ports in range {first}-{last}, {count} requested'.format(
+                    free=len(ports), first=first, last=last, count=count
+                ))
+            for port in ports:
+                self._owners[port] = owner
+        logger.debug('Host ports %s allocated', ports)
+        return ports
+
+    def assign(self, ports, owner):
+        """
+        Change the owner of reserved ports.
+
+        :param ports: the list of ports
+        :param owner: the new owner, usually a container id
+        """
+        with self._lock:
+            for port in ports:
+                self._owners[port] = owner
+
+    def release(self, owner=None, ports=None):
+        """
+        Release reserved ports.
+
+        :param owner: the owner of the ports to release
+        :param ports: the list of ports to release, whatever their owner
+        """
+        with self._lock:
+            released = [p for p, o in self._owners.items() if (owner is not None and o == owner) or p in (ports or [])]
+            for port in released:
+                del self._owners[port]
+        if released:
+            logger.debug('Host ports %s released', released)
+
+
+def _is_free(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind(('', port))
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+_allocator = PortAllocator()
+
+
+def get_allocator():
+    """
+    Retrieve the port allocator of the process.
+
+    :return: the :class:`PortAllocator`
+    """
+    return _allocator
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Pytest plugin module.
+
+This module is design to turn the docker decorator options into pytest fixtures. It is registered as the ``docktors``
+pytest plugin, so the fixtures are declared in a ``conftest.py`` :
+
+    from docktors.pytest_plugin import docker_fixture
+
+    postgres = docker_fixture('postgres', scope='session', image='postgres:13', wait_for_port=5432)
+
+    def test_query(postgres):
+        ...
+
+The fixture value is the container, or the command runner in ``exec_mode``. There is one container by test with the
+``function`` scope, by test module with the ``module`` scope and by test session with the ``session`` scope. With
+pytest-xdist, a session container is shared by all the workers of the node : the first worker starts it and the last
+one stops it, coordinated through a lock file.
+
+Once the tests are collected, the session containers they use are started in parallel in background, and the images
+of the other containers are pulled (see :func:`docktors.warmup.warmup`). The ``--docktors-lazy`` option disables it.
+"""
+import contextlib
+import errno
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from .client import get_client
+from .execution import CommandRunner
+from .labels import is_running, spec_hash
+from .warmup import WARMUP_WORKERS, warmup
+from .wdocker import DockerContainer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_SCOPES = ('function', 'module', 'session')
+
+# Directory of the lock files coordinating the pytest-xdist workers
+SHARED_DIRECTORY = os.environ.get('DOCKTORS_PYTEST_DIRECTORY') or tempfile.gettempdir()
+
+_fixtures = OrderedDict()
+_executor = None
+
+
+class SharedContainer(object):
+    """
+    Container of a session fixture. When a shared directory and a worker are given, the container is shared by the
+    workers through a state file, holding the container and the workers using it, updated under a file lock.
+    """
+
+    def __init__(self, name, options, directory=None, worker=None):
+        """
+        Class constructor for a shared container.
+
+        :param name: the fixture name
+        :param options: the docker decorator options
+        :param directory: the directory of the state and lock files (default: the container is not shared)
+        :param worker: the name of the current worker
+        """
+        self._name = name
+        self._wrapper = DockerContainer(**options)
+        self._call = None
+        self._container = None
+        self._worker = dict(name=worker, pid=os.getpid())
+        self._path = None
+        if directory is not None and fcntl is not None:
+            self._path = os.path.join(directory, 'docktors-%s' % spec_hash(dict(options, fixture=name))[:32])
+        self.value = None
+
+    def acquire(self):
+        """
+        Start the container, or join the container of another worker.
+
+        :return: the shared container itself
+        """
+        if self._path is None:
+            self._start()
+            return self
+        with self._file_lock():
+            state = self._read_state()
+            self._container = self._running_container(state.get('id'))
+            if self._container is None:
+                self._start()
+                state = dict(id=self._container.id, host_ports=self._container.host_ports, workers=[])
+                logger.debug('[%s] Worker %s starts shared container %s', self._name, self._worker['name'],
+                             self._container.id)
+            else:
+                self._join(state)
+            state['workers'] = [w for w in state['workers'] if is_running(w['pid'])] + [self._worker]
+            self._write_state(state)
+        return self
+
+    def release(self):
+        """
+        Leave the container, stopping it when no other worker uses it.
+        """
+        if self._path is None:
+            self._stop()
+            return
+        with self._file_lock():
+            state = self._read_state()
+            workers = [w for w in state.get('workers', []) if w != self._worker and is_running(w['pid'])]
+            if workers:
+                self._write_state(dict(state, workers=workers))
+            elif os.path.exists(self._path + '.json'):
+                os.remove(self._path + '.json')
+        if workers:
+            logger.debug('[%s] Container %s left to workers %s', self._name, self._container.id,
+                         [w['name'] for w in workers])
+        else:
+            self._stop()
+
+    def _start(self):
+        self._wrapper.start()
+        self.value = self._wrapper.get_args()[0]
+        self._container = self._wrapper.get_container()
+        # The container is started from a background thread and stopped from the main one
+        self._call = self._wrapper.detach_call()
+
+    def _join(self, state):
+        logger.debug('[%s] Worker %s joins container %s', self._name, self._worker['name'], self._container.id)
+        self._container.host_ports = dict((int(p), hp) for p, hp in (state.get('host_ports') or {}).items())
+        if self._wrapper.p('exec_mode'):
+            self.value = CommandRunner(get_client(), self._container, self._wrapper.p('image'))
+        else:
+            self.value = self._container
+
+    def _stop(self):
+        if self._call is not None:
+            self._wrapper.attach_call(self._call)
+            self._call = None
+            self._wrapper.shutdown()
+            return
+        # The worker which has started the container has already left
+        logger.debug('[%s] Removing container %s', self._name, self._container.id)
+        try:
+            self._container.stop(timeout=self._wrapper.p('stop_timeout'))
+            self._container.remove(v=True, force=True)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to remove container %s : %s', self._name, self._container.id, str(ex))
+
+    @staticmethod
+    def _running_container(container_id):
+        if container_id is None:
+            return None
+        try:
+            container = get_client().containers.get(container_id)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.debug('Shared container %s is gone : %s', container_id, str(ex))
+            return None
+        return container if container.status == 'running' else None
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        with open(self._path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_state(self):
+        try:
+            with open(self._path + '.json') as state_file:
+                return json.load(state_file)
+        except (IOError, OSError, ValueError):
+            return dict(workers=[])
+
+    def _write_state(self, state):
+        with open(self._path + '.json', 'w') as state_file:
+            json.dump(state, state_file)
+
+
+class DockerFixture(object):
+    """
+    Container fixture declared with docker_fixture().
+    """
+
+    def __init__(self, name, scope, options):
+        """
+        Class constructor for a container fixture.
+
+        :param name: the fixture name
+        :param scope: the fixture scope, one of ``function``, ``module`` or ``session``
+        :param options: the docker decorator options
+        """
+        if scope not in FIXTURE_SCOPES:
+            raise SyntaxError("[docker] : Fixture '%s' scope should be one of %s" % (name, ', '.join(FIXTURE_SCOPES)))
+        self.name = name
+        self.scope = scope
+        self.options = options
+        self._wrapper = DockerContainer(**options) if scope != 'session' else None
+        self._shared = None
+        self._lock = threading.Lock()
+
+    def prestart(self, executor):
+        """
+        Start the session container in background.
+
+        :param executor: the executor running the start
+        """
+        with self._lock:
+            if self._shared is None:
+                self._shared = executor.submit(self._acquire)
+
+    def shared(self):
+        """
+        Retrieve the session container, starting it or waiting for its start in background.
+
+        :return: the :class:`SharedContainer`
+        """
+        with self._lock:
+            if self._shared is None:
+                self._shared = Future()
+                try:
+                    self._shared.set_result(self._acquire())
+                except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+                    self._shared.set_exception(ex)
+            shared = self._shared
+        return shared.result()
+
+    def release(self):
+        """
+        Leave the session container, when it has been started.
+        """
+        with self._lock:
+            shared, self._shared = self._shared, None
+        if shared is None:
+            return
+        try:
+            shared.result().release()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to release the session container : %s', self.name, str(ex))
+
+    def fixture(self):
+        """
+        Fixture function giving the container.
+        """
+        if self.scope == 'session':
+            # The session containers are released once all the tests have run, see pytest_sessionfinish()
+            yield self.shared().value
+            return
+        self._wrapper.start()
+        try:
+            yield self._wrapper.get_args()[0]
+        finally:
+            self._wrapper.shutdown()
+
+    def _acquire(self):
+        directory = None
+        if os.environ.get('PYTEST_XDIST_TESTRUNUID'):
+            directory = os.path.join(SHARED_DIRECTORY, 'docktors-%s' % os.environ['PYTEST_XDIST_TESTRUNUID'])
+            try:
+                os.makedirs(directory)
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+        shared = SharedContainer(self.name, self.options, directory=directory,
+                                 worker=os.environ.get('PYTEST_XDIST_WORKER'))
+        return shared.acquire()
+
+
+def docker_fixture(name, scope='function', **kwargs):
+    """
+    Declare a container fixture.
+
+    :param name: the fixture name
+    :param scope: the fixture scope, one of ``function``, ``module`` or ``session``
+    :param kwargs: the docker decorator options
+    :return: the pytest fixture, to assign to a module variable of a ``conftest.py``
+    """
+    fixture = DockerFixture(name, scope, kwargs)
+    _fixtures[name] = fixture
+    return pytest.fixture(scope=scope, name=name)(fixture.fixture)
+
+
+def pytest_addoption(parser):
+    """
+    Hook declaring the command line options of the plugin.
+    """
+    group = parser.getgroup('docktors')
+    group.addoption('--docktors-lazy', action='store_true', default=False,
+                    help='start the session containers on first use, without pulling the images after collection')
+
+
+def pytest_collection_finish(session):
+    """
+    Hook starting the session containers used by the collected tests, and pulling the images of the other ones.
+    """
+    global _executor  # pylint: disable=locally-disabled, global-statement
+    if session.config.getoption('docktors_lazy') or not _fixtures:
+        return
+    names = set(name for item in session.items for name in getattr(item, 'fixturenames', ()))
+    used = [f for name, f in _fixtures.items() if name in names]
+    started = [f for f in used if f.scope == 'session']
+    images = [f.options for f in used if f.scope != 'session' and not f.options.get('build')]
+    if not started and not images:
+        return
+    _executor = ThreadPoolExecutor(max_workers=max(1, min(WARMUP_WORKERS, len(started) + 1)))
+    for fixture in started:
+        fixture.prestart(_executor)
+    if images:
+        _executor.submit(_warmup, images)
+
+
+def pytest_sessionfinish():
+    """
+    Hook releasing the session containers once all the tests have run.
+    """
+    global _executor  # pylint: disable=locally-disabled, global-statement
+    for fixture in _fixtures.values():
+        if fixture.scope == 'session':
+            fixture.release()
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _warmup(specs):
+    try:
+        warmup(specs)
+    except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+        logger.warning('Unable to warm up the images of the docker fixtures : %s', str(ex))
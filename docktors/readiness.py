@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+Readiness module.
+
+This module is design to follow the state of a starting container from the docker events stream, so the readiness
+waits stop as soon as the container dies or becomes healthy.
+
+It also defines the readiness engine, waiting at the same time for several probes : TCP ports, HTTP endpoints or
+any blocking wait function such as the logs wait.
+"""
+import errno
+import logging
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from errno import errorcode
+
+try:
+    import selectors
+except ImportError:  # Python < 3.4
+    import selectors2 as selectors
+
+from .core import contextvars
+
+logger = logging.getLogger(__name__)
+
+# Events of a container meaning it won't be ready
+FAILURE_EVENTS = ('die', 'oom')
+
+# Error codes of a non-blocking connection in progress
+IN_PROGRESS_ERRORS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+
+# Delays in seconds between 2 attempts of a socket probe : the delay doubles after each failure, up to the maximum
+BACKOFF_INITIAL = 0.05
+BACKOFF_MAX = 2.0
+
+# Maximum seconds of a single socket probe attempt
+ATTEMPT_TIMEOUT = 2.0
+
+# Maximum seconds between 2 calls of the engine check function
+CHECK_INTERVAL = 0.1
+
+
+def backoff_delay(failures):
+    """
+    Compute the delay before a new attempt : exponential with the number of failures, with jitter.
+
+    :param failures: the number of failed attempts
+    :return: the delay in seconds
+    """
+    delay = min(BACKOFF_MAX, BACKOFF_INITIAL * (2 ** failures))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class ContainerWatcher(object):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Container watcher class. This class subscribes to the docker events of a container in a background thread.
+    """
+
+    def __init__(self, client, container, image, since=None):
+        """
+        Class constructor to watch a container.
+
+        :param client: the docker client
+        :param container: the container to watch
+        :param image: the image name, for logging purpose
+        :param since: the timestamp from which the events are retrieved, to get the ones already occurred
+        """
+        self._client, self._container, self._image, self._since = client, container, image, since
+        self._events = None
+        self._thread = None
+        self._failed = threading.Event()
+        self._healthy = threading.Event()
+        self._changed = threading.Condition()
+        self.failure = None
+        self.health = None
+
+    def start(self):
+        """
+        Subscribe to the container events.
+
+        :return: the watcher itself
+        """
+        self._events = self._client.events(
+            since=self._since,
+            decode=True,
+            filters={'container': self._container.id}
+        )
+        self._thread = threading.Thread(target=self._watch, name='docktors-watcher-%s' % self._container.id[:12])
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Unsubscribe from the container events.
+        """
+        if self._events is not None:
+            try:
+                self._events.close()
+            except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+                logger.debug('[%s] Unable to close events stream : %s', self._image, str(ex))
+
+    def is_failed(self):
+        """
+        Check if the container has died or has been killed on out of memory.
+
+        :return: True when the container won't be ready
+        """
+        return self._failed.is_set()
+
+    def wait_failure(self, timeout):
+        """
+        Wait for the container to fail.
+
+        :param timeout: the maximum seconds to wait
+        :return: True when the container has failed
+        """
+        return self._failed.wait(timeout)
+
+    def wait_healthy(self):
+        """
+        Wait for the container healthcheck to succeed, or for the container to fail.
+
+        :return: True when the container is healthy, False when it has failed or is unhealthy
+        """
+        with self._changed:
+            while not self._healthy.is_set() and not self._failed.is_set() and self.health != 'unhealthy':
+                self._changed.wait()
+        return self._healthy.is_set()
+
+    def _watch(self):
+        try:
+            for event in self._events:
+                self._on_event(event)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.debug('[%s] Events stream closed : %s', self._image, str(ex))
+
+    def _on_event(self, event):
+        action = event.get('Action') or event.get('status') or ''
+        logger.debug('[%s] Event \'%s\' on container %s', self._image, action, self._container.id)
+        with self._changed:
+            if action in FAILURE_EVENTS:
+                exit_code = event.get('Actor', {}).get('Attributes', {}).get('exitCode')
+                self.failure = action if exit_code is None else '%s (exit code %s)' % (action, exit_code)
+                self._failed.set()
+            elif action.startswith('health_status'):
+                self.health = action.split(':', 1)[-1].strip()
+                if self.health == 'healthy':
+                    self._healthy.set()
+            self._changed.notify_all()
+
+
+class ReadinessTimeout(Exception):
+    """Exception for probes not ready before the timeout"""
+    pass
+
+
+class ProbeError(Exception):
+    """Exception for a probe failing with an error that won't be solved by retrying"""
+
+    def __init__(self, probe, code):
+        super(ProbeError, self).__init__('%s failed with code %d (%s)' % (probe.name, code, errorcode.get(code, '--')))
+        self.probe = probe
+        self.code = code
+
+
+class Probe(object):
+    """
+    Readiness probe base class.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.attempts = 0
+        self.latency = None
+
+
+class SocketProbe(Probe):  # pylint: disable=locally-disabled, too-many-instance-attributes
+    """
+    Probe class for a TCP port. Each attempt uses a new non-blocking socket, waited by the engine selector.
+    """
+
+    def __init__(self, name, host, port):
+        super(SocketProbe, self).__init__(name)
+        self.host, self.port = host, port
+        self.sock = None
+        self.error = None
+        self.ready = False
+        self.failures = 0
+        self.next_attempt = 0
+        self.attempt_deadline = None
+
+    def open(self):
+        """
+        Begin a new connection attempt.
+
+        :return: True when ready, the selector events to wait for or None when the attempt has failed
+        """
+        self.attempts += 1
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        res = self.sock.connect_ex((self.host, self.port))
+        if res == 0:
+            return self.handle(selectors.EVENT_WRITE)
+        if res in IN_PROGRESS_ERRORS:
+            return selectors.EVENT_WRITE
+        return self.fail(res)
+
+    def handle(self, mask):  # pylint: disable=locally-disabled, unused-argument
+        """
+        Handle the socket events.
+
+        :param mask: the selector events ready on the socket
+        :return: True when ready, the selector events to wait for or None when the attempt has failed
+        """
+        res = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if res != 0:
+            return self.fail(res)
+        self.close()
+        return True
+
+    def fail(self, code):
+        """
+        End the current attempt on failure.
+
+        :param code: the error code
+        """
+        self.error = code
+        self.close()
+
+    def close(self):
+        """
+        Close the socket of the current attempt.
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class TcpProbe(SocketProbe):
+    """
+    Probe class waiting for a TCP port to accept connections.
+    """
+
+    def __init__(self, host, port, name=None):
+        super(TcpProbe, self).__init__(name or 'tcp:%d' % port, host, port)
+
+
+class HttpProbe(SocketProbe):
+    """
+    Probe class waiting for an HTTP endpoint to respond with the expected status.
+    """
+
+    def __init__(self, host, port, path='/', status=200, name=None):
+        super(HttpProbe, self).__init__(name or 'http:%d%s' % (port, path), host, port)
+        self.path, self.status = path, status
+        self._response = None
+
+    def open(self):
+        self._response = None
+        return super(HttpProbe, self).open()
+
+    def handle(self, mask):
+        if self._response is None:
+            res = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if res != 0:
+                return self.fail(res)
+            self._response = b''
+            request = 'GET %s HTTP/1.0\r\nHost: %s:%d\r\n\r\n' % (self.path, self.host, self.port)
+            self.sock.send(request.encode('ascii'))
+            return selectors.EVENT_READ
+        try:
+            data = self.sock.recv(1024)
+        except socket.error as ex:
+            return self.fail(ex.errno or errno.ECONNRESET)
+        self._response += data
+        if data and b'\r\n' not in self._response:
+            return selectors.EVENT_READ
+        status_line = self._response.split(b'\r\n', 1)[0].split()
+        status = int(status_line[1]) if len(status_line) > 1 and status_line[1].isdigit() else None
+        logger.debug('[%s] Response status %s', self.name, status)
+        if status != self.status:
+            return self.fail(0)
+        self.close()
+        return True
+
+
+class CallableProbe(Probe):
+    """
+    Probe class running a blocking wait function in a background thread, within the context of the caller.
+    """
+
+    def __init__(self, name, target):
+        super(CallableProbe, self).__init__(name)
+        self._target = target
+        self._context = contextvars.copy_context() if contextvars else None
+        self._done = threading.Event()
+        self.exception = None
+
+    def begin(self):
+        """
+        Start the wait function. Without contextvars support, it is run in the calling thread.
+        """
+        if self._context is None:
+            self._run()
+            return
+        thread = threading.Thread(target=self._context.run, args=(self._run,), name='docktors-%s' % self.name)
+        thread.daemon = True
+        thread.start()
+
+    def is_done(self):
+        """
+        Check if the wait function has ended.
+
+        :return: True when ended
+        """
+        return self._done.is_set()
+
+    def _run(self):
+        self.attempts += 1
+        try:
+            self._target()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            self.exception = ex
+        finally:
+            self._done.set()
+
+
+class ReadinessEngine(object):
+    """
+    Readiness engine class. This class waits for several probes at the same time.
+
+    The socket probes are waited with a selector and retried with an exponential backoff with jitter. The other
+    probes run in their own thread. The engine stops at the first error raised by a probe or by the check function,
+    or when the timeout expires.
+    """
+
+    def __init__(self, image, probes, timeout=None, check=None, fatal_errors=()):
+        """
+        Class constructor to wait for probes.
+
+        :param image: the image name, for logging purpose
+        :param probes: the probes to wait for
+        :param timeout: the maximum seconds to wait for all the probes
+        :param check: a function called regularly that raises when waiting is pointless
+        :param fatal_errors: the socket error codes raising a :class:`ProbeError` instead of retrying
+        """
+        self._image, self._probes, self._timeout = image, probes, timeout
+        self._check = check or (lambda: None)
+        self._fatal_errors = fatal_errors
+
+    def wait(self):
+        """
+        Wait for all the probes to be ready.
+
+        :return: a dict with the latency in seconds of each probe, by probe name
+        """
+        begin = time.time()
+        deadline = begin + self._timeout if self._timeout is not None else None
+        pending = list(self._probes)
+        for probe in pending:
+            if isinstance(probe, CallableProbe):
+                probe.begin()
+        selector = selectors.DefaultSelector()
+        try:
+            while pending:
+                self._check()
+                now = time.time()
+                if deadline is not None and now > deadline:
+                    raise ReadinessTimeout('[%s] Timeout after %.1fs waiting for %s' % (
+                        self._image, self._timeout, ', '.join(p.name for p in pending)
+                    ))
+                for probe in list(pending):
+                    if self._is_ready(selector, probe, now):
+                        probe.latency = time.time() - begin
+                        logger.debug('[%s] Probe %s is ready after %.3fs (%d attempts)',
+                                     self._image, probe.name, probe.latency, probe.attempts)
+                        pending.remove(probe)
+                if pending:
+                    for key, mask in selector.select(self._select_timeout(pending, time.time(), deadline)):
+                        selector.unregister(key.fileobj)
+                        self._on_result(selector, key.data, key.data.handle(mask))
+        finally:
+            for probe in self._probes:
+                if isinstance(probe, SocketProbe) and probe.sock is not None:
+                    selector.unregister(probe.sock)
+                    probe.close()
+            selector.close()
+        return OrderedDict((probe.name, probe.latency) for probe in self._probes)
+
+    def _is_ready(self, selector, probe, now):
+        """Check a probe and begin a new attempt when needed."""
+        if isinstance(probe, CallableProbe):
+            if probe.is_done() and probe.exception is not None:
+                raise probe.exception
+            return probe.is_done()
+        if probe.sock is not None and now > probe.attempt_deadline:
+            selector.unregister(probe.sock)
+            probe.fail(errno.ETIMEDOUT)
+        if probe.error is not None:
+            self._retry(probe, now)
+        if not probe.ready and probe.sock is None and probe.next_attempt <= now:
+            probe.attempt_deadline = now + ATTEMPT_TIMEOUT
+            self._on_result(selector, probe, probe.open())
+            if probe.error is not None:
+                self._retry(probe, now)
+        return probe.ready
+
+    @staticmethod
+    def _on_result(selector, probe, result):
+        """Handle the result of a probe attempt step : ready, events to wait for or failure."""
+        if result is True:
+            probe.ready = True
+        elif result:
+            selector.register(probe.sock, result, probe)
+
+    def _retry(self, probe, now):
+        code, probe.error = probe.error, None
+        logger.debug(
+            '[%s] Waiting for %s to respond (code:%d => %s).',
+            self._image, probe.name, code, errorcode.get(code, '--')
+        )
+        if code in self._fatal_errors:
+            raise ProbeError(probe, code)
+        probe.next_attempt = now + backoff_delay(probe.failures)
+        probe.failures += 1
+
+    @staticmethod
+    def _select_timeout(pending, now, deadline):
+        wake_up = [now + CHECK_INTERVAL]
+        for probe in pending:
+            if isinstance(probe, SocketProbe):
+                wake_up.append(probe.attempt_deadline if probe.sock is not None else probe.next_attempt)
+        if deadline is not None:
+            wake_up.append(deadline)
+        return max(0, min(wake_up) - now)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Reaper module.
+
+This module is design to stop and remove the containers in background threads, so a decorated function returns as
+soon as its body is over. The pending shutdowns are flushed when the interpreter exits.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Number of threads stopping and removing containers in parallel
+REAPER_WORKERS = int(os.environ.get('DOCKTORS_REAPER_WORKERS', 4))
+
+
+class Reaper(object):
+    """
+    Reaper class. This class runs the container shutdowns on a pool of threads and keeps track of the pending ones.
+    """
+
+    def __init__(self, max_workers=REAPER_WORKERS):
+        """
+        Class constructor to shutdown containers in background.
+
+        :param max_workers: the number of threads
+        """
+        self._max_workers = max_workers
+        self._executor = None
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def submit(self, image, container, shutdown):
+        """
+        Schedule the shutdown of a container.
+
+        :param image: the image name, for logging purpose
+        :param container: the container to shutdown
+        :param shutdown: the function stopping and removing the container, called with the container
+        :return: the future of the shutdown
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+            try:
+                future = self._executor.submit(self._reap, image, container, shutdown)
+            except RuntimeError as ex:
+                # The executors are shut down before the atexit callbacks when the interpreter exits
+                logger.debug('[%s] Unable to shutdown container %s in background, shutting down now : %s',
+                             image, container.id, str(ex))
+                future = None
+            else:
+                self._futures.add(future)
+        if future is None:
+            future = Future()
+            self._reap(image, container, shutdown)
+            future.set_result(None)
+            return future
+        future.add_done_callback(self._done)
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Wait for the pending shutdowns.
+
+        :param timeout: the maximum time to wait in seconds (default: no limit)
+        :return: True when all the shutdowns are over
+        """
+        with self._lock:
+            futures = list(self._futures)
+        if futures:
+            logger.debug('Waiting for %d container shutdowns', len(futures))
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    @staticmethod
+    def _reap(image, container, shutdown):
+        try:
+            shutdown(container)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to shutdown container %s in background : %s', image, container.id, str(ex))
+
+
+_reaper = Reaper()
+
+
+def get_reaper():
+    """
+    Retrieve the shared reaper.
+
+    :return: the :class:`Reaper`
+    """
+    return _reaper
+
+
+def flush_reaper(timeout=None):
+    """
+    Wait for the pending shutdowns of the shared reaper.
+
+    :param timeout: the maximum time to wait in seconds (default: no limit)
+    :return: True when all the shutdowns are over
+    """
+    return _reaper.flush(timeout)
+
+
+atexit.register(flush_reaper)
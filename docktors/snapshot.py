@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot module.
+
+This module is design to cache the containers initialised by a first start in local images, named warm images, so the
+next starts run from them instead of the base image.
+
+A warm image is tagged with a hash of the container specification and of the base image digest : a new base image
+leads to a new warm image, the previous ones being removed. The least recently used warm images are removed once
+there are too many of them.
+
+Note that, as with ``docker commit``, the data written in the volumes declared by the image are not saved.
+"""
+import hashlib
+import logging
+
+import docker
+
+from .labels import spec_hash
+
+logger = logging.getLogger(__name__)
+
+# Repository of the warm images
+SNAPSHOT_REPOSITORY = 'docktors-snapshot'
+
+# Labels set on the warm images
+SNAPSHOT_LABEL = 'docktors.snapshot'
+SNAPSHOT_SPEC_LABEL = 'docktors.snapshot.spec'
+SNAPSHOT_BASE_LABEL = 'docktors.snapshot.base'
+
+# Default maximum number of warm images kept locally
+MAX_SNAPSHOTS = 5
+
+
+class SnapshotCache(object):
+    """
+    Snapshot cache class. This class looks up and commits the warm images of a container specification.
+    """
+
+    def __init__(self, client, image, spec, max_snapshots=MAX_SNAPSHOTS, base=None):
+        """
+        Class constructor for the warm images of a container specification.
+
+        :param client: the docker client
+        :param image: the base image name
+        :param spec: a dict with the options defining the container content (command, environment, volumes, ...)
+        :param max_snapshots: the maximum number of warm images kept locally, for all the specifications
+        :param base: the reference of the base image, when it differs from its name (a pinned or a built image)
+        """
+        self._client = client
+        self._image = image
+        self._base = base or image
+        self._max_snapshots = max_snapshots
+        self.spec = spec_hash(dict(spec, image=image))
+
+    def tag(self, digest):
+        """
+        Compute the tag of the warm image for a base image digest.
+
+        :param digest: the id of the base image
+        :return: the tag
+        """
+        return hashlib.sha256(('%s:%s' % (self.spec, digest)).encode('utf-8')).hexdigest()[:32]
+
+    def lookup(self):
+        """
+        Find the warm image of the current base image. The warm image is tagged again to be marked as recently used.
+
+        :return: the warm image name, None when there is none
+        """
+        try:
+            digest = self._client.images.get(self._base).id
+            name = '%s:%s' % (SNAPSHOT_REPOSITORY, self.tag(digest))
+            self._client.images.get(name).tag(SNAPSHOT_REPOSITORY, self.tag(digest))
+        except docker.errors.ImageNotFound:
+            return None
+        logger.debug('[%s] Using warm image %s', self._image, name)
+        return name
+
+    def commit(self, container):
+        """
+        Commit an initialised container in a warm image and remove the outdated warm images.
+
+        :param container: the container started from the base image
+        :return: the warm image name
+        """
+        digest = container.attrs['Image']
+        tag = self.tag(digest)
+        container.commit(repository=SNAPSHOT_REPOSITORY, tag=tag, changes=[
+            'LABEL %s=true' % SNAPSHOT_LABEL,
+            'LABEL %s=%s' % (SNAPSHOT_SPEC_LABEL, self.spec),
+            'LABEL %s=%s' % (SNAPSHOT_BASE_LABEL, digest),
+        ])
+        logger.debug('[%s] Container %s committed in warm image %s', self._image, container.id, tag)
+        self.evict(digest)
+        return '%s:%s' % (SNAPSHOT_REPOSITORY, tag)
+
+    def evict(self, digest):
+        """
+        Remove the warm images of this specification built from another base image, and the least recently used warm
+        images over the maximum number.
+
+        :param digest: the id of the current base image
+        """
+        snapshots = self._client.images.list(filters=dict(label=SNAPSHOT_LABEL))
+        outdated = [i for i in snapshots if i.labels.get(SNAPSHOT_SPEC_LABEL) == self.spec and
+                    i.labels.get(SNAPSHOT_BASE_LABEL) != digest]
+        recent = sorted(
+            (i for i in snapshots if i not in outdated),
+            key=lambda i: i.attrs.get('Metadata', {}).get('LastTagTime') or i.attrs.get('Created') or '',
+            reverse=True
+        )
+        for image in outdated + recent[self._max_snapshots:]:
+            _remove_image(self._client, image)
+
+
+def clear_snapshots(client, image=None):
+    """
+    Remove the warm images.
+
+    :param client: the docker client
+    :param image: the base image name to remove only its warm images (default: all of them)
+    """
+    digest = None if image is None else client.images.get(image).id
+    for snapshot in client.images.list(filters=dict(label=SNAPSHOT_LABEL)):
+        if digest is None or snapshot.labels.get(SNAPSHOT_BASE_LABEL) == digest:
+            _remove_image(client, snapshot)
+
+
+def _remove_image(client, image):
+    try:
+        client.images.remove(image.id)
+        logger.debug('Warm image %s removed', image.id)
+    except docker.errors.APIError as ex:
+        logger.debug('Unable to remove warm image %s : %s', image.id, str(ex))
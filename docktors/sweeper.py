@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Sweeper module.
+
+This module is design to find the containers left by dead processes, thanks to their labels, and to remove them. It
+can be run from the command line :
+
+    docktors-sweep [--max-age SECONDS] [--dry-run]
+
+The sweep can also be done at the first container start of a process by setting ``DOCKTORS_SWEEP_AT_START=1``.
+"""
+import argparse
+import logging
+import os
+import re
+import socket
+import sys
+import threading
+import time
+
+from .client import get_client
+from .labels import CREATED_LABEL, OWNER_HOST_LABEL, OWNER_PID_LABEL, SPEC_LABEL, is_running
+from .reaper import Reaper
+
+logger = logging.getLogger(__name__)
+
+# Sweep the orphan containers at the first container start of the process
+SWEEP_AT_START = os.environ.get('DOCKTORS_SWEEP_AT_START', '').lower() in ('1', 'true', 'yes')
+
+# Name given to an adopted container, the labels of a container being immutable
+ADOPTED_NAME = 'docktors-adopted-{pid}-{id}'
+ADOPTED_NAME_PATTERN = re.compile(r'^/?docktors-adopted-(\d+)-')
+
+_swept = False
+_swept_lock = threading.Lock()
+
+
+def is_orphan(container, host=None, max_age=None, now=None):
+    """
+    Check if a container has been left by a dead process.
+
+    A container of the current host is an orphan when its owner process is not running anymore. The owner process is
+    the one from its labels or, for an adopted container, from its name. As the processes of other hosts cannot be
+    checked, their containers are only orphans when they are older than ``max_age``.
+
+    :param container: the container with the docktors labels
+    :param host: the current host name (default: ``socket.gethostname()``)
+    :param max_age: the age in seconds after which a container of another host is an orphan
+    :param now: the current timestamp (default: ``time.time()``)
+    :return: True when the container is an orphan
+    """
+    labels = container.labels
+    if labels.get(OWNER_HOST_LABEL) == (host or socket.gethostname()):
+        adopted = ADOPTED_NAME_PATTERN.match(container.name or '')
+        return not is_running(int(adopted.group(1) if adopted else labels[OWNER_PID_LABEL]))
+    if max_age is None:
+        return False
+    return (now or time.time()) - float(labels.get(CREATED_LABEL) or 0) > max_age
+
+
+def find_orphans(client, spec=None, running=False, max_age=None):
+    """
+    Find the orphan containers with a single filtered list request.
+
+    :param client: the docker client
+    :param spec: the specification hash of the containers to find (default: all of them)
+    :param running: True to only find the running containers
+    :param max_age: the age in seconds after which a container of another host is an orphan
+    :return: the list of orphan containers
+    """
+    label_filters = [OWNER_PID_LABEL] + (['%s=%s' % (SPEC_LABEL, spec)] if spec else [])
+    filters = dict(label=label_filters, status='running') if running else dict(label=label_filters)
+    host, now = socket.gethostname(), time.time()
+    containers = client.containers.list(all=not running, filters=filters)
+    return [c for c in containers if is_orphan(c, host=host, max_age=max_age, now=now)]
+
+
+def find_adoptable(client, spec):
+    """
+    Find the running and healthy orphan containers of a specification, so they can be reused.
+
+    :param client: the docker client
+    :param spec: the specification hash of the containers
+    :return: the list of orphan containers
+    """
+    orphans = find_orphans(client, spec=spec, running=True)
+    return [c for c in orphans if (c.attrs.get('State', {}).get('Health') or {}).get('Status', 'healthy') == 'healthy']
+
+
+def adopt(container):
+    """
+    Make the current process the owner of an orphan container, by renaming it.
+
+    :param container: the orphan container
+    """
+    container.rename(ADOPTED_NAME.format(pid=os.getpid(), id=container.short_id))
+
+
+def sweep_orphans(client=None, max_age=None, dry_run=False):
+    """
+    Remove the orphan containers, with their anonymous volumes, in parallel.
+
+    :param client: the docker client (default: the shared client)
+    :param max_age: the age in seconds after which a container of another host is an orphan
+    :param dry_run: True to only find the orphan containers
+    :return: the list of orphan containers
+    """
+    orphans = find_orphans(client or get_client(), max_age=max_age)
+    logger.debug('%d orphan containers found', len(orphans))
+    if orphans and not dry_run:
+        reaper = Reaper()
+        for container in orphans:
+            reaper.submit(container.attrs.get('Config', {}).get('Image'), container, _remove_container)
+        reaper.flush()
+    return orphans
+
+
+def sweep_at_start(client):
+    """
+    Sweep the orphan containers once per process, when enabled by ``DOCKTORS_SWEEP_AT_START``.
+
+    :param client: the docker client
+    """
+    global _swept  # pylint: disable=locally-disabled, global-statement
+    if not SWEEP_AT_START:
+        return
+    with _swept_lock:
+        if _swept:
+            return
+        _swept = True
+        sweep_orphans(client)
+
+
+def main(argv=None):
+    """
+    Command line entry point removing the orphan containers.
+
+    :param argv: the command line arguments (default: ``sys.argv[1:]``)
+    :return: the exit status
+    """
+    parser = argparse.ArgumentParser(prog='docktors-sweep', description='Remove the containers left by dead processes')
+    parser.add_argument('--max-age', type=float, help='age in seconds after which a container of another host is '
+                                                      'removed (default: never)')
+    parser.add_argument('--dry-run', action='store_true', help='only list the orphan containers')
+    args = parser.parse_args(argv)
+    orphans = sweep_orphans(max_age=args.max_age, dry_run=args.dry_run)
+    for container in orphans:
+        sys.stdout.write('%s %s %s\n' % (
+            'found' if args.dry_run else 'removed', container.short_id, container.attrs['Config']['Image']
+        ))
+    return 0
+
+
+def _remove_container(container):
+    container.remove(v=True, force=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Warmup module.
+
+This module is design to pull the images of the containers before their first start, so a pull is not hidden in the
+function which happens to run first. The pulled images are pinned to their local id : the next starts of the
+containers never touch the registry, even when the tag has moved in the meantime.
+
+    import docktors.warmup
+
+    docktors.warmup.warmup()  # all the images declared by the decorators
+"""
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+
+from .client import get_client
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Number of images pulled in parallel
+WARMUP_WORKERS = int(os.environ.get('DOCKTORS_WARMUP_WORKERS', 4))
+
+_declared = []
+_pinned = dict()
+_pinned_hooks = dict()
+_lock = threading.Lock()
+
+
+class WarmupError(Exception):
+    """
+    Error raised when some images cannot be pulled.
+    """
+
+    def __init__(self, message, errors):
+        super(WarmupError, self).__init__(message)
+        self.errors = errors
+
+
+class WarmupResult(object):
+    """
+    Result of the warmup of an image.
+    """
+
+    def __init__(self, image, image_id, pulled, size, duration):
+        """
+        Class constructor for a warmup result.
+
+        :param image: the image name
+        :param image_id: the local id the image is pinned to
+        :param pulled: True when the image has been pulled, False when it was already present
+        :param size: the downloaded bytes
+        :param duration: the duration of the warmup in seconds
+        """
+        self.image = image
+        self.image_id = image_id
+        self.pulled = pulled
+        self.size = size
+        self.duration = duration
+
+    def __repr__(self):
+        return 'WarmupResult(image=%r, image_id=%r, pulled=%r)' % (self.image, self.image_id, self.pulled)
+
+
+def declare(image):
+    """
+    Declare the image of a container, so it is pulled by warmup(). The decorators declare their images.
+
+    :param image: the image name
+    """
+    with _lock:
+        if image not in _declared:
+            _declared.append(image)
+
+
+def pinned_image(image):
+    """
+    Retrieve the image to start a container from.
+
+    :param image: the image name
+    :return: the local id of the image when it has been pinned by warmup(), the image name otherwise
+    """
+    return _pinned.get(image, image)
+
+
+def when_pinned(image, func):
+    """
+    Call a function once an image is pinned by warmup(), or now when it is already pinned. The function is called
+    only once, from the thread of the warmup.
+
+    :param image: the image name
+    :param func: the function, called without arguments
+    """
+    with _lock:
+        if image not in _pinned:
+            _pinned_hooks.setdefault(image, []).append(func)
+            return
+    func()
+
+
+def unpin(image=None):
+    """
+    Forget the local id of a pinned image, so the next starts use the image name again.
+
+    :param image: the image name (default: all of them)
+    """
+    with _lock:
+        if image is None:
+            _pinned.clear()
+        else:
+            _pinned.pop(image, None)
+
+
+def warmup(specs=None, max_workers=WARMUP_WORKERS, progress=None, client=None):
+    """
+    Pull the missing images in parallel and pin all the images to their local id.
+
+    :param specs: the images to warm up, as names or as dicts of the docker decorator options
+                  (default: all the declared images)
+    :param max_workers: the maximum number of images pulled at the same time
+    :param progress: a function called during the pulls with ``(image, status, current, total)``, the current and
+                     total downloaded bytes of the image
+    :param client: the docker client (default: the shared client)
+    :return: the list of :class:`WarmupResult`
+    """
+    if specs is None:
+        with _lock:
+            images = list(_declared)
+    else:
+        images = []
+        for spec in specs:
+            image = spec['image'] if isinstance(spec, dict) else spec
+            if image not in images:
+                images.append(image)
+    if not images:
+        return []
+    client = client or get_client()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(images)))) as executor:
+        futures = [(image, executor.submit(_warmup_image, client, image, progress)) for image in images]
+    results, errors = [], dict()
+    for image, future in futures:
+        try:
+            results.append(future.result())
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            errors[image] = ex
+    if errors:
+        raise WarmupError('Unable to warm up images :\n%s' % '\n'.join(
+            '- %s : %s' % (image, str(ex)) for image, ex in errors.items()
+        ), errors)
+    return results
+
+
+def _warmup_image(client, image, progress):
+    begin = time.time()
+    pulled, size = False, 0
+    try:
+        local = client.images.get(image)
+    except docker.errors.ImageNotFound:
+        logger.debug('[%s] Pulling image ...', image)
+        with span('pull', image):
+            size = _pull(client, image, progress)
+        local = client.images.get(image)
+        pulled = True
+    with _lock:
+        _pinned[image] = local.id
+        hooks = _pinned_hooks.pop(image, [])
+    if progress is not None:
+        progress(image, 'pinned', size, size)
+    logger.debug('[%s] Image pinned to %s', image, local.id)
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Pinned image hook %s fails : %s', image, hook, str(ex))
+    return WarmupResult(image, local.id, pulled, size, time.time() - begin)
+
+
+def _pull(client, image, progress):
+    layers = dict()
+    for event in client.api.pull(image, stream=True, decode=True):
+        if 'error' in event:
+            raise docker.errors.APIError(event['error'])
+        detail = event.get('progressDetail') or {}
+        if event.get('status') == 'Downloading' and detail.get('total'):
+            layers[event['id']] = (detail.get('current', 0), detail['total'])
+        elif event.get('status') == 'Download complete' and event.get('id') in layers:
+            layers[event['id']] = (layers[event['id']][1], layers[event['id']][1])
+        if progress is not None:
+            progress(image, event.get('status'), sum(c for c, _ in layers.values()), sum(t for _, t in layers.values()))
+    return sum(total for _, total in layers.values())
@@ -4,21 +4,53 @@ WDocker module.
 
 This module is design to define the wrapper to use in the generic decorator.
 """
-import contextlib
-import socket
+import atexit
 import logging
+import posixpath
+import re
+import sys
+import threading
 import time
 import errno
 from errno import errorcode
 
+from concurrent.futures import Future
+
 import docker
 
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Python 2
+    from urlparse import urlparse
+
+from .archive import archive_entries, archive_hash, archive_stream
+from .build import built_image
+from .client import get_client
 from .core import DecWrapper
+from .execution import IDLE_ENTRYPOINT, CommandRunner
+from .logs import MAX_BUFFER_SIZE, LogCapture, LogMatcher, RotatingLogFile, compile_regex
+from .metrics import record, span
+from .labels import container_labels, spec_hash
+from .ports import PortAllocationError, get_allocator
+from .reaper import get_reaper
+from .snapshot import MAX_SNAPSHOTS, SnapshotCache
+from .sweeper import adopt, find_adoptable, sweep_at_start
+from .warmup import declare, pinned_image
+from .readiness import (CallableProbe, ContainerWatcher, HttpProbe, ProbeError, ReadinessEngine, ReadinessTimeout,
+                        TcpProbe)
 
 logger = logging.getLogger(__name__)
 
 DOCKER_CONTAINER_PROPS = dict(
     image=dict(argtype=str, mandatory=True),
+    build=dict(argtype=str),
+    dockerfile=dict(argtype=str),
+    build_args=dict(
+        argtype=dict,
+        alternatives=[
+            ([(str, str)], lambda v: dict(i for i in v))
+        ]
+    ),
     command=dict(argtype=str),
     ports=dict(
         argtype=dict,
@@ -27,6 +59,13 @@ DOCKER_CONTAINER_PROPS = dict(
             ([(int, int)], lambda v: dict(i for i in v))
         ]
     ),
+    publish_ports=dict(
+        argtype=[int],
+        alternatives=[
+            (int, lambda v: [v])
+        ]
+    ),
+    host_port_range=dict(argtype=(int, int)),
     volumes=dict(
         argtype=dict,
         default=dict(),
@@ -34,6 +73,12 @@ DOCKER_CONTAINER_PROPS = dict(
             ([(str, str, str)], lambda v: dict((i[0], {'bind': i[1], 'mode': i[2]}) for i in v))
         ]
     ),
+    files=dict(
+        argtype=dict,
+        alternatives=[
+            ([(str, str)], lambda v: dict(i for i in v))
+        ]
+    ),
     environment=dict(
         argtype=dict,
         default=dict(),
@@ -41,23 +86,124 @@ DOCKER_CONTAINER_PROPS = dict(
             ([(str, str)], lambda v: dict(i for i in v))
         ]
     ),
-    wait_for_log=dict(argtype=str),
-    wait_for_port=dict(argtype=int),
+    wait_for_log=dict(
+        argtype=[str],
+        alternatives=[
+            (str, lambda v: [v])
+        ]
+    ),
+    wait_for_log_regex=dict(
+        argtype=[str],
+        alternatives=[
+            (str, lambda v: [v])
+        ]
+    ),
+    wait_for_port=dict(
+        argtype=[int],
+        alternatives=[
+            (int, lambda v: [v])
+        ]
+    ),
+    wait_for_http=dict(
+        argtype=[(int, str, int)],
+        alternatives=[
+            ((int, str, int), lambda v: [v]),
+            ((int, str), lambda v: [(v[0], v[1], 200)]),
+            ([(int, str)], lambda v: [(i[0], i[1], 200) for i in v]),
+        ]
+    ),
+    wait_for_healthy=dict(argtype=bool, default=False),
+    wait_timeout=dict(
+        argtype=float,
+        alternatives=[
+            (int, float)
+        ]
+    ),
     kill_signal=dict(argtype=int),
+    stop_timeout=dict(argtype=int, default=10),
+    remove=dict(argtype=bool, default=True),
+    background_shutdown=dict(argtype=bool, default=True),
+    keep_alive=dict(argtype=bool, default=False),
+    adopt_orphans=dict(argtype=bool, default=False),
+    idle_ttl=dict(
+        argtype=float,
+        alternatives=[
+            (int, float)
+        ]
+    ),
+    log_buffer_size=dict(argtype=int, default=MAX_BUFFER_SIZE),
+    log_file=dict(argtype=str),
+    log_file_max_bytes=dict(argtype=int, default=10 * 1024 * 1024),
+    log_file_backups=dict(argtype=int, default=3),
+    reset_paths=dict(
+        argtype=[str],
+        alternatives=[
+            (str, lambda v: [v])
+        ]
+    ),
+    reset_command=dict(argtype=str),
+    snapshot=dict(argtype=bool, default=False),
+    snapshot_max_images=dict(argtype=int, default=MAX_SNAPSHOTS),
+    exec_mode=dict(argtype=bool, default=False),
+    eager=dict(
+        argtype=str,
+        alternatives=[
+            (bool, lambda v: EAGER_DECORATION if v else None)
+        ]
+    ),
 )
 
+# Moments of the eager start of a container : when the function is decorated, or when warmup() has pinned its image
+EAGER_DECORATION = 'decoration'
+EAGER_WARMUP = 'warmup'
+
+# Options making the start wait for the container to be ready
+WAIT_FOR_PROPS = ('wait_for_log', 'wait_for_log_regex', 'wait_for_port', 'wait_for_http', 'wait_for_healthy')
+
+# Number of attempts to start a container on host ports allocated from a range
+PORT_ALLOCATION_ATTEMPTS = 3
+
+# Maximum time in seconds to wait for the last logs of a dead container
+LOGS_DRAIN_TIMEOUT = 1
+
+CONTAINER_FAILED_MSG = '[{image}] Container {id} exits ({failure}) before being ready. Container logs :\n{logs}'
+
+UNSUPPORTED_SOCKET_ERRORS = [
+    (errno.EHOSTUNREACH,
+     '[{image}] Host {ip} cannot be reach. The container may exit abnormally. Container logs :\n{logs}')
+]
+
 
 class DockerContainerError(Exception):
     """Exception for docker container"""
     pass
 
 
+def _host_ports(attrs):
+    """Extract the host port bound to each published container port from the container attributes."""
+    bindings = (attrs.get('NetworkSettings') or {}).get('Ports') or {}
+    return dict(
+        (int(port.split('/')[0]), int(binding[0]['HostPort'])) for port, binding in bindings.items() if binding
+    )
+
+
+def _is_reachable(url, ip_address):
+    """
+    Check if a container ip address can be reached from the local host : only the containers of a local Linux daemon
+    can. Docker Desktop runs them in a virtual machine and a remote daemon on another host.
+    """
+    return bool(ip_address) and sys.platform.startswith('linux') and url.scheme == 'http+docker' and \
+        url.hostname == 'localhost'
+
+
 class DockerContainer(DecWrapper):
     """
     Docker container class. This class will start a new container and shutdown it.
+
+    The client and the container are stored per call, so a same instance can be used concurrently from several
+    threads or asyncio tasks, each call getting its own container.
     """
-    _client = None
-    _container = None
+    _exit_registered = False
 
     def __init__(self, **kwargs):
         """
@@ -68,91 +214,637 @@ class DockerContainer(DecWrapper):
             inputs=kwargs,
             props=DOCKER_CONTAINER_PROPS
         )
+        if self.p('adopt_orphans') and not self.p('keep_alive'):
+            raise SyntaxError("[docker] : Option 'adopt_orphans' requires option 'keep_alive'.")
+        if self.p('eager') not in (None, EAGER_DECORATION, EAGER_WARMUP):
+            raise SyntaxError("[docker] : Option 'eager' should be True, False or '%s'." % EAGER_WARMUP)
+        for regex in self.p('wait_for_log_regex') or []:
+            try:
+                compile_regex(regex)
+            except re.error as ex:
+                raise SyntaxError("[docker] : Option 'wait_for_log_regex' has an invalid regex '%s' : %s" % (regex, ex))
+        if self.p('build') is None:
+            declare(self.p('image'))
+        self._keep_alive_lock = threading.Lock()
+        self._idle = []
+        self._adoption_done = False
+        self._prestarted = None
+        self._prestart_lock = threading.Lock()
+        self._prestart_exit_registered = False
+
+    @property
+    def _client(self):
+        return self._state.get('client')
+
+    @_client.setter
+    def _client(self, client):
+        self._state.current()['client'] = client
+
+    @property
+    def _container(self):
+        return self._state.get('container')
+
+    @_container.setter
+    def _container(self, container):
+        self._state.current()['container'] = container
 
     def get_args(self):
-        return [self._container]
+        return [self.get_runner()] if self.p('exec_mode') else [self._container]
+
+    def span_label(self):
+        return self.p('image')
+
+    def get_container(self):
+        """
+        Retrieve the container of the current call, or of the last one, whatever the injected argument.
+
+        :return: the container
+        """
+        return self._container
+
+    def get_runner(self):
+        """
+        Retrieve a runner executing commands in the container of the current call, or of the last one.
+
+        :return: the :class:`docktors.execution.CommandRunner`
+        """
+        return CommandRunner(self._client, self._container, self.p('image'))
 
     def start(self):
         """
         Start a containers and wait for it.
+
+        In keep alive mode, an idle container started by a previous call is reused when it is still running. When a
+        container has been started in background by prestart(), the call takes it, waiting for the end of its start.
         """
-        self._client = docker.from_env()
+        prestarted = self._take_prestarted()
+        if prestarted is not None:
+            with span('eager', self.p('image')):
+                self._state.push(prestarted.result())
+            return self._container
+        return self._start()
 
+    def prestart(self):
+        """
+        Start in a background thread the container of the next call, so the call only waits for the rest of the
+        start. Nothing is done when a container is already started in background for the next call.
+        """
+        image = self.p('image')
+        with self._prestart_lock:
+            if self._prestarted is not None:
+                return
+            self._prestarted = future = Future()
+            if not self._prestart_exit_registered:
+                atexit.register(self._shutdown_prestarted)
+                self._prestart_exit_registered = True
+        logger.debug('[%s] Starting container in background ...', image)
+        thread = threading.Thread(target=self._prestart, args=(future,), name='docktors-eager-%s' % image)
+        thread.daemon = True
+        thread.start()
+
+    def _prestart(self, future):
+        try:
+            self._start()
+            future.set_result(self.detach_call())
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to start container in background : %s', self.p('image'), str(ex))
+            future.set_exception(ex)
+
+    def _take_prestarted(self):
+        with self._prestart_lock:
+            prestarted, self._prestarted = self._prestarted, None
+        return prestarted
+
+    def _shutdown_prestarted(self):
+        prestarted = self._take_prestarted()
+        if prestarted is None or prestarted.exception() is not None:
+            return
+        # In keep alive mode, shutdown() would keep the container idle once the exit callbacks have run
+        self._stop_call(prestarted.result())
+
+    def _start(self):
+        image = self.p('image')
+        self._state.push()
+        with span('start', image):
+            if self.p('keep_alive'):
+                with span('reuse', image):
+                    reused = self._reuse_container()
+                if reused is not None:
+                    self._state.replace(reused)
+                    return self._container
+
+            try:
+                since = int(time.time())
+                self._state.current()['since'] = since
+                self._client, self._container = self._run_container()
+                self._capture_logs()
+                with span('wait', image):
+                    self._wait_until_ready(since)
+                with span('ready', image):
+                    self._container_ready()
+            except Exception:
+                self._stop_call(self._state.pop())
+                raise
+        return self._container
+
+    def _stop_call(self, call):
+        """Stop the container of a call which won't run the function, with its logs capture."""
+        if call.get('logs') is not None:
+            call['logs'].close()
+        if call.get('container') is None:
+            return
+        try:
+            self._stop_container(call['container'])
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to stop container %s : %s', self.p('image'), call['container'].id, str(ex))
+
+    def start_async(self):
+        """
+        Asynchronous version of start(), waiting for the container without blocking the event loop.
+
+        :return: a coroutine starting the container
+        """
+        from .aio import start_container
+        return start_container(self)
+
+    def shutdown_async(self):
+        """
+        Asynchronous version of shutdown().
+
+        :return: a coroutine shutting down the container
+        """
+        from .aio import shutdown_container
+        return shutdown_container(self)
+
+    def _run_container(self):
+        client = get_client()
+
+        sweep_at_start(client)
         image = self.p('image')
         logger.debug('[%s] image is starting ...', image)
 
-        self._container = self._client.containers.run(
-            image=image,
-            detach=True,
-            command=self.p('command'),
-            volumes=self.p('volumes'),
-            ports=self.p('ports'),
-            environment=self.p('environment'),
+        if self.p('build'):
+            run_image = built_image(client, image, self.p('build'), self.p('dockerfile'), self.p('build_args'))
+        else:
+            # An image pinned by the warmup is started from its local id, without any pull
+            run_image = pinned_image(image)
+        if self.p('snapshot'):
+            spec = dict(command=self.p('command'), environment=self.p('environment'), volumes=self.p('volumes'))
+            if self.p('exec_mode'):
+                # The committed configuration keeps the idle entrypoint
+                spec['exec_mode'] = True
+            if self.p('build'):
+                spec['build'] = self.p('build')
+            snapshots = SnapshotCache(client, image, spec, max_snapshots=self.p('snapshot_max_images'),
+                                      base=run_image)
+            with span('snapshot', image):
+                warm_image = snapshots.lookup()
+            self._state.current()['snapshots'] = None if warm_image else snapshots
+            run_image = warm_image or run_image
+
+        options = dict()
+        if self.p('exec_mode'):
+            # An init process forwards the stop signal to the idle command and reaps the executed commands
+            options['init'] = True
+            if self.p('command') is None:
+                options['entrypoint'] = IDLE_ENTRYPOINT
+
+        attempt = 1
+        while True:
+            ports, allocated = self._port_bindings()
+            try:
+                with span('run', image, attempt=attempt):
+                    container = self._create_container(client, dict(
+                        image=run_image,
+                        command=self.p('command'),
+                        volumes=self.p('volumes'),
+                        ports=ports,
+                        environment=self.p('environment'),
+                        labels=container_labels(self._container_spec()),
+                        **options
+                    ))
+                break
+            except docker.errors.APIError as ex:
+                get_allocator().release(ports=allocated)
+                # Another process may have bound an allocated port in the meantime
+                if not allocated or attempt >= PORT_ALLOCATION_ATTEMPTS:
+                    raise
+                logger.debug('[%s] Unable to bind host ports %s, retrying : %s', image, allocated, str(ex))
+                attempt += 1
+
+        get_allocator().assign(allocated, container.id)
+        logger.debug('[%s] container start with id : %s', image, container.id)
+        return client, container
+
+    def _create_container(self, client, options):
+        if not self.p('files'):
+            return client.containers.run(detach=True, **options)
+        # The files are copied before the start, so they are available to the container command
+        container = client.containers.create(**options)
+        try:
+            self._inject_files(container, self._state.current())
+            container.start()
+        except Exception:
+            container.remove(v=True, force=True)
+            raise
+        return container
+
+    def _inject_files(self, container, call):
+        entries = archive_entries(sorted(self.p('files').items()))
+        digest = archive_hash(entries)
+        if call.get('files_hash') == digest:
+            logger.debug('[%s] Files are already in container %s', self.p('image'), container.id)
+            return
+        with span('files', self.p('image'), files=len(entries)):
+            if not container.put_archive('/', archive_stream(entries)):
+                raise DockerContainerError('[%s] Unable to copy files in container %s' % (
+                    self.p('image'), container.id
+                ))
+        call['files_hash'] = digest
+        logger.debug('[%s] %d files copied in container %s', self.p('image'), len(entries), container.id)
+
+    def _port_bindings(self):
+        ports, published = dict(self.p('ports')), self.p('publish_ports') or []
+        if not published:
+            return ports, []
+        if self.p('host_port_range') is None:
+            # Docker chooses ephemeral host ports
+            ports.update((port, None) for port in published)
+            return ports, []
+        try:
+            allocated = get_allocator().allocate(len(published), *self.p('host_port_range'))
+        except PortAllocationError as ex:
+            raise DockerContainerError('[%s] %s' % (self.p('image'), str(ex)))
+        ports.update(zip(published, allocated))
+        return ports, allocated
+
+    def get_host_ports(self):
+        """
+        Retrieve the host ports bound to the container of the current call, or of the last one. The same mapping is
+        available on the injected container with its ``host_ports`` attribute.
+
+        :return: a dict with the host port by container port, None when no container has been started
+        """
+        return self._state.get('host_ports')
+
+    def get_logs(self, size=None):
+        """
+        Retrieve the last logs of the container of the current call, or of the last one, from the capture buffer.
+
+        :param size: the maximum number of bytes to read (default: all the buffer)
+        :return: the logs, None when no container has been started
+        """
+        capture = self._state.get('logs')
+        return None if capture is None else capture.tail(size).decode('utf-8', 'replace')
+
+    def _capture_logs(self):
+        spill = None
+        if self.p('log_file'):
+            spill = RotatingLogFile(
+                self.p('log_file').format(id=self._container.id, image=self.p('image').replace('/', '_')),
+                self.p('log_file_max_bytes'),
+                self.p('log_file_backups')
+            )
+        # The whole logs of a new container are captured, whatever the local clock
+        self._state.current()['logs'] = LogCapture(
+            self._container, self.p('image'), max_size=self.p('log_buffer_size'), spill=spill
+        ).start()
+
+    def _container_logs(self, drain=False):
+        capture = self._state.get('logs')
+        if capture is None:
+            return self._container.logs(stream=False).decode('utf-8')
+        if drain:
+            # The logs stream of a dead container ends once its last logs have been sent
+            capture.join(LOGS_DRAIN_TIMEOUT)
+        return capture.tail().decode('utf-8', 'replace')
+
+    def get_readiness_report(self):
+        """
+        Retrieve the time spent waiting for each readiness probe of the current call, or of the last one.
+
+        :return: a dict with the latency in seconds by probe name (``log``, ``healthy``, ``tcp:<port>`` or
+                 ``http:<port><path>``), None when no probe has been waited
+        """
+        return self._state.get('readiness')
+
+    def _wait_until_ready(self, since):
+        if not any(self.p(key) for key in WAIT_FOR_PROPS):
+            return
+        watcher = ContainerWatcher(self._client, self._container, self.p('image'), since=since).start()
+        self._state.current()['watcher'] = watcher
+        try:
+            probes = self._socket_probes()
+            if self.p('wait_for_log') or self.p('wait_for_log_regex'):
+                probes.append(CallableProbe('log', self._wait_for_log))
+            if self.p('wait_for_healthy'):
+                probes.append(CallableProbe('healthy', self._wait_for_healthy))
+            self._state.current()['readiness'] = self._wait_for_probes(probes)
+        finally:
+            watcher.close()
+            del self._state.current()['watcher']
+
+    def _socket_probes(self):
+        ports, https = self.p('wait_for_port') or [], self.p('wait_for_http') or []
+        if not ports and not https:
+            return []
+        container_info = self._client.containers.get(self._container.id)
+        probes = []
+        for port in ports:
+            host, host_port = self._probe_address(self._client, container_info.attrs, port)
+            probes.append(TcpProbe(host, host_port, name='tcp:%d' % port))
+        for port, path, status in https:
+            host, host_port = self._probe_address(self._client, container_info.attrs, port)
+            probes.append(HttpProbe(host, host_port, path, status, name='http:%d%s' % (port, path)))
+        return probes
+
+    def _probe_address(self, client, attrs, port):
+        """
+        Retrieve the address to probe a container port : the docker host and the bound host port when the port is
+        published on a free host port, the container ip address and the port otherwise. A port bound to a fixed host
+        port is probed on the container ip address, as the docker proxy accepts connections before the service does,
+        unless this address cannot be reached from the local host.
+        """
+        host_port, ip_address = _host_ports(attrs).get(port), attrs['NetworkSettings']['IPAddress']
+        if host_port is None:
+            return ip_address, port
+        url = urlparse(client.api.base_url)
+        if port not in (self.p('publish_ports') or []) and _is_reachable(url, ip_address):
+            return ip_address, port
+        host = url.hostname if url.scheme in ('http', 'https') and url.hostname != 'localhost' else '127.0.0.1'
+        return host, host_port
+
+    def _wait_for_probes(self, probes):
+        image = self.p('image')
+        engine = ReadinessEngine(
+            image,
+            probes,
+            timeout=self.p('wait_timeout'),
+            check=self._check_not_failed,
+            fatal_errors=[e[0] for e in UNSUPPORTED_SOCKET_ERRORS]
         )
+        try:
+            report = engine.wait()
+        except ProbeError as ex:
+            raise DockerContainerError(next(e[1] for e in UNSUPPORTED_SOCKET_ERRORS if e[0] == ex.code).format(
+                image=image,
+                port=ex.probe.port,
+                signal=errorcode.get(ex.code, '--'),
+                ip=ex.probe.host,
+                logs=self._container_logs(drain=True)
+            ))
+        except ReadinessTimeout as ex:
+            raise DockerContainerError('%s. Container logs :\n%s' % (str(ex), self._container_logs()))
+        for name, latency in (report or {}).items():
+            record('wait.%s' % name, image, latency)
+        return report
 
-        logger.debug('[%s] container start with id : %s', image, self._container.id)
-        self._wait_for_log()
-        self._wait_for_port()
+    def _container_ready(self):
+        image = self.p('image')
         logger.debug('[%s] reloading container %s', image, self._container.id)
         self._container.reload()
         logger.debug('[%s] container is ready (id=%s)', image, self._container.id)
-        return self._container
+        host_ports = _host_ports(self._container.attrs)
+        self._container.host_ports = self._state.current()['host_ports'] = host_ports
+        snapshots = self._state.current().pop('snapshots', None)
+        if snapshots is not None:
+            snapshots.commit(self._container)
+        if self.p('reset_paths'):
+            self._state.current()['baseline'] = self._capture_baseline()
+        if self.p('keep_alive') and not self._exit_registered:
+            atexit.register(self._shutdown_at_exit)
+            self._exit_registered = True
 
     def shutdown(self):
         """
         Shutdown the container when exiting the decorator.
+
+        In keep alive mode, the container is reset (see reset()) and left running. It will only be stopped once it
+        has been idle for ``idle_ttl`` seconds, when the interpreter exits or when it cannot be reset.
         """
+        call = self._state.pop()
+        with span('shutdown', self.p('image')):
+            if self.p('keep_alive'):
+                self._keep_idle(call)
+                return
+            self._dispose_container(call['container'])
+
+    def _dispose_container(self, container):
+        # A container bound to fixed host ports is stopped before returning, so the next call can bind them again
+        if self.p('background_shutdown') and not any(p is not None for p in self.p('ports').values()):
+            get_reaper().submit(self.p('image'), container, self._stop_container)
+        else:
+            self._stop_container(container)
+
+    def _stop_container(self, container):
         img = self.p('image')
         kill_signal = self.p('kill_signal')
-        cid = self._container.id
+        cid = container.id
         try:
-            if self._container.status in ['running', 'created']:
-                if kill_signal:
-                    logger.debug('[%s] Shutdown (kill signal=%d) container with id : %s', img, kill_signal, cid)
-                    self._container.kill(signal=kill_signal)
-                else:
-                    logger.debug('[%s] Trying to shutdown gracefully container with id : %s', img, cid)
-                    self._container.stop(timeout=10)
+            if container.status in ['running', 'created']:
+                with span('stop', img, kill=bool(kill_signal)):
+                    if kill_signal:
+                        logger.debug('[%s] Shutdown (kill signal=%d) container with id : %s', img, kill_signal, cid)
+                        container.kill(signal=kill_signal)
+                    else:
+                        logger.debug('[%s] Trying to shutdown gracefully container with id : %s', img, cid)
+                        container.stop(timeout=self.p('stop_timeout'))
+            if self.p('remove'):
+                logger.debug('[%s] Removing container with id : %s', img, cid)
+                with span('remove', img):
+                    container.remove(v=True, force=True)
         except Exception as ex:
             raise DockerContainerError('[%s] Unable to stop container %s ' % (img, cid), ex)
+        finally:
+            get_allocator().release(owner=cid)
+
+    def _container_spec(self):
+        spec = dict((key, self.p(key)) for key in ('image', 'command', 'ports', 'volumes', 'environment'))
+        if self.p('exec_mode'):
+            spec['exec_mode'] = True
+        return spec
+
+    def _adopt_orphans(self):
+        with self._keep_alive_lock:
+            if self._adoption_done:
+                return
+            self._adoption_done = True
+        image = self.p('image')
+        for container in find_adoptable(get_client(), spec_hash(self._container_spec())):
+            logger.debug('[%s] Adopting orphan container (id=%s)', image, container.id)
+            adopt(container)
+            logs = LogCapture(container, image, since=int(time.time()), max_size=self.p('log_buffer_size')).start()
+            with self._keep_alive_lock:
+                self._idle.append(dict(client=get_client(), container=container, logs=logs))
+        if self._idle and not self._exit_registered:
+            atexit.register(self._shutdown_at_exit)
+            self._exit_registered = True
+
+    def _reuse_container(self):
+        if self.p('adopt_orphans'):
+            self._adopt_orphans()
+        while True:
+            with self._keep_alive_lock:
+                if not self._idle:
+                    return None
+                call = self._idle.pop()
+            if call.get('timer') is not None:
+                call.pop('timer').cancel()
+            container = call['container']
+            try:
+                container.reload()
+            except docker.errors.NotFound:
+                continue
+            if container.status == 'running' and self._refresh_files(call):
+                logger.debug('[%s] Reusing kept alive container (id=%s)', self.p('image'), container.id)
+                return call
+            logger.debug('[%s] Kept alive container %s is %s', self.p('image'), container.id, container.status)
+
+    def _refresh_files(self, call):
+        if not self.p('files'):
+            return True
+        try:
+            self._inject_files(call['container'], call)
+        except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+            logger.error('[%s] Unable to copy files in container %s : %s',
+                         self.p('image'), call['container'].id, str(ex))
+            self._dispose_container(call['container'])
+            return False
+        return True
+
+    def reset(self):
+        """
+        Restore the container of the current call in its state once ready : the ``reset_paths`` are restored from
+        the archive captured after the readiness wait and then, the ``reset_command`` is executed in the container.
+        The ``files`` are copied again when their content has changed.
+        """
+        self._reset_container(self._state.current())
+
+    def _capture_baseline(self):
+        baseline = []
+        for path in self.p('reset_paths'):
+            bits, _ = self._container.get_archive(path.rstrip('/') or '/')
+            baseline.append((path.rstrip('/') or '/', b''.join(bits)))
+        logger.debug('[%s] Baseline of %s captured (%d bytes)', self.p('image'), self.p('reset_paths'),
+                     sum(len(archive) for _, archive in baseline))
+        return baseline
+
+    def _reset_container(self, call):
+        with span('reset', self.p('image')):
+            self._restore_container(call)
+
+    def _restore_container(self, call):
+        container, image = call['container'], self.p('image')
+        for path, archive in call.get('baseline') or []:
+            self._exec_container(container, ['rm', '-rf', path])
+            if not container.put_archive(posixpath.dirname(path), archive):
+                raise DockerContainerError('[%s] Unable to restore %s in container %s' % (image, path, container.id))
+            # The restored paths may contain some of the copied files
+            call.pop('files_hash', None)
+        if self.p('reset_command'):
+            self._exec_container(container, self.p('reset_command'))
+        if self.p('files'):
+            self._inject_files(container, call)
+        logger.debug('[%s] Container %s has been reset', image, container.id)
+
+    def _exec_container(self, container, command):
+        exit_code, output = container.exec_run(command)
+        if exit_code != 0:
+            raise DockerContainerError('[%s] Command %s fails in container %s (exit code %d) :\n%s' % (
+                self.p('image'), command, container.id, exit_code, output.decode('utf-8', 'replace')
+            ))
+
+    def _keep_idle(self, call):
+        idle_ttl = self.p('idle_ttl')
+        if self.p('reset_paths') or self.p('reset_command'):
+            try:
+                self._reset_container(call)
+            except Exception as ex:  # pylint: disable=locally-disabled, broad-except
+                logger.error('[%s] Unable to reset container %s : %s', self.p('image'), call['container'].id, str(ex))
+                self._dispose_container(call['container'])
+                return
+        with self._keep_alive_lock:
+            if idle_ttl is not None:
+                timer = threading.Timer(idle_ttl, self._idle_shutdown, args=(call,))
+                timer.daemon = True
+                call['timer'] = timer
+                timer.start()
+                logger.debug('[%s] Container %s will be stopped after %.1fs of inactivity',
+                             self.p('image'), call['container'].id, idle_ttl)
+            self._idle.append(call)
+
+    def _idle_shutdown(self, call):
+        with self._keep_alive_lock:
+            # A newer call may have reused the container after this timer has fired
+            if not any(idle is call for idle in self._idle):
+                return
+            self._idle = [idle for idle in self._idle if idle is not call]
+        self._release_container(call['container'])
+
+    def _shutdown_at_exit(self):
+        with self._keep_alive_lock:
+            idle, self._idle = self._idle, []
+        for call in idle:
+            if call.get('timer') is not None:
+                call['timer'].cancel()
+            self._release_container(call['container'])
+
+    def _release_container(self, container):
+        try:
+            container.reload()
+        except docker.errors.NotFound:
+            logger.debug('[%s] Kept alive container %s has already been removed', self.p('image'), container.id)
+            get_allocator().release(owner=container.id)
+            return
+        self._stop_container(container)
+
+    def _check_not_failed(self, timeout=0):
+        watcher = self._state.get('watcher')
+        if watcher is not None and watcher.wait_failure(timeout):
+            raise DockerContainerError(CONTAINER_FAILED_MSG.format(
+                image=self.p('image'),
+                id=self._container.id,
+                failure=watcher.failure,
+                logs=self._container_logs(drain=True)
+            ))
 
     def _wait_for_log(self):
-        wait_log, image = self.p('wait_for_log'), self.p('image')
-        if wait_log:
-            for docker_log in self._container.logs(stream=True):
-                docker_log = docker_log.rstrip()
-                logger.debug('[%s - log][%s]', image, docker_log)
-                if wait_log in docker_log.decode('utf-8'):
-                    break
-            logger.debug('[%s] Log \'%s\' has been found in container logs', image, wait_log)
+        image = self.p('image')
+        matcher = LogMatcher(self.p('wait_for_log') or [], self.p('wait_for_log_regex') or [])
+        if matcher.is_matched():
+            return
+        capture = self._state.get('logs')
+        if capture is not None:
+            chunks = capture.follow()
+        else:
+            chunks = self._container.logs(stream=True)
+        for chunk in chunks:
+            if matcher.feed(chunk):
+                break
+        else:
+            # The logs stream ends with the container : wait for its death event
+            self._check_not_failed(timeout=1)
+            raise DockerContainerError('[%s] Logs of container %s end before \'%s\' appears' % (
+                image, self._container.id, '\', \''.join(matcher.remaining)
+            ))
+        logger.debug('[%s] Logs have been found in container logs', image)
+
+    def _wait_for_healthy(self):
+        watcher, image = self._state.get('watcher'), self.p('image')
+        if self.p('wait_for_healthy'):
+            self._container.reload()
+            health = self._container.attrs.get('State', {}).get('Health')
+            if health is None:
+                raise DockerContainerError('[%s] Image has no HEALTHCHECK to wait for' % image)
+            if health.get('Status') != 'healthy' and not watcher.wait_healthy():
+                self._check_not_failed()
+                raise DockerContainerError('[%s] Container %s is %s. Container logs :\n%s' % (
+                    image, self._container.id, watcher.health, self._container_logs()
+                ))
+            logger.debug('[%s] Container %s is healthy.', image, self._container.id)
 
     def _wait_for_port(self):
-        wait_port, image, res = self.p('wait_for_port'), self.p('image'), 1
-        if wait_port:
-            container_id = self._container.id
-            container_info = self._client.containers.get(container_id)
-            ip_address = container_info.attrs['NetworkSettings']['IPAddress']
-            unsupported_errors = [
-                (errno.EHOSTUNREACH,
-                 '[{image}] Host {ip} cannot be reach. The container may exit abnormally. Container logs :\n{logs}')
-            ]
-
-            with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
-                while res != 0:
-                    res = sock.connect_ex((ip_address, wait_port))
-                    logger.debug(
-                        '[%s] Waiting for port %d to respond (code:%d => %s).',
-                        image, wait_port, res, errorcode.get(res, '--')
-                    )
-                    unsupported_error = next((e[1] for e in unsupported_errors if e[0] == res), None)
-                    if unsupported_error:
-                        raise DockerContainerError(unsupported_error.format(
-                            image=image,
-                            port=wait_port,
-                            signal=errorcode.get(res, '--'),
-                            ip=ip_address,
-                            logs=self._container.logs(stream=False).decode('utf-8')
-                        ))
-
-                    time.sleep(0.1 if res != 0 else 0)
-            logger.debug('[%s] Port %d is now responding.', image, wait_port)
+        probes = self._socket_probes()
+        if probes:
+            self._wait_for_probes(probes)
+            logger.debug('[%s] Ports %s are now responding.', self.p('image'), [p.name for p in probes])
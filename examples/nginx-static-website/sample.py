@@ -105,16 +105,17 @@ def generate_site(path, files_checksum):
         (NGINX_CONF, '/etc/nginx/nginx.conf', 'ro')
     ],
     wait_for_port=8080,
+    eager=True,
 )
-def main(container):
+def main(container, files_sha256=None):
     logger.info('Nginx container with id %s is %s. Open in your browser http://localhost:8080/',
                 container.id, container.status)
-    files_sha256 = None
     while True:
         files_sha256 = generate_site(path='.', files_checksum=files_sha256)
         time.sleep(REFRESH_DELAY)
 
 
 if __name__ == '__main__':
-    main()
+    # Nginx is starting in background while the site is generated a first time
+    main(files_sha256=generate_site(path='.', files_checksum=None))
 
@@ -1,9 +1,9 @@
 import unittest
-import docker
 import logging
 import signal
 
 import docktors
+from docktors.client import get_client
 
 logging.basicConfig(format='%(asctime)-15s %(clientip)s %(user)-8s %(message)s', level=logging.DEBUG)
 
@@ -63,12 +63,12 @@ def mysql_container_for_port(container, func):
 
 class DockerTest(unittest.TestCase):
     def setUp(self):
-        client = docker.from_env()
+        client = get_client()
         for container in client.containers.list():
             container.kill(signal=signal.SIGKILL)
 
     def tearDown(self):
-        client = docker.from_env()
+        client = get_client()
         containers = client.containers.list()
         ids = [container.id for container in containers]
         self.assertEqual(msg='No containers should run. Found : %s' % ids, first=len(ids), second=0)
@@ -83,7 +83,7 @@ class DockerTest(unittest.TestCase):
     def test_container_exist(self):
         # GIVEN
         def _is_alpine_up():
-            containers = docker.from_env().containers.list()
+            containers = get_client().containers.list()
             if len(containers) != 1:
                 return False
             container = containers[0]
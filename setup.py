@@ -17,13 +17,15 @@ VERSION = open('VERSION').readline().strip()
 setup(
     name=GITHUB['repository'],
     version=VERSION,
-    packages=find_packages(exclude=['it.tests', 'tests', 'examples']),
+    packages=find_packages(exclude=['it.tests', 'tests', 'examples', 'benchmarks']),
     description='Simple docker decorator',
     long_description=open('README.rst').read(),
     author=', '.join(AUTHORS.values()),
     author_email=', '.join(AUTHORS.keys()),
     install_requires=[
-        'docker>=2.0.0'
+        'docker>=4.0.0',
+        'futures>=3.0.5; python_version < "3"',
+        'selectors2>=2.0.0; python_version < "3.4"',
     ],
     url='https://github.com/{user}/{repository}'.format(
         user=GITHUB['user'],
@@ -34,6 +36,14 @@ setup(
         repository=GITHUB['user'],
         version=VERSION
     ),
+    entry_points={
+        'console_scripts': [
+            'docktors-sweep = docktors.sweeper:main',
+        ],
+        'pytest11': [
+            'docktors = docktors.pytest_plugin',
+        ],
+    },
     keywords=[
         'docker',
         'decorator',
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import socket
+import unittest
+
+import mock
+
+from docktors.client import close_clients
+from docktors.core import DecWrapper, decorated
+from docktors.reaper import flush_reaper
+from docktors.wdocker import DockerContainer, DockerContainerError
+
+
+async def dec_coroutine(*args):
+    await asyncio.sleep(0)
+    return args
+
+
+class TestDecoratedAsync(unittest.TestCase):
+    """Test the decorated coroutine function"""
+
+    def test_decorated_coroutine_synchronous_wrapper(self):
+        # GIVEN
+        events = []
+        wrapping_mock = mock.Mock(spec=DecWrapper)
+        wrapping_mock.inject_arg = True
+        wrapping_mock.start.side_effect = lambda: events.append('start')
+        wrapping_mock.get_args.return_value = ['First arg']
+        wrapping_mock.shutdown.side_effect = lambda: events.append('shutdown')
+
+        async def _coroutine(*args):
+            events.append('run')
+            return args
+
+        # WHEN
+        output = asyncio.run(decorated(wrapping=wrapping_mock, func=_coroutine)('Hello World'))
+
+        # THEN
+        self.assertEqual(output, ('First arg', 'Hello World'), 'Wrapping args should be injected')
+        self.assertEqual(events, ['start', 'run', 'shutdown'], 'Shutdown should occur after the coroutine ran')
+
+    def test_decorated_coroutine_native_wrapper(self):
+        # GIVEN
+        wrapping_mock = mock.Mock(spec=DockerContainer)
+        wrapping_mock.inject_arg = False
+        wrapping_mock.start_async = mock.AsyncMock()
+        wrapping_mock.shutdown_async = mock.AsyncMock()
+
+        # WHEN
+        output = asyncio.run(decorated(wrapping=wrapping_mock, func=dec_coroutine)('Hello World'))
+
+        # THEN
+        self.assertEqual(output, ('Hello World',), 'Function output should not change')
+        wrapping_mock.start_async.assert_awaited_once_with()
+        wrapping_mock.shutdown_async.assert_awaited_once_with()
+        wrapping_mock.start.assert_not_called()
+        wrapping_mock.shutdown.assert_not_called()
+
+
+class TestDockerContainerAsync(unittest.TestCase):
+    """Testing class for DockerContainer asynchronous methods"""
+
+    def tearDown(self):
+        close_clients()
+
+    @mock.patch(target='docker.from_env')
+    def test_concurrent_calls(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', inject_arg=True)
+        docker_mock.return_value.containers.run.side_effect = lambda **kwargs: mock.MagicMock(status='running')
+
+        async def _coroutine(container):
+            await asyncio.sleep(0.01)
+            return container
+
+        async def _main():
+            decorated_coroutine = decorated(docker_container, _coroutine)
+            return await asyncio.gather(*[decorated_coroutine() for _ in range(3)])
+
+        # WHEN
+        containers = asyncio.run(_main())
+        flush_reaper()
+
+        # THEN
+        self.assertEqual(len(set(containers)), 3, 'Each task should get its own container')
+        [c.stop.assert_called_once_with(timeout=10) for c in containers]
+
+    @mock.patch(target='docker.from_env')
+    def test_start_async_wait_for_port(self, docker_mock):
+        # GIVEN
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        docker_container = DockerContainer(image='alpine', wait_for_port=port)
+        docker_mock.return_value.containers.get.return_value.attrs = dict(
+            NetworkSettings=dict(IPAddress='127.0.0.1')
+        )
+
+        # WHEN
+        try:
+            output = asyncio.run(docker_container.start_async())
+        finally:
+            server.close()
+
+        # THEN
+        self.assertEqual(output, docker_mock.return_value.containers.run.return_value)
+        output.reload.assert_called_once_with()
+
+    @mock.patch(target='docker.from_env')
+    def test_start_async_wait_for_http(self, docker_mock):
+        # GIVEN
+        responses = [b'HTTP/1.0 503 Service Unavailable\r\n\r\n', b'HTTP/1.0 200 OK\r\n\r\n']
+
+        async def _handle(reader, writer):
+            await reader.readline()
+            writer.write(responses.pop(0))
+            await writer.drain()
+            writer.close()
+
+        async def _main():
+            server = await asyncio.start_server(_handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            docker_container = DockerContainer(image='alpine', wait_for_http=(port, '/health'), wait_timeout=5)
+            try:
+                await docker_container.start_async()
+            finally:
+                server.close()
+            return docker_container.get_readiness_report()
+
+        docker_mock.return_value.containers.get.return_value.attrs = dict(
+            NetworkSettings=dict(IPAddress='127.0.0.1')
+        )
+
+        # WHEN
+        output = asyncio.run(_main())
+
+        # THEN
+        self.assertEqual(len(output), 1, 'Report should contain the HTTP probe')
+        self.assertTrue(list(output.keys())[0].endswith('/health'), 'Report should contain the HTTP probe')
+        self.assertEqual(responses, [], 'HTTP endpoint should have been requested twice')
+
+    @mock.patch(target='docker.from_env')
+    def test_start_async_wait_for_log(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', wait_for_log='wait for log')
+        container = docker_mock.return_value.containers.run.return_value
+        container.status = 'running'
+        container.logs.return_value = [b'wait once\n', b'wait for', b' log\n']
+
+        # WHEN
+        output = asyncio.run(docker_container.start_async())
+
+        # THEN
+        self.assertEqual(output, container)
+        container.logs.assert_called_once_with(stream=True, follow=True)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_async_wait_for_log_container_exited(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', wait_for_log='wait for log')
+        container = docker_mock.return_value.containers.run.return_value
+        container.id = 'c5f0cad13259'
+        container.status = 'exited'
+        container.logs.return_value = [b'container failed to start']
+
+        # WHEN
+        with self.assertRaises(DockerContainerError) as cm:
+            asyncio.run(docker_container.start_async())
+
+        # THEN
+        self.assertEqual(
+            str(cm.exception),
+            "[alpine] Container c5f0cad13259 is exited before log 'wait for log' appears. Container logs :\n"
+            "container failed to start"
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from docktors.archive import ArchiveError, archive_entries, archive_hash, archive_stream
+
+
+class TestArchive(unittest.TestCase):
+    """Testing class for archive module"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'conf', 'sub'))
+        for path, content in [('app.cfg', b'debug=1\n'), ('conf/a.yml', b'a: 1\n'), ('conf/sub/b.yml', b'b: 2\n')]:
+            with open(os.path.join(self.root, path), 'wb') as output:
+                output.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_archive_entries(self):
+        # WHEN
+        output = archive_entries([
+            (os.path.join(self.root, 'conf'), '/etc/app/'), (os.path.join(self.root, 'app.cfg'), '/app.cfg')
+        ])
+
+        # THEN
+        self.assertEqual([target for _, target in output], [
+            'app.cfg', 'etc/app', 'etc/app/a.yml', 'etc/app/sub', 'etc/app/sub/b.yml'
+        ])
+
+    def test_archive_entries_missing_file(self):
+        # WHEN
+        with self.assertRaises(ArchiveError) as cm:
+            archive_entries([(os.path.join(self.root, 'missing'), '/missing')])
+
+        # THEN
+        self.assertEqual(str(cm.exception), 'File %s does not exist' % os.path.join(self.root, 'missing'))
+
+    def test_archive_hash(self):
+        # GIVEN
+        entries = archive_entries([(os.path.join(self.root, 'conf'), '/etc/app')])
+        before = archive_hash(entries)
+
+        # WHEN
+        os.utime(os.path.join(self.root, 'conf', 'a.yml'), (0, 0))
+        touched = archive_hash(entries)
+        with open(os.path.join(self.root, 'conf', 'a.yml'), 'wb') as output:
+            output.write(b'a: 2\n')
+        changed = archive_hash(entries)
+
+        # THEN
+        self.assertEqual(before, touched, 'Modification time should not change the hash')
+        self.assertNotEqual(before, changed, 'Content change should change the hash')
+        self.assertNotEqual(before, archive_hash(archive_entries([(os.path.join(self.root, 'conf'), '/etc/other')])))
+
+    def test_archive_stream(self):
+        # GIVEN
+        entries = archive_entries([(os.path.join(self.root, 'conf'), '/etc/app')])
+
+        # WHEN
+        output = list(archive_stream(entries))
+
+        # THEN
+        self.assertEqual(len(b''.join(output)) % tarfile.BLOCKSIZE, 0)
+        tar = tarfile.open(fileobj=io.BytesIO(b''.join(output)))
+        self.assertEqual(tar.getnames(), ['etc/app', 'etc/app/a.yml', 'etc/app/sub', 'etc/app/sub/b.yml'])
+        self.assertTrue(tar.getmember('etc/app/sub').isdir())
+        self.assertEqual(tar.extractfile('etc/app/sub/b.yml').read(), b'b: 2\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
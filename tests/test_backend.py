@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import mock
+
+from docktors.backend import Backend, DockerBackend, get_backend, load_backend, set_backend
+from docktors.client import get_client
+from docktors.fake import FakeBackend, FakeClient
+
+# Backend loaded by path in the tests
+backend = FakeBackend()
+
+
+class TestBackend(unittest.TestCase):
+    """Testing class for the backend selection"""
+
+    def tearDown(self):
+        set_backend(None)
+
+    def test_load_backend(self):
+        # WHEN
+        docker_backend = load_backend('docker')
+        fake_backend = load_backend('fake')
+        path_backend = load_backend('%s:backend' % __name__)
+        factory_backend = load_backend('docktors.fake:FakeBackend')
+
+        # THEN
+        self.assertIsInstance(docker_backend, DockerBackend)
+        self.assertIsInstance(fake_backend, FakeBackend)
+        self.assertIs(path_backend, backend)
+        self.assertIsInstance(factory_backend, FakeBackend)
+        self.assertIs(load_backend(backend), backend)
+
+    def test_load_backend_unknown(self):
+        # WHEN / THEN
+        with self.assertRaises(ValueError):
+            load_backend('podman')
+
+    @mock.patch.dict(os.environ, {'DOCKTORS_BACKEND': 'fake'})
+    def test_get_backend_from_environment(self):
+        # GIVEN
+        set_backend(None)
+
+        # WHEN
+        output = get_backend()
+
+        # THEN
+        self.assertIsInstance(output, FakeBackend)
+        self.assertIs(get_backend(), output, 'Backend should be loaded once')
+        self.assertIsInstance(get_client(), FakeClient)
+
+    @mock.patch(target='docker.from_env')
+    def test_set_backend(self, docker_mock):
+        # GIVEN
+        set_backend('docker')
+        docker_client = get_client(environment={})
+
+        # WHEN
+        previous = set_backend(backend)
+        output = get_client(environment={})
+
+        # THEN
+        self.assertIsInstance(previous, DockerBackend)
+        docker_client.close.assert_called_once_with()
+        self.assertIsInstance(output, FakeClient)
+        self.assertIs(output.backend, backend)
+
+    def test_backend_client_abstract(self):
+        # WHEN / THEN
+        with self.assertRaises(NotImplementedError):
+            Backend().client({}, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.fake_engine import FakeEngine
+from benchmarks.run import compare, run_benchmarks
+from docktors.client import close_clients
+from docktors.reaper import flush_reaper
+from docktors.wdocker import DockerContainer
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Testing class for benchmarks against the fake docker engine"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = FakeEngine(os.path.join(self.directory, 'docker.sock'), log_delay=0.05, port_delay=0.05).start()
+
+    def tearDown(self):
+        close_clients()
+        self.engine.stop()
+        shutil.rmtree(self.directory)
+
+    def test_fake_engine(self):
+        # GIVEN
+        docker_container = DockerContainer(image='bench', publish_ports=80, wait_for_port=80, wait_for_log='ready')
+        os.environ['DOCKER_HOST'] = self.engine.base_url
+        self.addCleanup(os.environ.pop, 'DOCKER_HOST')
+
+        # WHEN
+        container = docker_container.start()
+        host_ports = docker_container.get_host_ports()
+        docker_container.shutdown()
+        flush_reaper()
+
+        # THEN
+        self.assertEqual(list(host_ports), [80])
+        self.assertEqual(sorted(docker_container.get_readiness_report()), ['log', 'tcp:80'])
+        self.assertIsNone(self.engine.get(container.id), 'Container should have been removed')
+
+    def test_run_benchmarks(self):
+        # WHEN
+        output = run_benchmarks(iterations=2, callers=2, delay=0.01)
+
+        # THEN
+        self.assertEqual(sorted(output['benchmarks']), [
+            'decorator_overhead', 'keep_alive_call', 'readiness_wait', 'start_shutdown', 'throughput'
+        ])
+        self.assertEqual(compare(output, output, 0.0), [], 'Results should not regress against themselves')
+
+    def test_compare(self):
+        # GIVEN
+        baseline = dict(benchmarks=dict(
+            start_shutdown=dict(value=10.0, unit='ms', better='lower'),
+            throughput=dict(value=100.0, unit='calls/s', better='higher'),
+        ))
+        results = dict(benchmarks=dict(
+            start_shutdown=dict(value=11.0, unit='ms', better='lower'),
+            throughput=dict(value=50.0, unit='calls/s', better='higher'),
+        ))
+
+        # WHEN
+        output = compare(results, baseline, 0.25)
+
+        # THEN
+        self.assertEqual(output, ['throughput : 50.000 calls/s instead of 100.000 calls/s (+100%)'])
+
+
+if __name__ == '__main__':
+    unittest.main()
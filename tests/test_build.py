@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+import docker
+import mock
+
+from docktors.build import BuildError, ImageBuilder, context_files, context_hash, context_tar
+from docktors.client import close_clients
+from docktors.wdocker import DockerContainer
+
+
+def _write(path, content):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as output:
+        output.write(content)
+
+
+class TestBuild(unittest.TestCase):
+    """Testing class for build module"""
+
+    def setUp(self):
+        self.context = tempfile.mkdtemp()
+        _write(os.path.join(self.context, 'Dockerfile'), b'FROM alpine\nCOPY app /app\n')
+        _write(os.path.join(self.context, 'app', 'main.sh'), b'#!/bin/sh\necho hello\n')
+        _write(os.path.join(self.context, 'build', 'output.log'), b'ignored')
+        _write(os.path.join(self.context, '.dockerignore'), b'# Build outputs\nbuild\n')
+        self.client = mock.MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.context)
+        close_clients()
+
+    def test_context_files(self):
+        # WHEN
+        output = context_files(self.context)
+
+        # THEN
+        self.assertEqual(output, ['.dockerignore', 'Dockerfile', 'app', os.path.join('app', 'main.sh')])
+
+    def test_context_hash(self):
+        # GIVEN
+        before = context_hash(self.context, context_files(self.context))
+
+        # WHEN
+        _write(os.path.join(self.context, 'build', 'output.log'), b'changed')
+        ignored = context_hash(self.context, context_files(self.context))
+        _write(os.path.join(self.context, 'app', 'main.sh'), b'#!/bin/sh\necho bye\n')
+        changed = context_hash(self.context, context_files(self.context))
+
+        # THEN
+        self.assertEqual(before, ignored, 'Ignored files should not change the hash')
+        self.assertNotEqual(before, changed, 'Content change should change the hash')
+        self.assertNotEqual(before, context_hash(self.context, context_files(self.context), buildargs=dict(A='1')))
+
+    def test_context_tar(self):
+        # GIVEN
+        files = context_files(self.context)
+
+        # WHEN
+        output = b''.join(context_tar(self.context, files))
+
+        # THEN
+        tar = tarfile.open(fileobj=io.BytesIO(output))
+        self.assertEqual(sorted(tar.getnames()), files)
+        self.assertEqual(tar.extractfile('app/main.sh').read(), b'#!/bin/sh\necho hello\n')
+
+    def test_build_unchanged_context(self):
+        # GIVEN
+        builder = ImageBuilder(self.client, 'my-app', self.context)
+
+        # WHEN
+        output = builder.build()
+
+        # THEN
+        self.assertTrue(output.startswith('my-app:docktors-'))
+        self.client.images.get.assert_called_once_with(output)
+        self.client.api.build.assert_not_called()
+
+    def test_build_changed_context(self):
+        # GIVEN
+        builder = ImageBuilder(self.client, 'my-app', self.context, buildargs=dict(VERSION='1'))
+        self.client.images.get.side_effect = docker.errors.ImageNotFound('my-app')
+        self.client.api.build.return_value = iter([dict(stream='Step 1/2 : FROM alpine\n')])
+
+        # WHEN
+        output = builder.build()
+
+        # THEN
+        self.client.api.build.assert_called_once_with(
+            fileobj=mock.ANY, custom_context=True, tag=output, dockerfile=None, buildargs=dict(VERSION='1'),
+            rm=True, decode=True
+        )
+
+    def test_build_error(self):
+        # GIVEN
+        builder = ImageBuilder(self.client, 'my-app', self.context)
+        self.client.images.get.side_effect = docker.errors.ImageNotFound('my-app')
+        self.client.api.build.return_value = iter([
+            dict(stream='Step 2/2 : COPY missing /app\n'), dict(error='COPY failed: no source files\n')
+        ])
+
+        # WHEN
+        with self.assertRaises(BuildError) as cm:
+            builder.build()
+
+        # THEN
+        self.assertEqual(str(cm.exception), '[my-app] Unable to build image from %s : COPY failed: no source files\n'
+                                            'Step 2/2 : COPY missing /app\n' % self.context)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_built_image(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='my-app', build=self.context)
+
+        # WHEN
+        docker_container.start()
+        docker_container.start()
+
+        # THEN
+        docker_mock.return_value.images.get.assert_called_once()
+        run_image = docker_mock.return_value.containers.run.call_args[1]['image']
+        self.assertTrue(run_image.startswith('my-app:docktors-'))
+
+    @mock.patch(target='docktors.build.context_files', wraps=context_files)
+    @mock.patch(target='docker.from_env')
+    def test_start_built_image_other_wrappers(self, docker_mock, context_files_mock):
+        # GIVEN
+        wrappers = [DockerContainer(image='my-app', build=self.context, build_args=dict(VERSION='2'))
+                    for _ in range(3)]
+
+        # WHEN
+        for wrapper in wrappers:
+            wrapper.start()
+
+        # THEN
+        context_files_mock.assert_called_once_with(self.context, None)
+        docker_mock.return_value.images.get.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import mock
+
+from docktors.client import close_clients, get_client
+
+
+class TestClient(unittest.TestCase):
+    """Testing class for the shared docker clients"""
+
+    def tearDown(self):
+        close_clients()
+
+    @mock.patch(target='docker.from_env')
+    def test_get_client_shared(self, docker_mock):
+        # GIVEN
+        environment = {'DOCKER_HOST': 'tcp://127.0.0.1:2375'}
+
+        # WHEN
+        first = get_client(environment=environment)
+        second = get_client(environment=dict(environment))
+
+        # THEN
+        self.assertIs(first, second, 'Client should be shared for a same docker environment')
+        docker_mock.assert_called_once_with(environment=environment, max_pool_size=10)
+
+    @mock.patch(target='docker.from_env')
+    def test_get_client_by_environment(self, docker_mock):
+        # GIVEN
+        docker_mock.side_effect = lambda **kwargs: mock.MagicMock()
+
+        # WHEN
+        first = get_client(environment={'DOCKER_HOST': 'tcp://127.0.0.1:2375'})
+        second = get_client(environment={'DOCKER_HOST': 'tcp://127.0.0.2:2375'})
+        third = get_client(environment={'DOCKER_HOST': 'tcp://127.0.0.1:2375'}, max_pool_size=32)
+
+        # THEN
+        self.assertEqual(len({id(first), id(second), id(third)}), 3, 'One client should exist by environment')
+        docker_mock.assert_called_with(environment={'DOCKER_HOST': 'tcp://127.0.0.1:2375'}, max_pool_size=32)
+
+    @mock.patch(target='docker.from_env')
+    def test_close_clients(self, docker_mock):
+        # GIVEN
+        docker_mock.side_effect = lambda **kwargs: mock.MagicMock()
+        client = get_client(environment={})
+
+        # WHEN
+        close_clients()
+        output = get_client(environment={})
+
+        # THEN
+        client.close.assert_called_once_with()
+        self.assertIsNot(client, output, 'A new client should be created after close')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -107,6 +107,28 @@ class TestDecWrapper(unittest.TestCase):
             "[Test] : Option 'dict_prop' bad type. Expected 'dict'. Got 'list' instead."
         )
 
+    def test__check_inputs_bad_list_type(self):
+        # GIVEN
+        props = {
+            'list_prop': dict(
+                argtype=[(int, str)],
+                alternatives=[
+                    ((int, str), lambda v: [v])
+                ]
+            )
+        }
+        inputs = {'list_prop': 80}
+
+        # WHEN
+        with self.assertRaises(TypeError) as cm:
+            DecWrapper('Test', inputs, props)
+
+        # THEN
+        self.assertEqual(
+            str(cm.exception),
+            "[Test] : Option 'list_prop' bad type. Expected '[(int, str)]'. Got 'int' instead."
+        )
+
     def test__check_inputs_ok_dict_using_alternative(self):
         # GIVEN
         props = {
@@ -1,6 +1,23 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import time
 import unittest
 
+from docktors.backend import set_backend
+from docktors.decorators import docker
+from docktors.fake import FakeBackend, SimulatedService
+from docktors.pool import DockerContainerPool
+from docktors.reaper import flush_reaper
+from docktors.warmup import unpin, warmup
+from docktors.wdocker import DockerContainer
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 def dec_func(name):
     return 'Hello %s' % name
@@ -19,5 +36,167 @@ class TestDocker(unittest.TestCase):
         self.fail()
 
 
+class TestDockerEager(unittest.TestCase):
+    """Test the eager start of the docker decorator"""
+
+    def setUp(self):
+        self.backend = FakeBackend(services={'slow': lambda: SimulatedService(logs=['ready'], log_delay=0.3)})
+        set_backend(self.backend)
+
+    def tearDown(self):
+        flush_reaper()
+        self.backend.clear()
+        set_backend(None)
+        unpin()
+
+    def test_docker_eager(self):
+        # GIVEN
+        @docker(image='slow', wait_for_log='ready', eager=True, background_shutdown=False, inject_arg=True)
+        def func(container):
+            return container.id
+
+        started = self._wait_started()
+        time.sleep(0.5)
+
+        # WHEN
+        begin = time.time()
+        first = func()
+        elapsed = time.time() - begin
+        second = func()
+
+        # THEN
+        self.assertEqual(len(started), 1, 'Container should be started by the decoration')
+        self.assertEqual(first, started[0], 'First call should use the container started in background')
+        self.assertLess(elapsed, 0.2, 'First call should not wait for the start')
+        self.assertNotEqual(second, first, 'Next calls should start their own container')
+        self.assertEqual(self.backend.containers, [])
+
+    def test_docker_eager_pending(self):
+        # GIVEN
+        @docker(image='slow', wait_for_log='ready', eager=True, background_shutdown=False, inject_arg=True)
+        def func(container):
+            return container.id
+
+        # WHEN
+        output = func()
+
+        # THEN
+        self.assertIsNotNone(output)
+        self.assertEqual(self.backend.containers, [], 'Container started in background should be removed')
+
+    def test_docker_eager_warmup(self):
+        # GIVEN
+        @docker(image='slow', wait_for_log='ready', eager='warmup', background_shutdown=False, inject_arg=True)
+        def func(container):
+            return container.id
+
+        started = list(self.backend.containers)
+
+        # WHEN
+        warmup(['slow'])
+        output = func()
+
+        # THEN
+        self.assertEqual(started, [], 'Container should wait for the warmup')
+        self.assertIsNotNone(output)
+
+    def test_docker_eager_async(self):
+        # GIVEN
+        @docker(image='slow', wait_for_log='ready', eager=True, background_shutdown=False, inject_arg=True)
+        async def func(container):
+            return container.id
+
+        started = self._wait_started()
+
+        # WHEN
+        output = asyncio.new_event_loop().run_until_complete(func())
+
+        # THEN
+        self.assertEqual(output, started[0])
+
+    def test_docker_eager_shutdown_at_exit(self):
+        # GIVEN
+        script = textwrap.dedent("""
+            import atexit, sys, time
+            from docktors.backend import set_backend
+            from docktors.fake import FakeBackend, SimulatedService
+
+            backend = FakeBackend(services={'slow': lambda: SimulatedService(logs=['ready'])})
+            # Called last, once the docktors exit callbacks are over
+            atexit.register(lambda: sys.stdout.write('left=%d' % len(backend.containers)))
+            set_backend(backend)
+
+            from docktors.decorators import docker
+            from docktors.pool import DockerContainerPool
+
+            @docker(image='slow', wait_for_log='ready', eager=True)
+            def func():
+                pass
+
+            DockerContainerPool(image='slow', wait_for_log='ready', pool_size=2).prestart()
+            deadline = time.time() + 5
+            while len(backend.containers) < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            sys.stdout.write('started=%d ' % len(backend.containers))
+        """)
+
+        # WHEN
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=ROOT, stderr=subprocess.STDOUT)
+
+        # THEN
+        self.assertEqual(output.decode('utf-8').strip().splitlines()[-1], 'started=3 left=0')
+
+    def test_docker_eager_keep_alive_shutdown_at_exit(self):
+        # GIVEN
+        script = textwrap.dedent("""
+            import atexit, sys, time
+            from docktors.backend import set_backend
+            from docktors.fake import FakeBackend, SimulatedService
+
+            backend = FakeBackend(services={'slow': lambda: SimulatedService(logs=['ready'])})
+            # Called last, once the docktors exit callbacks are over
+            atexit.register(lambda: sys.stdout.write('left=%d' % len(backend.containers)))
+            set_backend(backend)
+
+            from docktors.decorators import docker
+
+            @docker(image='slow', wait_for_log='ready', eager=True, keep_alive=True)
+            def func():
+                pass
+
+            deadline = time.time() + 5
+            while not backend.containers and time.time() < deadline:
+                time.sleep(0.01)
+            sys.stdout.write('started=%d ' % len(backend.containers))
+        """)
+
+        # WHEN
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=ROOT, stderr=subprocess.STDOUT)
+
+        # THEN
+        self.assertEqual(output.decode('utf-8').strip().splitlines()[-1], 'started=1 left=0')
+
+    def _wait_started(self):
+        deadline = time.time() + 2
+        while not self.backend.containers and time.time() < deadline:
+            time.sleep(0.01)
+        return [c.id for c in self.backend.containers]
+
+    def test_docker_eager_false(self):
+        # WHEN
+        docker_container = DockerContainer(image='slow', eager=False)
+        pool = DockerContainerPool(image='slow', pool_size=1, eager=False)
+
+        # THEN
+        self.assertIsNone(docker_container.p('eager'))
+        self.assertIsNone(pool.p('eager'))
+        self.assertEqual(self.backend.containers, [], 'No container should be started')
+
+    def test_docker_eager_bad_value(self):
+        # WHEN / THEN
+        with self.assertRaises(SyntaxError):
+            docker(image='slow', eager='later')
+
+
 if __name__ == '__main__':
     unittest.main()
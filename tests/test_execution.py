@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import mock
+
+from docktors.execution import CommandRunner, ExecError
+
+
+class TestCommandRunner(unittest.TestCase):
+    """Testing class for CommandRunner"""
+
+    def setUp(self):
+        self.client = mock.MagicMock()
+        self.client.api.exec_create.return_value = dict(Id='e1')
+        self.client.api.exec_start.return_value = iter([(b'line 1\n', None), (None, b'warning\n'), (b'line 2\n', None)])
+        self.client.api.exec_inspect.return_value = dict(ExitCode=0)
+        self.container = mock.MagicMock(id='c5f0cad13259')
+
+    def test_run(self):
+        # GIVEN
+        runner = CommandRunner(self.client, self.container, 'alpine')
+        on_output = mock.MagicMock()
+
+        # WHEN
+        output = runner.run(['ls', '-l'], workdir='/tmp', on_output=on_output)
+
+        # THEN
+        self.client.api.exec_create.assert_called_once_with(
+            'c5f0cad13259', ['ls', '-l'], stdout=True, stderr=True, environment=None, workdir='/tmp', user=''
+        )
+        self.client.api.exec_start.assert_called_once_with('e1', stream=True, demux=True)
+        self.assertEqual(output.exit_code, 0)
+        self.assertTrue(output.ok)
+        self.assertEqual(output.stdout, b'line 1\nline 2\n')
+        self.assertEqual(output.stderr, b'warning\n')
+        self.assertEqual(on_output.call_args_list, [
+            mock.call('stdout', b'line 1\n'), mock.call('stderr', b'warning\n'), mock.call('stdout', b'line 2\n')
+        ])
+
+    def test_run_check_failure(self):
+        # GIVEN
+        runner = CommandRunner(self.client, self.container, 'alpine')
+        self.client.api.exec_inspect.return_value = dict(ExitCode=2)
+
+        # WHEN
+        with self.assertRaises(ExecError) as cm:
+            runner.run('ls /missing', check=True)
+
+        # THEN
+        self.assertEqual(cm.exception.result.exit_code, 2)
+        self.assertEqual(
+            str(cm.exception), '[alpine] Command ls /missing fails in container c5f0cad13259 (exit code 2) :\nwarning\n'
+        )
+
+    def test_stream(self):
+        # GIVEN
+        runner = CommandRunner(self.client, self.container, 'alpine')
+
+        # WHEN
+        process = runner.stream('ls')
+        first = next(iter(process))
+
+        # THEN
+        self.assertEqual(first, ('stdout', b'line 1\n'))
+        self.assertIsNone(process.exit_code, 'Exit code is unknown until the output is read')
+        self.assertEqual(process.wait(), 0)
+        self.client.api.exec_inspect.assert_called_once_with('e1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import io
+import os
+import shutil
+import socket
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+
+import docker
+
+from docktors.backend import set_backend
+from docktors.core import decorated
+from docktors.fake import FakeBackend, SimulatedService, SubprocessService
+from docktors.pool import DockerContainerPool
+from docktors.reaper import flush_reaper
+from docktors.warmup import unpin, warmup
+from docktors.wdocker import DockerContainer, DockerContainerError
+
+
+class TestFake(unittest.TestCase):
+    """Testing class for the fake backend"""
+
+    def setUp(self):
+        self.backend = FakeBackend(services={
+            'postgres': lambda: SimulatedService(logs=['ready to accept connections'], ports=[5432], log_delay=0.05),
+            'web': lambda: SimulatedService(ports=[80], port_delay=0.05, healthy_delay=0.05),
+            'crash': lambda: SimulatedService(logs=['fatal error'], exit_code=3),
+            'crash-later': lambda: SimulatedService(logs=['fatal error'], port_delay=10, exit_code=3, exit_delay=0.2),
+            'shell': SubprocessService,
+        })
+        set_backend(self.backend)
+        self.client = self.backend.client({}, 10)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        flush_reaper()
+        self.backend.clear()
+        set_backend(None)
+        unpin()
+        shutil.rmtree(self.directory)
+
+    def test_decorated_wait_for_log_and_port(self):
+        # GIVEN
+        wrapped = decorated(DockerContainer(image='postgres', wait_for_log='ready to accept', wait_for_port=5432,
+                                            background_shutdown=False, inject_arg=True), lambda c: dict(c.host_ports))
+
+        # WHEN
+        output = wrapped()
+
+        # THEN
+        self.assertEqual(list(output), [5432])
+        self.assertEqual(self.backend.containers, [], 'Container should be removed')
+
+    def test_decorated_fixed_ports(self):
+        # GIVEN
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        wrapped = decorated(DockerContainer(image='postgres', ports={5432: port}, wait_for_port=5432,
+                                            inject_arg=True), lambda c: c.host_ports[5432])
+
+        # WHEN
+        output = [wrapped() for _ in range(3)]
+
+        # THEN
+        self.assertEqual(output, [port] * 3, 'Host port should be free again once the function returns')
+        self.assertEqual(self.backend.containers, [])
+
+    def test_decorated_wait_for_healthy(self):
+        # GIVEN
+        def func(container):
+            socket.create_connection(('127.0.0.1', container.host_ports[80])).close()
+            return container.attrs['State']['Health']['Status']
+
+        wrapped = decorated(DockerContainer(image='web', publish_ports=[80], wait_for_port=80, wait_for_healthy=True,
+                                            inject_arg=True), func)
+
+        # WHEN
+        output = wrapped()
+
+        # THEN
+        self.assertEqual(output, 'healthy')
+
+    def test_decorated_container_exits(self):
+        # GIVEN
+        wrapped = decorated(DockerContainer(image='crash', wait_for_log='ready', wait_timeout=5), lambda: None)
+
+        # WHEN
+        with self.assertRaises(DockerContainerError) as context:
+            wrapped()
+
+        # THEN
+        self.assertIn('fatal error', str(context.exception))
+
+    def test_decorated_wait_timeout(self):
+        # GIVEN
+        wrapped = decorated(DockerContainer(image='web', wait_for_log='ready', wait_timeout=0.3), lambda: None)
+
+        # WHEN
+        with self.assertRaises(DockerContainerError):
+            wrapped()
+
+        # THEN
+        self.assertEqual(self.backend.containers, [], 'Container should be removed')
+        self.assertFalse(self._log_threads(), 'Logs capture should be closed')
+
+    def test_decorated_wait_timeout_async(self):
+        # GIVEN
+        async def func():
+            pass
+
+        wrapped = decorated(DockerContainer(image='web', wait_for_log='ready', wait_timeout=0.3), func)
+
+        # WHEN
+        with self.assertRaises(DockerContainerError):
+            asyncio.new_event_loop().run_until_complete(wrapped())
+
+        # THEN
+        self.assertEqual(self.backend.containers, [], 'Container should be removed')
+        self.assertFalse(self._log_threads(), 'Logs capture should be closed')
+
+    def test_decorated_container_exits_async(self):
+        # GIVEN
+        async def func():
+            pass
+
+        wrapped = decorated(DockerContainer(image='crash-later', publish_ports=5432, wait_for_port=5432,
+                                            wait_timeout=5), func)
+
+        # WHEN
+        begin = time.time()
+        with self.assertRaises(DockerContainerError) as context:
+            asyncio.new_event_loop().run_until_complete(wrapped())
+
+        # THEN
+        self.assertLess(time.time() - begin, 2, 'Container death should be detected while probing its ports')
+        self.assertIn('exits (die (exit code 3)) before being ready', str(context.exception))
+        self.assertIn('fatal error', str(context.exception))
+
+    def test_pool_wait_timeout(self):
+        # GIVEN
+        pool = DockerContainerPool(image='web', pool_size=1, wait_for_log='ready', wait_timeout=0.3)
+
+        # WHEN
+        with self.assertRaises(DockerContainerError):
+            pool.start()
+        pool.close()
+
+        # THEN
+        self.assertEqual(self.backend.containers, [], 'Containers failing to start should be removed')
+
+    @staticmethod
+    def _log_threads():
+        deadline = time.time() + 1
+        while time.time() < deadline:
+            threads = [t for t in threading.enumerate() if t.name in ('docktors-logs-web', 'docktors-log')]
+            if not threads:
+                return threads
+            time.sleep(0.01)
+        return threads
+
+    def test_decorated_subprocess(self):
+        # GIVEN
+        wrapped = decorated(DockerContainer(image='shell', command='sh -c "echo $GREETING; sleep 30"',
+                                            environment={'GREETING': 'hello'}, wait_for_log='hello',
+                                            background_shutdown=False, inject_arg=True), lambda c: c.logs())
+
+        # WHEN
+        output = wrapped()
+
+        # THEN
+        self.assertEqual(output, b'hello\n')
+        self.assertEqual(self.backend.containers, [])
+
+    def test_decorated_files_and_reset(self):
+        # GIVEN
+        with open(os.path.join(self.directory, 'app.conf'), 'w') as conf:
+            conf.write('debug=true')
+
+        def func(container):
+            bits, _ = container.get_archive('/etc/app/app.conf')
+            container.exec_run(['rm', '-rf', '/etc/app'])
+            with tarfile.open(fileobj=io.BytesIO(b''.join(bits))) as tar:
+                return tar.extractfile('app.conf').read()
+
+        files = {os.path.join(self.directory, 'app.conf'): '/etc/app/app.conf'}
+        wrapper = DockerContainer(image='postgres', files=files, reset_paths=['/etc/app'], keep_alive=True,
+                                  inject_arg=True)
+        wrapped = decorated(wrapper, func)
+
+        # WHEN
+        first, second = wrapped(), wrapped()
+
+        # THEN
+        self.assertEqual(first, b'debug=true')
+        self.assertEqual(second, b'debug=true', 'Files should be restored by the reset')
+        self.assertEqual(len(self.backend.containers), 1, 'Container should be reused')
+        wrapper._shutdown_at_exit()
+
+    def test_decorated_exec_mode(self):
+        # GIVEN
+        self.backend.register('psql', lambda: SimulatedService(commands={'psql -c select 1': (0, b'1\n')}))
+        wrapped = decorated(DockerContainer(image='psql', exec_mode=True, inject_arg=True),
+                            lambda runner: runner.run(['psql', '-c', 'select 1']))
+
+        # WHEN
+        output = wrapped()
+
+        # THEN
+        self.assertEqual((output.exit_code, output.stdout), (0, b'1\n'))
+
+    def test_pool(self):
+        # GIVEN
+        pool = DockerContainerPool(image='postgres', pool_size=2, pool_recycle=True, wait_for_log='ready to accept',
+                                   inject_arg=True)
+        wrapped = decorated(pool, lambda c: c.id)
+
+        # WHEN
+        output = set(wrapped() for _ in range(4))
+
+        # THEN
+        self.assertLessEqual(len(output), 2, 'Containers should be recycled')
+        pool.close()
+
+    def test_warmup(self):
+        # WHEN
+        results = warmup(['postgres:13'], client=self.client)
+        container = self.client.containers.run('postgres:13', detach=True)
+
+        # THEN
+        self.assertTrue(results[0].pulled)
+        self.assertEqual(self.client.images.get('postgres:13').id, results[0].image_id)
+        self.assertEqual(container.attrs['Image'], results[0].image_id)
+
+    def test_container_lifecycle(self):
+        # GIVEN
+        container = self.client.containers.run('postgres', detach=True, labels={'owner': 'me'})
+        events = self.client.events(decode=True, filters={'container': container.id})
+
+        # WHEN
+        listed = self.client.containers.list(filters={'label': 'owner=me'})
+        container.stop(timeout=1)
+        stopped = self.client.containers.list(filters={'label': 'owner=me'})
+        container.remove()
+
+        # THEN
+        self.assertEqual(listed, [container])
+        self.assertEqual(stopped, [])
+        self.assertEqual([e['Action'] for e in events], ['start', 'die', 'stop', 'destroy'])
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
+
+    def test_container_archive(self):
+        # GIVEN
+        container = self.client.containers.run('postgres', detach=True)
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            info = tarfile.TarInfo('data/value.txt')
+            info.size = 2
+            tar.addfile(info, io.BytesIO(b'42'))
+
+        # WHEN
+        container.put_archive('/', buffer.getvalue())
+        bits, stat = container.get_archive('/data')
+
+        # THEN
+        self.assertEqual(stat['name'], 'data')
+        with tarfile.open(fileobj=io.BytesIO(b''.join(bits))) as tar:
+            self.assertEqual(tar.extractfile('data/value.txt').read(), b'42')
+        with self.assertRaises(docker.errors.NotFound):
+            container.get_archive('/missing')
+
+    def test_container_archive_outside(self):
+        # GIVEN
+        container = self.client.containers.run('postgres', detach=True)
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            tar.addfile(tarfile.TarInfo('../escape.txt'), io.BytesIO(b''))
+
+        # WHEN / THEN
+        with self.assertRaises(docker.errors.APIError):
+            container.put_archive('/', buffer.getvalue())
+
+    def test_container_port_already_bound(self):
+        # GIVEN
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1)
+
+        # WHEN / THEN
+        try:
+            with self.assertRaises(docker.errors.APIError):
+                self.client.containers.run('postgres', detach=True, ports={5432: sock.getsockname()[1]})
+        finally:
+            sock.close()
+        self.assertEqual(self.backend.containers, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
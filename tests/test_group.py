@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+import mock
+
+from docktors.client import close_clients
+from docktors.group import DockerGroup
+from docktors.reaper import flush_reaper
+
+
+class TestDockerGroup(unittest.TestCase):
+    """Testing class for DockerGroup"""
+
+    def tearDown(self):
+        close_clients()
+
+    def test_init_unknown_dependency(self):
+        # WHEN
+        with self.assertRaises(SyntaxError) as cm:
+            DockerGroup(containers=dict(app=dict(image='app', depends_on=['db'])))
+
+        # THEN
+        self.assertEqual(str(cm.exception), "[docker-group] : Container 'app' depends on unknown containers ['db'].")
+
+    def test_init_cyclic_dependencies(self):
+        # WHEN
+        with self.assertRaises(SyntaxError) as cm:
+            DockerGroup(containers=[
+                ('db', dict(image='mysql')),
+                ('app', dict(image='app', depends_on=['cache'])),
+                ('cache', dict(image='redis', depends_on=['app'])),
+            ])
+
+        # THEN
+        self.assertEqual(str(cm.exception), "[docker-group] : Cyclic dependencies between containers ['app', 'cache'].")
+
+    def test_init_bad_container_option(self):
+        # WHEN
+        with self.assertRaises(SyntaxError) as cm:
+            DockerGroup(containers=dict(db=dict(image='mysql', undefined_prop=1)))
+
+        # THEN
+        self.assertEqual(str(cm.exception), "[docker] : Option 'undefined_prop' doesn't not exist.")
+
+    def test_start_order(self):
+        # GIVEN
+        group = DockerGroup(containers=[
+            ('app', dict(image='app', depends_on=['db', 'cache'])),
+            ('db', dict(image='mysql')),
+            ('cache', dict(image='redis')),
+        ])
+
+        # WHEN
+        output = group.start_order()
+
+        # THEN
+        self.assertEqual(output, ['db', 'cache', 'app'])
+
+    @mock.patch(target='docker.from_env')
+    def test_start_shutdown(self, docker_mock):
+        # GIVEN
+        events, lock, running = [], threading.Lock(), dict(count=0, max=0)
+
+        def _run(image, **kwargs):
+            with lock:
+                events.append(image)
+                running['count'] += 1
+                running['max'] = max(running['max'], running['count'])
+            time.sleep(0.05)
+            with lock:
+                running['count'] -= 1
+            return mock.MagicMock(status='running', image_name=image)
+
+        docker_mock.return_value.containers.run.side_effect = _run
+        group = DockerGroup(containers=[
+            ('app', dict(image='app', depends_on=['db', 'cache'])),
+            ('db', dict(image='mysql')),
+            ('cache', dict(image='redis')),
+        ])
+
+        # WHEN
+        output = group.start()
+        args = group.get_args()
+        group.shutdown()
+        flush_reaper()
+
+        # THEN
+        self.assertEqual(list(output.keys()), ['app', 'db', 'cache'], 'Containers should be injected by name')
+        self.assertEqual(args, [output])
+        self.assertEqual(dict((k, v.image_name) for k, v in output.items()),
+                         dict(app='app', db='mysql', cache='redis'))
+        self.assertEqual(events[-1], 'app', 'Dependent container should be started last')
+        self.assertEqual(running['max'], 2, 'Independent containers should be started in parallel')
+        [c.stop.assert_called_once_with(timeout=10) for c in output.values()]
+
+    @mock.patch(target='docker.from_env')
+    def test_start_failure_shutdown_started(self, docker_mock):
+        # GIVEN
+        db = mock.MagicMock(status='running')
+
+        def _run(image, **kwargs):
+            if image == 'redis':
+                time.sleep(0.05)
+                raise RuntimeError('Cannot start redis')
+            return db
+
+        docker_mock.return_value.containers.run.side_effect = _run
+        group = DockerGroup(containers=[
+            ('db', dict(image='mysql')),
+            ('cache', dict(image='redis')),
+            ('app', dict(image='app', depends_on=['db', 'cache'])),
+        ])
+
+        # WHEN
+        with self.assertRaises(RuntimeError) as cm:
+            group.start()
+        flush_reaper()
+
+        # THEN
+        self.assertEqual(str(cm.exception), 'Cannot start redis')
+        db.stop.assert_called_once_with(timeout=10)
+        self.assertEqual(docker_mock.return_value.containers.run.call_count, 2, 'App should never be started')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from docktors.logs import LogCapture, LogMatcher, RotatingLogFile
+
+
+class TestLogMatcher(unittest.TestCase):
+    """Testing class for LogMatcher"""
+
+    def test_feed_several_patterns(self):
+        # GIVEN
+        matcher = LogMatcher(literals=['ready', 'port 80'], regexes=[r'started in \d+ms'])
+
+        # WHEN
+        outputs = [matcher.feed(c) for c in [b'booting\nready\n', b'started in 42ms\n', b'listen on port 80\n']]
+
+        # THEN
+        self.assertEqual(outputs, [False, False, True])
+        self.assertEqual(matcher.remaining, [])
+
+    def test_feed_pattern_across_chunks(self):
+        # GIVEN
+        matcher = LogMatcher(literals=['server is ready'], regexes=[r'pid=\d+ up'])
+
+        # WHEN
+        outputs = [matcher.feed(c) for c in [b'boot\nserver is', b' rea', b'dy\npid=12', b'3 up\n']]
+
+        # THEN
+        self.assertEqual(outputs, [False, False, False, True])
+
+    def test_feed_literal_special_characters(self):
+        # GIVEN
+        matcher = LogMatcher(literals=['listening (tcp)*'])
+
+        # WHEN
+        output = matcher.feed(b'listening tcp\n')
+
+        # THEN
+        self.assertFalse(output)
+        self.assertEqual(matcher.remaining, ['listening (tcp)*'])
+        self.assertTrue(matcher.feed(b'listening (tcp)*\n'))
+
+    def test_feed_not_across_lines(self):
+        # GIVEN
+        matcher = LogMatcher(literals=['server is ready'])
+
+        # WHEN
+        output = [matcher.feed(c) for c in [b'server is\n', b' ready\n']]
+
+        # THEN
+        self.assertEqual(output, [False, False])
+        self.assertEqual(matcher.remaining, ['server is ready'])
+
+    def test_feed_overlapping_literals(self):
+        # GIVEN
+        matcher = LogMatcher(literals=['ready', 'ready for connections'])
+
+        # WHEN
+        output = matcher.feed(b'mysqld: ready for connections\n')
+
+        # THEN
+        self.assertTrue(output)
+        self.assertEqual(matcher.remaining, [])
+
+    def test_feed_overlapping_regexes(self):
+        # GIVEN
+        matcher = LogMatcher(regexes=['a.*b', 'xb'])
+
+        # WHEN
+        output = matcher.feed(b'axb\n')
+
+        # THEN
+        self.assertTrue(output)
+
+    def test_feed_regexes_compiled_separately(self):
+        # GIVEN
+        matcher = LogMatcher(regexes=[r'(?i)ready', r'(\w+) \1', r'(?P<port>\d+)/tcp', r'(?P<port>\d+)/udp'])
+
+        # WHEN
+        outputs = [matcher.feed(c) for c in [b'Server READY\n', b'listen 53/udp\n', b'ping ping\n', b'open 80/tcp\n']]
+
+        # THEN
+        self.assertEqual(outputs, [False, False, False, True])
+
+    def test_feed_without_pattern(self):
+        # GIVEN
+        matcher = LogMatcher()
+
+        # WHEN
+        output = matcher.feed(b'some logs\n')
+
+        # THEN
+        self.assertTrue(output)
+
+
+class TestLogCapture(unittest.TestCase):
+    """Testing class for LogCapture"""
+
+    def test_tail_bounded(self):
+        # GIVEN
+        container = mock.MagicMock()
+        container.logs.return_value = [b'%04d\n' % i for i in range(1000)] + [b'x' * 50]
+
+        # WHEN
+        capture = LogCapture(container, 'alpine', since=1500000000, max_size=32).start()
+        capture.join(1)
+
+        # THEN
+        container.logs.assert_called_once_with(stream=True, follow=True, since=1500000000)
+        self.assertEqual(capture.tail(), b'x' * 32)
+        self.assertEqual(capture.tail(4), b'x' * 4)
+        self.assertLessEqual(sum(len(c) for c in capture._chunks), 32)
+
+    def test_read_from_position(self):
+        # GIVEN
+        container = mock.MagicMock()
+        container.logs.return_value = [b'0123', b'4567', b'89']
+        capture = LogCapture(container, 'alpine', max_size=6).start()
+        capture.join(1)
+
+        # WHEN
+        outputs = [capture.read(0), capture.read(5), capture.read(10)]
+
+        # THEN
+        self.assertEqual(outputs, [(b'456789', 10, True), (b'56789', 10, True), (b'', 10, True)])
+
+    def test_follow(self):
+        # GIVEN
+        container, produced = mock.MagicMock(), threading.Event()
+
+        def _logs(**kwargs):
+            yield b'first\n'
+            produced.wait(1)
+            yield b'second\n'
+
+        container.logs.side_effect = _logs
+        capture = LogCapture(container, 'alpine').start()
+
+        # WHEN
+        chunks = capture.follow()
+        first = next(chunks)
+        produced.set()
+        others = list(chunks)
+
+        # THEN
+        self.assertEqual(first, b'first\n')
+        self.assertEqual(others, [b'second\n'])
+
+    def test_stream_error(self):
+        # GIVEN
+        container = mock.MagicMock()
+        container.logs.side_effect = IOError('Connection reset')
+
+        # WHEN
+        capture = LogCapture(container, 'alpine').start()
+
+        # THEN
+        self.assertTrue(capture.join(1))
+        self.assertEqual(list(capture.follow()), [])
+
+
+class TestRotatingLogFile(unittest.TestCase):
+    """Testing class for RotatingLogFile"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_rotate(self):
+        # GIVEN
+        path = os.path.join(self.directory, 'container.log')
+        spill = RotatingLogFile(path, max_bytes=10, backup_count=2)
+
+        # WHEN
+        for chunk in [b'aaaaaa', b'bbbbbb', b'cccccc', b'dddddd']:
+            spill.write(chunk)
+        spill.close()
+
+        # THEN
+        self.assertEqual(sorted(os.listdir(self.directory)), ['container.log', 'container.log.1', 'container.log.2'])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'dddddd')
+        with open(path + '.2', 'rb') as f:
+            self.assertEqual(f.read(), b'bbbbbb')
+
+
+if __name__ == '__main__':
+    unittest.main()
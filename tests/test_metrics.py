@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from docktors.client import close_clients
+from docktors.core import DecWrapper, decorated
+from docktors.metrics import (HistogramHook, JsonLinesExporter, MetricsHook, PrometheusExporter, Span, add_hook,
+                              record, remove_hook, span)
+from docktors.wdocker import DockerContainer
+
+
+class _ListHook(MetricsHook):
+    def __init__(self):
+        self.spans = []
+
+    def on_span(self, span_):
+        self.spans.append(span_)
+
+
+class TestMetrics(unittest.TestCase):
+    """Testing class for metrics module"""
+
+    def setUp(self):
+        self.hook = add_hook(_ListHook())
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        remove_hook(self.hook)
+        shutil.rmtree(self.directory)
+        close_clients()
+
+    def test_span(self):
+        # WHEN
+        with span('run', 'alpine', attempt=1):
+            pass
+        with self.assertRaises(ValueError):
+            with span('stop', 'alpine'):
+                raise ValueError('stop failure')
+
+        # THEN
+        self.assertEqual([(s.name, s.image, s.attributes, s.error) for s in self.hook.spans], [
+            ('run', 'alpine', dict(attempt=1), None), ('stop', 'alpine', dict(), 'ValueError'),
+        ])
+        self.assertTrue(all(s.duration >= 0 for s in self.hook.spans))
+
+    def test_span_failing_hook(self):
+        # GIVEN
+        failing = add_hook(mock.MagicMock(spec=MetricsHook))
+        failing.on_span.side_effect = IOError('disk full')
+
+        # WHEN
+        with span('run', 'alpine'):
+            pass
+        remove_hook(failing)
+
+        # THEN
+        self.assertEqual(len(self.hook.spans), 1, 'Other hooks should receive the span')
+        failing.close.assert_called_once_with()
+
+    def test_histogram_hook(self):
+        # GIVEN
+        hook = HistogramHook(buckets=(0.1, 1.0))
+
+        # WHEN
+        for duration in (0.05, 0.5, 2.0):
+            hook.on_span(Span('start', 'alpine', 0, duration))
+        hook.on_span(Span('start', 'redis', 0, 0.5, error='DockerContainerError'))
+
+        # THEN
+        self.assertEqual(hook.histograms(), {
+            ('alpine', 'start'): dict(buckets=[(0.1, 1), (1.0, 2)], sum=2.55, count=3, errors=0),
+            ('redis', 'start'): dict(buckets=[(0.1, 0), (1.0, 1)], sum=0.5, count=1, errors=1),
+        })
+
+    def test_prometheus_exporter(self):
+        # GIVEN
+        path = os.path.join(self.directory, 'docktors.prom')
+        exporter = PrometheusExporter(path, buckets=(1.0,))
+        exporter.on_span(Span('wait.tcp:80', 'nginx', 0, 0.5))
+
+        # WHEN
+        exporter.close()
+
+        # THEN
+        with open(path) as prom_file:
+            self.assertEqual(prom_file.read(), '\n'.join([
+                '# HELP docktors_phase_duration_seconds Duration of the docktors container phases.',
+                '# TYPE docktors_phase_duration_seconds histogram',
+                'docktors_phase_duration_seconds_bucket{image="nginx",phase="wait.tcp:80",le="1.0"} 1',
+                'docktors_phase_duration_seconds_bucket{image="nginx",phase="wait.tcp:80",le="+Inf"} 1',
+                'docktors_phase_duration_seconds_sum{image="nginx",phase="wait.tcp:80"} 0.5',
+                'docktors_phase_duration_seconds_count{image="nginx",phase="wait.tcp:80"} 1',
+                '# HELP docktors_phase_errors_total Number of failed docktors container phases.',
+                '# TYPE docktors_phase_errors_total counter',
+                'docktors_phase_errors_total{image="nginx",phase="wait.tcp:80"} 0',
+            ]) + '\n')
+        self.assertEqual(os.listdir(self.directory), ['docktors.prom'])
+
+    def test_json_lines_exporter(self):
+        # GIVEN
+        path = os.path.join(self.directory, 'spans.jsonl')
+        exporter = add_hook(JsonLinesExporter(path))
+
+        # WHEN
+        record('wait.log', 'mysql', 1.5, start=100.0)
+        record('remove', 'mysql', 0.25, start=102.0, error='APIError')
+        remove_hook(exporter)
+
+        # THEN
+        with open(path) as jsonl_file:
+            self.assertEqual([json.loads(line) for line in jsonl_file], [
+                dict(name='wait.log', image='mysql', start=100.0, duration=1.5, attributes={}, error=None),
+                dict(name='remove', image='mysql', start=102.0, duration=0.25, attributes={}, error='APIError'),
+            ])
+
+    @mock.patch(target='docker.from_env')
+    def test_decorated_phases(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', background_shutdown=False)
+        docker_mock.return_value.containers.run.return_value.status = 'running'
+
+        # WHEN
+        decorated(docker_container, lambda: None)()
+
+        # THEN
+        self.assertEqual([(s.name, s.image) for s in self.hook.spans], [
+            ('run', 'alpine'), ('wait', 'alpine'), ('ready', 'alpine'), ('start', 'alpine'), ('function', 'alpine'),
+            ('stop', 'alpine'), ('remove', 'alpine'), ('shutdown', 'alpine'),
+        ])
+        self.assertEqual(self.hook.spans[4].attributes, dict(function='<lambda>'))
+
+    def test_decorated_other_wrapper(self):
+        # GIVEN
+        wrapping_mock = mock.Mock(spec=DecWrapper, inject_arg=False)
+        wrapping_mock.span_label.return_value = 'my-wrapper'
+
+        # WHEN
+        decorated(wrapping_mock, lambda: None)()
+
+        # THEN
+        self.assertEqual([(s.name, s.image) for s in self.hook.spans], [('function', 'my-wrapper')])
+
+
+if __name__ == '__main__':
+    unittest.main()
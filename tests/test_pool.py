@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+import mock
+
+from docktors.client import close_clients
+from docktors.pool import DockerContainerPool
+from docktors.reaper import flush_reaper
+from docktors.wdocker import DockerContainerError
+
+
+def _started_wrapper(*args, **kwargs):
+    wrapper = mock.MagicMock()
+    wrapper.get_container.return_value = mock.MagicMock(status='running')
+    wrapper.get_args.return_value = [wrapper.get_container.return_value]
+    return wrapper
+
+
+class TestDockerContainerPool(unittest.TestCase):
+    """Testing class for DockerContainerPool"""
+
+    def tearDown(self):
+        close_clients()
+
+    def test_init_keep_alive_forbidden(self):
+        # WHEN
+        with self.assertRaises(SyntaxError) as cm:
+            DockerContainerPool(image='alpine', pool_size=2, keep_alive=True)
+
+        # THEN
+        self.assertEqual(str(cm.exception), "[docker-pool] : Option 'keep_alive' cannot be used with a pool.")
+
+    def test_init_invalid_log_regex(self):
+        # WHEN
+        with self.assertRaises(SyntaxError) as cm:
+            DockerContainerPool(image='alpine', wait_for_log_regex='started (in')
+
+        # THEN
+        self.assertTrue(
+            str(cm.exception).startswith(
+                "[docker-pool] : Option 'wait_for_log_regex' has an invalid regex 'started (in' : "
+            ),
+            'Error should name the invalid regex'
+        )
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_checkout_fill_reserve(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', command='sh', pool_size=2, pool_refill_workers=2)
+
+        # WHEN
+        wrapper = pool.checkout()
+        pool.close()
+
+        # THEN
+        self.assertIsNotNone(wrapper, 'A container should have been checked out')
+        docker_container_mock.assert_called_with(image='alpine', command='sh')
+        stats = pool.stats()
+        self.assertEqual(stats['misses'], 1, 'First checkout should be a miss')
+        self.assertEqual(stats['hits'], 0, 'First checkout should be a miss')
+        self.assertEqual(stats['checked_out'], 1, 'One container should be checked out')
+        self.assertEqual(stats['started'], docker_container_mock.call_count)
+        self.assertGreaterEqual(stats['started'], 2, 'The reserve should have been filled')
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_checkout_hit_after_fill(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=1)
+        pool.fill()
+        pool._executor.shutdown(wait=True)
+        pool._executor = None
+
+        # WHEN
+        wrapper = pool.checkout()
+        pool.checkin(wrapper)
+        pool.close()
+
+        # THEN
+        stats = pool.stats()
+        self.assertEqual(stats['hits'], 1, 'Checkout should be served from the reserve')
+        self.assertEqual(stats['misses'], 0, 'Checkout should be served from the reserve')
+        wrapper.shutdown.assert_called_once_with()
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_checkin_recycle(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=1, pool_recycle=True)
+
+        # WHEN
+        wrapper = pool.checkout()
+        pool._executor.shutdown(wait=True)
+        pool.checkin(wrapper)
+
+        # THEN
+        wrapper.shutdown.assert_not_called()
+        self.assertEqual(pool.stats()['ready'], 1, 'Container should be back in the pool')
+        pool.close()
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_checkout_concurrent_max_size(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=1, pool_max_size=2, pool_refill_workers=2)
+        wrappers = []
+
+        # WHEN
+        threads = [threading.Thread(target=lambda: wrappers.append(pool.checkout())) for _ in range(2)]
+        [t.start() for t in threads]
+        [t.join(timeout=5) for t in threads]
+        pool.close()
+
+        # THEN
+        self.assertEqual(len(wrappers), 2, 'Each thread should have its own container')
+        self.assertIsNot(wrappers[0], wrappers[1], 'Each thread should have its own container')
+        self.assertLessEqual(docker_container_mock.call_count, 2, 'Pool max size should be respected')
+
+    @mock.patch(target='docktors.pool.DockerContainer')
+    def test_checkout_start_failure(self, docker_container_mock):
+        # GIVEN
+        docker_container_mock.return_value.start.side_effect = RuntimeError('Cannot start')
+        pool = DockerContainerPool(image='alpine', pool_size=1)
+
+        # WHEN
+        with self.assertRaises(DockerContainerError) as cm:
+            pool.checkout()
+        pool.close()
+
+        # THEN
+        self.assertEqual(cm.exception.args[0], '[alpine] Unable to start a container for the pool')
+        self.assertEqual(pool.stats()['failures'], 1, 'Failure should be counted')
+
+    @mock.patch(target='docktors.pool.DockerContainer')
+    def test_checkout_start_failure_then_success(self, docker_container_mock):
+        # GIVEN
+        failing = mock.MagicMock()
+        failing.start.side_effect = RuntimeError('Cannot start')
+        wrappers = [failing]
+        docker_container_mock.side_effect = lambda **kwargs: wrappers.pop(0) if wrappers else _started_wrapper()
+        pool = DockerContainerPool(image='alpine', pool_size=1)
+        with pool._condition:
+            pool._waiting += 1
+        pool._start_one()
+        pool._start_one()
+        with pool._condition:
+            pool._waiting -= 1
+
+        # WHEN
+        first = pool.checkout()
+        second = pool.checkout()
+        pool.close()
+
+        # THEN
+        self.assertIsNot(first, second, 'Each checkout should get its own container')
+        self.assertEqual(pool.stats()['failures'], 1, 'Failure should be counted')
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_start_shutdown(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=1)
+
+        # WHEN
+        container = pool.start()
+        args = pool.get_args()
+        pool.shutdown()
+        pool.close()
+
+        # THEN
+        self.assertEqual(args, [container], 'Checked out container should be injected')
+
+    @mock.patch(target='docker.from_env')
+    def test_start_shutdown_recycle_reset(self, docker_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='mysql', pool_size=1, pool_recycle=True, reset_command='/reset.sh')
+        container = docker_mock.return_value.containers.run.return_value
+        container.status = 'running'
+        container.exec_run.return_value = (0, b'')
+
+        # WHEN
+        first = pool.start()
+        pool.shutdown()
+        second = pool.start()
+        pool.shutdown()
+        pool.close()
+        flush_reaper()
+
+        # THEN
+        self.assertIs(first, container)
+        self.assertIs(second, container)
+        docker_mock.return_value.containers.run.assert_called_once()
+        self.assertEqual(container.exec_run.call_args_list, [mock.call('/reset.sh'), mock.call('/reset.sh')])
+        container.stop.assert_called_once_with(timeout=10)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_shutdown_recycle_exec_mode(self, docker_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=1, pool_recycle=True, exec_mode=True)
+        container = docker_mock.return_value.containers.run.return_value
+        container.status = 'running'
+
+        # WHEN
+        first = pool.start()
+        runner = pool.get_args()[0]
+        pool.shutdown()
+        second = pool.start()
+        pool.shutdown()
+        pool.close()
+        flush_reaper()
+
+        # THEN
+        self.assertIs(first, container)
+        self.assertIs(second, container)
+        self.assertIs(runner.container, container, 'A command runner should be injected')
+        docker_mock.return_value.containers.run.assert_called_once()
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_map(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=3, pool_recycle=True)
+        used, lock, all_used = set(), threading.Lock(), threading.Event()
+
+        def _process(container, item):
+            with lock:
+                used.add(id(container))
+                if len(used) == 3:
+                    all_used.set()
+            # Each worker keeps its container until all the containers are used
+            all_used.wait(1)
+            return item * 2
+
+        # WHEN
+        output = list(pool.map(_process, iter(range(20))))
+        stats = pool.stats()
+        pool.close()
+
+        # THEN
+        self.assertEqual(sorted(output), [i * 2 for i in range(20)])
+        self.assertTrue(all_used.is_set(), 'A container should be used by each worker')
+        self.assertEqual(stats['started'], 3, 'The containers should be recycled')
+        self.assertEqual(stats['checked_out'], 0, 'All containers should be given back')
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_map_error(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=2)
+
+        def _process(container, item):
+            if item == 3:
+                raise ValueError('Bad item 3')
+            return item
+
+        # WHEN
+        with self.assertRaises(ValueError) as cm:
+            list(pool.map(_process, range(100)))
+        stats = pool.stats()
+        pool.close()
+
+        # THEN
+        self.assertEqual(str(cm.exception), 'Bad item 3')
+        self.assertEqual(stats['checked_out'], 0, 'All containers should be given back')
+
+    @mock.patch(target='docktors.pool.DockerContainer', side_effect=_started_wrapper)
+    def test_map_stream_results(self, docker_container_mock):
+        # GIVEN
+        pool = DockerContainerPool(image='alpine', pool_size=2)
+        release = threading.Event()
+
+        def _process(container, item):
+            if item == 'slow':
+                release.wait(1)
+            return item
+
+        # WHEN
+        results = pool.map(_process, ['slow', 'fast'])
+        first = next(results)
+        release.set()
+        others = list(results)
+        pool.close()
+
+        # THEN
+        self.assertEqual(first, 'fast', 'Results should be yielded as soon as available')
+        self.assertEqual(others, ['slow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import socket
+import unittest
+
+from docktors.ports import PortAllocationError, PortAllocator
+
+
+class TestPortAllocator(unittest.TestCase):
+    """Testing class for PortAllocator"""
+
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('', 0))
+        self.sock.listen(1)
+        self.busy_port = self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+
+    def test_allocate_skip_reserved_and_busy(self):
+        # GIVEN
+        allocator = PortAllocator()
+        first = allocator.allocate(1, self.busy_port - 1, self.busy_port + 1)
+
+        # WHEN
+        second = allocator.allocate(1, self.busy_port - 1, self.busy_port + 1)
+
+        # THEN
+        self.assertEqual(sorted(first + second), [self.busy_port - 1, self.busy_port + 1])
+
+    def test_allocate_not_enough_ports(self):
+        # GIVEN
+        allocator = PortAllocator()
+
+        # WHEN
+        with self.assertRaises(PortAllocationError) as cm:
+            allocator.allocate(2, self.busy_port, self.busy_port + 1)
+
+        # THEN
+        self.assertEqual(str(cm.exception), 'Only 1 free ports in range {first}-{last}, 2 requested'.format(
+            first=self.busy_port, last=self.busy_port + 1
+        ))
+
+    def test_assign_release(self):
+        # GIVEN
+        allocator = PortAllocator()
+        ports = allocator.allocate(1, self.busy_port + 1, self.busy_port + 1)
+        allocator.assign(ports, 'c5f0cad13259')
+
+        # WHEN
+        allocator.release(owner='c5f0cad13259')
+
+        # THEN
+        self.assertEqual(allocator.allocate(1, self.busy_port + 1, self.busy_port + 1), ports)
+
+
+if __name__ == '__main__':
+    unittest.main()
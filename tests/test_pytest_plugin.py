@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from docktors.backend import set_backend
+from docktors.fake import FakeBackend, SimulatedService
+from docktors.pytest_plugin import DockerFixture, SharedContainer, fcntl
+from docktors.reaper import flush_reaper
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPytestPlugin(unittest.TestCase):
+    """Testing class for the pytest plugin"""
+
+    def setUp(self):
+        self.backend = FakeBackend(services={'redis': lambda: SimulatedService(ports=[6379])})
+        set_backend(self.backend)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        flush_reaper()
+        self.backend.clear()
+        set_backend(None)
+        shutil.rmtree(self.directory)
+
+    @unittest.skipIf(fcntl is None, 'File locks are not supported')
+    def test_shared_container(self):
+        # GIVEN
+        options = dict(image='redis', wait_for_port=6379, background_shutdown=False)
+        first = SharedContainer('redis', options, directory=self.directory, worker='gw0')
+        second = SharedContainer('redis', options, directory=self.directory, worker='gw1')
+        second._worker['pid'] = os.getppid()
+
+        # WHEN
+        first.acquire()
+        second.acquire()
+
+        # THEN
+        self.assertEqual(len(self.backend.containers), 1, 'Container should be shared by the workers')
+        self.assertEqual(first.value.id, second.value.id)
+        self.assertEqual(second.value.host_ports, first.value.host_ports)
+
+        # WHEN
+        first.release()
+
+        # THEN
+        self.assertEqual(self.backend.containers[0].status, 'running', 'Container should be kept for the worker')
+
+        # WHEN
+        second.release()
+
+        # THEN
+        self.assertEqual(self.backend.containers, [], 'Container should be removed by the last worker')
+        self.assertEqual(os.listdir(self.directory), ['docktors-%s.lock' % first._path.split('docktors-')[-1]])
+
+    @unittest.skipIf(fcntl is None, 'File locks are not supported')
+    def test_shared_container_dead_worker(self):
+        # GIVEN
+        options = dict(image='redis', background_shutdown=False)
+        first = SharedContainer('redis', options, directory=self.directory, worker='gw0').acquire()
+        with open(first._path + '.json') as state_file:
+            state = json.load(state_file)
+        state['workers'].append(dict(name='gw1', pid=2 ** 22 + 1))
+        with open(first._path + '.json', 'w') as state_file:
+            json.dump(state, state_file)
+
+        # WHEN
+        first.release()
+
+        # THEN
+        self.assertEqual(self.backend.containers, [], 'Dead workers should not keep the container')
+
+    def test_shared_container_not_shared(self):
+        # GIVEN
+        shared = SharedContainer('redis', dict(image='redis', background_shutdown=False))
+
+        # WHEN
+        shared.acquire()
+        shared.release()
+
+        # THEN
+        self.assertIsNotNone(shared.value)
+        self.assertEqual(self.backend.containers, [])
+
+    def test_fixture_bad_scope(self):
+        # WHEN / THEN
+        with self.assertRaises(SyntaxError):
+            DockerFixture('redis', 'class', dict(image='redis'))
+
+    def test_plugin(self):
+        # GIVEN
+        with open(os.path.join(self.directory, 'conftest.py'), 'w') as conftest:
+            conftest.write(textwrap.dedent("""
+                from docktors.pytest_plugin import docker_fixture
+
+                redis = docker_fixture('redis', scope='session', image='redis')
+                worker = docker_fixture('worker', image='worker')
+                ids = []
+            """))
+        with open(os.path.join(self.directory, 'test_sample.py'), 'w') as test:
+            test.write(textwrap.dedent("""
+                import conftest
+
+                def test_first(redis, worker):
+                    conftest.ids.append((redis.id, worker.id))
+
+                def test_second(redis, worker):
+                    conftest.ids.append((redis.id, worker.id))
+                    (first_redis, first_worker), (second_redis, second_worker) = conftest.ids
+                    assert first_redis == second_redis
+                    assert first_worker != second_worker
+            """))
+        environment = dict(os.environ, DOCKTORS_BACKEND='fake', PYTHONPATH=ROOT)
+
+        # WHEN
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'pytest', '-q', '-p', 'docktors.pytest_plugin', '-p', 'no:cacheprovider',
+             self.directory],
+            cwd=self.directory, env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        output, _ = process.communicate()
+
+        # THEN
+        self.assertEqual(process.returncode, 0, output.decode('utf-8'))
+        self.assertIn('2 passed', output.decode('utf-8'))
+
+
+if __name__ == '__main__':
+    unittest.main()
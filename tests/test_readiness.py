@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import socket
+import threading
+import unittest
+
+import mock
+
+from docktors.readiness import CallableProbe, ContainerWatcher, HttpProbe, ReadinessEngine, ReadinessTimeout, TcpProbe
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+class _EventsStream(object):
+    """Blocking events stream, as returned by the docker client."""
+
+    def __init__(self, events):
+        self._events = list(events)
+        self._closed = threading.Event()
+
+    def __iter__(self):
+        for event in self._events:
+            yield event
+        self._closed.wait(5)
+
+    def close(self):
+        self._closed.set()
+
+
+class TestContainerWatcher(unittest.TestCase):
+    """Testing class for ContainerWatcher"""
+
+    def _watcher(self, events):
+        client = mock.MagicMock()
+        client.events.return_value = _EventsStream(events)
+        container = mock.MagicMock(id='c5f0cad13259')
+        return client, ContainerWatcher(client, container, 'alpine', since=1500000000)
+
+    def test_start_subscribe_events(self):
+        # GIVEN
+        client, watcher = self._watcher([])
+
+        # WHEN
+        watcher.start()
+        watcher.close()
+
+        # THEN
+        client.events.assert_called_once_with(since=1500000000, decode=True, filters={'container': 'c5f0cad13259'})
+        self.assertFalse(watcher.is_failed(), 'Container should not be failed')
+
+    def test_die_event(self):
+        # GIVEN
+        _, watcher = self._watcher([
+            {'Action': 'start'},
+            {'Action': 'die', 'Actor': {'Attributes': {'exitCode': '137'}}},
+        ])
+
+        # WHEN
+        watcher.start()
+        output = watcher.wait_failure(timeout=5)
+        watcher.close()
+
+        # THEN
+        self.assertTrue(output, 'Container should be failed')
+        self.assertEqual(watcher.failure, 'die (exit code 137)')
+
+    def test_wait_healthy(self):
+        # GIVEN
+        _, watcher = self._watcher([
+            {'Action': 'health_status: starting'},
+            {'Action': 'health_status: healthy'},
+        ])
+
+        # WHEN
+        watcher.start()
+        output = watcher.wait_healthy()
+        watcher.close()
+
+        # THEN
+        self.assertTrue(output, 'Container should be healthy')
+        self.assertEqual(watcher.health, 'healthy')
+
+    def test_wait_healthy_oom(self):
+        # GIVEN
+        _, watcher = self._watcher([
+            {'Action': 'health_status: starting'},
+            {'Action': 'oom'},
+        ])
+
+        # WHEN
+        watcher.start()
+        output = watcher.wait_healthy()
+        watcher.close()
+
+        # THEN
+        self.assertFalse(output, 'Container should not be healthy')
+        self.assertEqual(watcher.failure, 'oom')
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    """HTTP handler answering the statuses of the server, one by request."""
+
+    def do_GET(self):
+        self.send_response(self.server.statuses.pop(0) if len(self.server.statuses) > 1 else self.server.statuses[0])
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReadinessEngine(unittest.TestCase):
+    """Testing class for ReadinessEngine"""
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _StatusHandler)
+        self.server.statuses = [503, 503, 200]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_wait_tcp_http_and_callable(self):
+        # GIVEN
+        port = self.server.server_address[1]
+        probes = [
+            TcpProbe('127.0.0.1', port),
+            HttpProbe('127.0.0.1', port, '/health', 200),
+            CallableProbe('log', lambda: None),
+        ]
+
+        # WHEN
+        output = ReadinessEngine('alpine', probes, timeout=5).wait()
+
+        # THEN
+        self.assertEqual(list(output.keys()), ['tcp:%d' % port, 'http:%d/health' % port, 'log'])
+        self.assertTrue(all(latency is not None for latency in output.values()), 'All probes should be ready')
+        self.assertEqual(probes[1].attempts, 3, 'HTTP probe should retry until the expected status')
+
+    def test_wait_callable_error(self):
+        # GIVEN
+        def _fail():
+            raise RuntimeError('Log stream error')
+
+        # WHEN
+        with self.assertRaises(RuntimeError) as cm:
+            ReadinessEngine('alpine', [CallableProbe('log', _fail)], timeout=5).wait()
+
+        # THEN
+        self.assertEqual(str(cm.exception), 'Log stream error')
+
+    def test_wait_timeout(self):
+        # GIVEN
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(('127.0.0.1', 0))
+        port = closed.getsockname()[1]
+
+        # WHEN
+        try:
+            with self.assertRaises(ReadinessTimeout) as cm:
+                ReadinessEngine('alpine', [TcpProbe('127.0.0.1', port)], timeout=0.2).wait()
+        finally:
+            closed.close()
+
+        # THEN
+        self.assertEqual(str(cm.exception), '[alpine] Timeout after 0.2s waiting for tcp:%d' % port)
+
+    def test_wait_check_error(self):
+        # GIVEN
+        def _check():
+            raise RuntimeError('Container is dead')
+
+        # WHEN
+        with self.assertRaises(RuntimeError) as cm:
+            ReadinessEngine('alpine', [CallableProbe('log', threading.Event().wait)], check=_check).wait()
+
+        # THEN
+        self.assertEqual(str(cm.exception), 'Container is dead')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+import mock
+
+from docktors.reaper import Reaper
+
+
+class TestReaper(unittest.TestCase):
+    """Testing class for Reaper"""
+
+    def test_submit_parallel_flush(self):
+        # GIVEN
+        reaper, barrier, stopped = Reaper(max_workers=2), threading.Semaphore(0), []
+
+        def _shutdown(container):
+            barrier.release()
+            # Both shutdowns should run together
+            self.assertTrue(barrier.acquire(timeout=1))
+            barrier.release()
+            stopped.append(container)
+
+        containers = [mock.MagicMock(id='c%d' % i) for i in range(2)]
+
+        # WHEN
+        for container in containers:
+            reaper.submit('alpine', container, _shutdown)
+        output = reaper.flush(timeout=2)
+
+        # THEN
+        self.assertTrue(output)
+        self.assertEqual(sorted(c.id for c in stopped), ['c0', 'c1'])
+
+    def test_submit_error(self):
+        # GIVEN
+        reaper = Reaper(max_workers=1)
+        shutdown = mock.MagicMock(side_effect=RuntimeError('Cannot stop'))
+
+        # WHEN
+        future = reaper.submit('alpine', mock.MagicMock(id='c5f0cad13259'), shutdown)
+        output = reaper.flush(timeout=1)
+
+        # THEN
+        self.assertTrue(output)
+        self.assertIsNone(future.exception(), 'Error should be logged only')
+
+    def test_submit_after_executor_shutdown(self):
+        # GIVEN
+        reaper, shutdown = Reaper(max_workers=1), mock.MagicMock()
+        reaper.submit('alpine', mock.MagicMock(id='c0'), shutdown).result(timeout=1)
+        # As done by concurrent.futures when the interpreter exits, before the atexit callbacks
+        reaper._executor.shutdown()
+
+        # WHEN
+        container = mock.MagicMock(id='c1')
+        future = reaper.submit('alpine', container, shutdown)
+
+        # THEN
+        self.assertTrue(future.done(), 'Container should be shut down in the calling thread')
+        shutdown.assert_called_with(container)
+        self.assertTrue(reaper.flush(timeout=1))
+
+    def test_flush_timeout(self):
+        # GIVEN
+        reaper, release = Reaper(max_workers=1), threading.Event()
+
+        # WHEN
+        reaper.submit('alpine', mock.MagicMock(), lambda c: release.wait(1))
+        output = reaper.flush(timeout=0.05)
+        release.set()
+
+        # THEN
+        self.assertFalse(output)
+        self.assertTrue(reaper.flush(timeout=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import docker
+import mock
+
+from docktors.snapshot import SNAPSHOT_BASE_LABEL, SNAPSHOT_SPEC_LABEL, SnapshotCache, clear_snapshots
+
+
+def _image(image_id, spec=None, base=None, last_tag_time=None):
+    return mock.MagicMock(
+        id=image_id,
+        labels={SNAPSHOT_SPEC_LABEL: spec, SNAPSHOT_BASE_LABEL: base},
+        attrs=dict(Metadata=dict(LastTagTime=last_tag_time))
+    )
+
+
+class TestSnapshotCache(unittest.TestCase):
+    """Testing class for SnapshotCache"""
+
+    def test_spec_hash(self):
+        # GIVEN
+        client = mock.MagicMock()
+
+        # WHEN
+        first = SnapshotCache(client, 'mysql', dict(command=None, environment=dict(A='1', B='2')))
+        same = SnapshotCache(client, 'mysql', dict(environment=dict(B='2', A='1'), command=None))
+        other = SnapshotCache(client, 'mysql', dict(command=None, environment=dict(A='1')))
+
+        # THEN
+        self.assertEqual(first.spec, same.spec)
+        self.assertNotEqual(first.spec, other.spec)
+        self.assertNotEqual(first.tag('sha256:1'), first.tag('sha256:2'))
+
+    def test_lookup(self):
+        # GIVEN
+        client = mock.MagicMock()
+        client.images.get.return_value.id = 'sha256:base'
+        cache = SnapshotCache(client, 'mysql', dict())
+
+        # WHEN
+        output = cache.lookup()
+
+        # THEN
+        tag = cache.tag('sha256:base')
+        self.assertEqual(output, 'docktors-snapshot:%s' % tag)
+        client.images.get.assert_called_with(output)
+        client.images.get.return_value.tag.assert_called_once_with('docktors-snapshot', tag)
+
+    def test_lookup_not_found(self):
+        # GIVEN
+        client = mock.MagicMock()
+        client.images.get.side_effect = [mock.MagicMock(id='sha256:base'), docker.errors.ImageNotFound('Not found')]
+
+        # WHEN
+        output = SnapshotCache(client, 'mysql', dict()).lookup()
+
+        # THEN
+        self.assertIsNone(output)
+
+    def test_commit_evict(self):
+        # GIVEN
+        client = mock.MagicMock()
+        cache = SnapshotCache(client, 'mysql', dict(), max_snapshots=2)
+        container = mock.MagicMock(id='c5f0cad13259', attrs=dict(Image='sha256:new'))
+        outdated = _image('sha256:1', spec=cache.spec, base='sha256:old', last_tag_time='2020-01-04T00:00:00Z')
+        current = _image('sha256:2', spec=cache.spec, base='sha256:new', last_tag_time='2020-01-03T00:00:00Z')
+        recent = _image('sha256:3', spec='other', base='sha256:new', last_tag_time='2020-01-02T00:00:00Z')
+        older = _image('sha256:4', spec='other', base='sha256:new', last_tag_time='2020-01-01T00:00:00Z')
+        client.images.list.return_value = [older, outdated, recent, current]
+
+        # WHEN
+        output = cache.commit(container)
+
+        # THEN
+        self.assertEqual(output, 'docktors-snapshot:%s' % cache.tag('sha256:new'))
+        container.commit.assert_called_once_with(repository='docktors-snapshot', tag=cache.tag('sha256:new'), changes=[
+            'LABEL docktors.snapshot=true',
+            'LABEL docktors.snapshot.spec=%s' % cache.spec,
+            'LABEL docktors.snapshot.base=sha256:new',
+        ])
+        self.assertEqual(client.images.remove.call_args_list, [mock.call('sha256:1'), mock.call('sha256:4')])
+
+    def test_clear_snapshots(self):
+        # GIVEN
+        client = mock.MagicMock()
+        client.images.get.return_value.id = 'sha256:base'
+        client.images.list.return_value = [_image('sha256:1', base='sha256:base'), _image('sha256:2', base='other')]
+        client.images.remove.side_effect = docker.errors.APIError('Image is used')
+
+        # WHEN
+        clear_snapshots(client, 'mysql')
+
+        # THEN
+        client.images.list.assert_called_once_with(filters=dict(label='docktors.snapshot'))
+        client.images.remove.assert_called_once_with('sha256:1')
+
+
+if __name__ == '__main__':
+    unittest.main()
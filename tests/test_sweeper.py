@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+import unittest
+
+import mock
+
+from docktors.labels import container_labels, spec_hash
+from docktors.sweeper import find_adoptable, is_orphan, main, sweep_orphans
+
+# A pid which cannot be running
+DEAD_PID = 2 ** 22 + 1
+
+
+def _container(pid, host=None, created=0, name='/happy_turing', health=None, spec='abc'):
+    container = mock.MagicMock(
+        id='c%d' % pid,
+        short_id='c%d' % pid,
+        labels={
+            'docktors.pid': str(pid),
+            'docktors.host': host or socket.gethostname(),
+            'docktors.spec': spec,
+            'docktors.created': str(created),
+        },
+        attrs=dict(Config=dict(Image='alpine'), State=dict(Health=health)),
+    )
+    container.name = name
+    return container
+
+
+class TestLabels(unittest.TestCase):
+    """Testing class for labels module"""
+
+    def test_container_labels(self):
+        # WHEN
+        output = container_labels(dict(image='alpine', command='sh'))
+
+        # THEN
+        self.assertEqual(output['docktors.pid'], str(os.getpid()))
+        self.assertEqual(output['docktors.host'], socket.gethostname())
+        self.assertEqual(output['docktors.spec'], spec_hash(dict(command='sh', image='alpine')))
+        self.assertTrue(float(output['docktors.created']) > 0)
+
+
+class TestSweeper(unittest.TestCase):
+    """Testing class for sweeper module"""
+
+    def test_is_orphan(self):
+        # THEN
+        self.assertFalse(is_orphan(_container(os.getpid())), 'Current process is running')
+        self.assertTrue(is_orphan(_container(DEAD_PID)), 'Owner process is dead')
+        self.assertFalse(is_orphan(_container(DEAD_PID, name='/docktors-adopted-%d-c1' % os.getpid())),
+                         'Container has been adopted by the current process')
+        self.assertFalse(is_orphan(_container(DEAD_PID, host='other', created=100), now=200),
+                         'Process of another host cannot be checked')
+        self.assertTrue(is_orphan(_container(DEAD_PID, host='other', created=100), max_age=60, now=200),
+                        'Container of another host is too old')
+
+    def test_sweep_orphans(self):
+        # GIVEN
+        client = mock.MagicMock()
+        alive, dead = _container(os.getpid()), _container(DEAD_PID)
+        client.containers.list.return_value = [alive, dead]
+
+        # WHEN
+        output = sweep_orphans(client)
+
+        # THEN
+        self.assertEqual(output, [dead])
+        client.containers.list.assert_called_once_with(all=True, filters=dict(label=['docktors.pid']))
+        dead.remove.assert_called_once_with(v=True, force=True)
+        alive.remove.assert_not_called()
+
+    def test_find_adoptable(self):
+        # GIVEN
+        client = mock.MagicMock()
+        healthy, unhealthy = _container(DEAD_PID), _container(DEAD_PID + 1, health=dict(Status='unhealthy'))
+        client.containers.list.return_value = [healthy, unhealthy]
+
+        # WHEN
+        output = find_adoptable(client, 'abc')
+
+        # THEN
+        self.assertEqual(output, [healthy])
+        client.containers.list.assert_called_once_with(
+            all=False, filters=dict(label=['docktors.pid', 'docktors.spec=abc'], status='running')
+        )
+
+    @mock.patch(target='sys.stdout')
+    @mock.patch(target='docktors.sweeper.sweep_orphans')
+    def test_main_dry_run(self, sweep_orphans_mock, stdout_mock):
+        # GIVEN
+        sweep_orphans_mock.return_value = [_container(DEAD_PID)]
+
+        # WHEN
+        output = main(['--dry-run', '--max-age', '3600'])
+
+        # THEN
+        self.assertEqual(output, 0)
+        sweep_orphans_mock.assert_called_once_with(max_age=3600.0, dry_run=True)
+        stdout_mock.write.assert_called_once_with('found c%d alpine\n' % DEAD_PID)
+
+
+if __name__ == '__main__':
+    unittest.main()
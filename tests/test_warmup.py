@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import docker
+import mock
+
+from docktors.client import close_clients
+from docktors.warmup import WarmupError, declare, pinned_image, unpin, warmup
+from docktors.wdocker import DockerContainer
+
+
+class TestWarmup(unittest.TestCase):
+    """Testing class for warmup module"""
+
+    def setUp(self):
+        self.client = mock.MagicMock()
+        self.client.images.get.side_effect = lambda image: mock.MagicMock(id='sha256:%s' % image)
+
+    def tearDown(self):
+        unpin()
+        close_clients()
+
+    def test_warmup_image_present(self):
+        # WHEN
+        output = warmup(['alpine', dict(image='redis'), 'alpine'], client=self.client)
+
+        # THEN
+        self.assertEqual([(r.image, r.image_id, r.pulled) for r in output], [
+            ('alpine', 'sha256:alpine', False), ('redis', 'sha256:redis', False)
+        ])
+        self.client.api.pull.assert_not_called()
+        self.assertEqual(pinned_image('alpine'), 'sha256:alpine')
+        self.assertEqual(pinned_image('nginx'), 'nginx', 'Image not warmed up should not be pinned')
+
+    def test_warmup_pull_missing_image(self):
+        # GIVEN
+        local = mock.MagicMock(id='sha256:abc')
+        self.client.images.get.side_effect = [docker.errors.ImageNotFound('alpine'), local]
+        self.client.api.pull.return_value = iter([
+            dict(status='Pulling fs layer', id='l1', progressDetail={}),
+            dict(status='Downloading', id='l1', progressDetail=dict(current=10, total=30)),
+            dict(status='Downloading', id='l1', progressDetail=dict(current=20, total=30)),
+            dict(status='Download complete', id='l1', progressDetail={}),
+        ])
+        progress = mock.MagicMock()
+
+        # WHEN
+        output = warmup(['alpine'], progress=progress, client=self.client)
+
+        # THEN
+        self.client.api.pull.assert_called_once_with('alpine', stream=True, decode=True)
+        self.assertTrue(output[0].pulled)
+        self.assertEqual(output[0].size, 30)
+        self.assertEqual(progress.call_args_list, [
+            mock.call('alpine', 'Pulling fs layer', 0, 0),
+            mock.call('alpine', 'Downloading', 10, 30),
+            mock.call('alpine', 'Downloading', 20, 30),
+            mock.call('alpine', 'Download complete', 30, 30),
+            mock.call('alpine', 'pinned', 30, 30),
+        ])
+        self.assertEqual(pinned_image('alpine'), 'sha256:abc')
+
+    def test_warmup_pull_error(self):
+        # GIVEN
+        self.client.images.get.side_effect = docker.errors.ImageNotFound('missing')
+        self.client.api.pull.return_value = iter([dict(error='manifest unknown')])
+
+        # WHEN
+        with self.assertRaises(WarmupError) as cm:
+            warmup(['missing'], client=self.client)
+
+        # THEN
+        self.assertEqual(list(cm.exception.errors.keys()), ['missing'])
+        self.assertEqual(pinned_image('missing'), 'missing')
+
+    def test_warmup_declared_images(self):
+        # GIVEN
+        declare('my-declared-image')
+
+        # WHEN
+        output = warmup(client=self.client)
+
+        # THEN
+        self.assertIn('my-declared-image', [r.image for r in output])
+
+    @mock.patch(target='docker.from_env')
+    def test_start_pinned_image(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine')
+        warmup(client=self.client)
+
+        # WHEN
+        docker_container.start()
+
+        # THEN
+        docker_mock.return_value.containers.run.assert_called_once_with(
+            image='sha256:alpine', detach=True, command=None, volumes={}, ports={}, environment={}, labels=mock.ANY
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
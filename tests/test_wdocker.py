@@ -1,17 +1,29 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
 import signal
 import socket
+import tempfile
+import threading
+import time
 import unittest
 
+import docker
 import errno
 import mock
 
+from docktors.archive import ArchiveError
+from docktors.client import close_clients
+from docktors.reaper import flush_reaper
 from docktors.wdocker import DockerContainer, DockerContainerError
 
 
 class TestDockerContainer(unittest.TestCase):
     """Testing class for DockerContainer"""
 
+    def tearDown(self):
+        close_clients()
+
     def test_init(self):
         # GIVEN
         inputs = {
@@ -68,6 +80,36 @@ class TestDockerContainer(unittest.TestCase):
         # THEN
         [self.assertIsNotNone(wrapper.p(key), 'Key %s should be defined' % key) for key in inputs.keys()]
 
+    def test_init_bad_list_types(self):
+        # GIVEN
+        cases = [
+            (dict(wait_for_port='80'), "Option 'wait_for_port' bad type. Expected '[int]'. Got 'str' instead."),
+            (dict(wait_for_http=(80,)),
+             "Option 'wait_for_http' bad type. Expected '[(int, str, int)]'. Got 'tuple' instead."),
+            (dict(wait_for_log=['a', 1]), "Option 'wait_for_log' bad type. Expected '[str]'. Got 'list' instead."),
+        ]
+
+        for inputs, message in cases:
+            # WHEN
+            with self.assertRaises(TypeError) as cm:
+                DockerContainer(image='alpine', **inputs)
+
+            # THEN
+            self.assertEqual(str(cm.exception), '[docker] : ' + message)
+
+    def test_init_invalid_log_regex(self):
+        # WHEN
+        with self.assertRaises(SyntaxError) as cm:
+            DockerContainer(image='alpine', wait_for_log_regex=['ready', 'started (in'])
+
+        # THEN
+        self.assertTrue(
+            str(cm.exception).startswith(
+                "[docker] : Option 'wait_for_log_regex' has an invalid regex 'started (in' : "
+            ),
+            'Error should name the invalid regex'
+        )
+
     @mock.patch(target='docker.from_env')
     def test_start(self, docker_mock):
         # GIVEN
@@ -92,7 +134,7 @@ class TestDockerContainer(unittest.TestCase):
         docker_container.start()
 
         # THEN
-        docker_mock.assert_called_once_with()
+        docker_mock.assert_called_once_with(environment=mock.ANY, max_pool_size=10)
         docker_mock.return_value.containers.run.assert_called_once_with(
             image='alpine',
             command='sh',
@@ -102,6 +144,12 @@ class TestDockerContainer(unittest.TestCase):
             volumes={
                 '/toto-2': {'bind': '/tata-2', 'mode': 'rw'},
                 '/toto-1': {'bind': '/tata-1', 'mode': 'ro'}
+            },
+            labels={
+                'docktors.pid': str(os.getpid()),
+                'docktors.host': socket.gethostname(),
+                'docktors.spec': mock.ANY,
+                'docktors.created': mock.ANY,
             }
         )
         self.assertEqual(docker_container._client, docker_mock.return_value, 'Docker client should be defined')
@@ -140,9 +188,32 @@ class TestDockerContainer(unittest.TestCase):
 
         # WHEN
         docker_container.shutdown()
+        flush_reaper()
 
         # THEN
         docker_container._container.stop.assert_called_once_with(timeout=10)
+        docker_container._container.remove.assert_called_once_with(v=True, force=True)
+
+    def test_shutdown_foreground_without_remove(self):
+        # GIVEN
+        docker_container = DockerContainer(
+            image='alpine',
+            stop_timeout=2,
+            remove=False,
+            background_shutdown=False,
+        )
+        container = mock.MagicMock()
+        container.status = 'running'
+        docker_container._container = container
+
+        # WHEN
+        with mock.patch(target='docktors.wdocker.get_reaper') as get_reaper_mock:
+            docker_container.shutdown()
+
+        # THEN
+        get_reaper_mock.assert_not_called()
+        container.stop.assert_called_once_with(timeout=2)
+        container.remove.assert_not_called()
 
     def test_shutdown_kill_command(self):
         # GIVEN
@@ -157,10 +228,323 @@ class TestDockerContainer(unittest.TestCase):
 
         # WHEN
         docker_container.shutdown()
+        flush_reaper()
 
         # THEN
         docker_container._container.kill.assert_called_once_with(signal=signal.SIGKILL)
 
+    @mock.patch(target='docker.from_env')
+    def test_start_keep_alive_reuse_container(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', keep_alive=True)
+        docker_mock.return_value.containers.run.return_value.status = 'running'
+
+        # WHEN
+        first = docker_container.start()
+        docker_container.shutdown()
+        second = docker_container.start()
+
+        # THEN
+        docker_mock.return_value.containers.run.assert_called_once()
+        self.assertIs(first, second, 'Container should be reused between calls')
+        first.stop.assert_not_called()
+        first.kill.assert_not_called()
+
+    @mock.patch(target='docker.from_env')
+    def test_start_exec_mode(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', exec_mode=True, keep_alive=True)
+        docker_mock.return_value.containers.run.return_value.status = 'running'
+
+        # WHEN
+        docker_container.start()
+        first = docker_container.get_args()[0]
+        docker_container.shutdown()
+        docker_container.start()
+        second = docker_container.get_args()[0]
+
+        # THEN
+        docker_mock.return_value.containers.run.assert_called_once_with(
+            image='alpine', detach=True, command=None, volumes={}, ports={}, environment={}, labels=mock.ANY,
+            init=True, entrypoint=['sleep', '2147483647']
+        )
+        self.assertIs(first.container, docker_mock.return_value.containers.run.return_value)
+        self.assertIs(first.container, second.container, 'Commands should be run in the same container')
+
+    @mock.patch(target='docker.from_env')
+    def test_start_keep_alive_adopt_orphans(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', keep_alive=True, adopt_orphans=True)
+        orphan = mock.MagicMock(status='running', short_id='c5f0cad1', attrs=dict(State=dict()), labels={
+            'docktors.pid': str(2 ** 22 + 1), 'docktors.host': socket.gethostname(),
+        })
+        orphan.name = '/happy_turing'
+        docker_mock.return_value.containers.list.return_value = [orphan]
+
+        # WHEN
+        output = docker_container.start()
+
+        # THEN
+        self.assertIs(output, orphan, 'Orphan container should be reused')
+        docker_mock.return_value.containers.run.assert_not_called()
+        orphan.rename.assert_called_once_with('docktors-adopted-%d-c5f0cad1' % os.getpid())
+
+    @mock.patch(target='docker.from_env')
+    def test_start_keep_alive_container_exited(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', keep_alive=True)
+        exited, running = mock.MagicMock(status='exited'), mock.MagicMock(status='running')
+        docker_mock.return_value.containers.run.side_effect = [exited, running]
+
+        # WHEN
+        docker_container.start()
+        docker_container.shutdown()
+        output = docker_container.start()
+
+        # THEN
+        self.assertEqual(docker_mock.return_value.containers.run.call_count, 2, 'A new container should be started')
+        self.assertIs(output, running, 'The new container should be returned')
+
+    @mock.patch(target='docker.from_env')
+    def test_start_keep_alive_files(self, docker_mock):
+        # GIVEN
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with open(os.path.join(root, 'app.cfg'), 'wb') as output:
+            output.write(b'debug=1\n')
+        docker_container = DockerContainer(image='alpine', keep_alive=True, files=[(root, '/etc/app')])
+        container = docker_mock.return_value.containers.create.return_value
+        container.status = 'running'
+        container.put_archive.side_effect = lambda path, data: bool(b''.join(data))
+
+        # WHEN
+        docker_container.start()
+        docker_container.shutdown()
+        docker_container.start()
+        docker_container.shutdown()
+        with open(os.path.join(root, 'app.cfg'), 'wb') as output:
+            output.write(b'debug=0\n')
+        docker_container.start()
+
+        # THEN
+        docker_mock.return_value.containers.run.assert_not_called()
+        docker_mock.return_value.containers.create.assert_called_once()
+        container.start.assert_called_once_with()
+        self.assertEqual(container.put_archive.call_count, 2, 'Files should only be copied again once changed')
+        container.put_archive.assert_called_with('/', mock.ANY)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_files_copy_failure(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', files=dict(missing='/etc/app'))
+        container = docker_mock.return_value.containers.create.return_value
+
+        # WHEN
+        with self.assertRaises(ArchiveError):
+            docker_container.start()
+
+        # THEN
+        container.start.assert_not_called()
+        container.remove.assert_called_once_with(v=True, force=True)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_keep_alive_reset_container(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(
+            image='mysql', keep_alive=True, reset_paths='/var/lib/data/', reset_command='/reset.sh'
+        )
+        container = docker_mock.return_value.containers.run.return_value
+        container.status = 'running'
+        container.get_archive.return_value = ([b'tar', b'-data'], dict(name='data'))
+        container.exec_run.return_value = (0, b'')
+        container.put_archive.return_value = True
+
+        # WHEN
+        first = docker_container.start()
+        docker_container.shutdown()
+        second = docker_container.start()
+
+        # THEN
+        self.assertIs(first, second, 'Container should be reused between calls')
+        container.get_archive.assert_called_once_with('/var/lib/data')
+        container.put_archive.assert_called_once_with('/var/lib', b'tar-data')
+        self.assertEqual(container.exec_run.call_args_list, [
+            mock.call(['rm', '-rf', '/var/lib/data']), mock.call('/reset.sh')
+        ])
+
+    @mock.patch(target='docker.from_env')
+    def test_shutdown_keep_alive_reset_failure(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='mysql', keep_alive=True, reset_command='/reset.sh')
+        container = docker_mock.return_value.containers.run.return_value
+        container.status = 'running'
+        container.exec_run.return_value = (1, b'reset failed')
+
+        # WHEN
+        docker_container.start()
+        docker_container.shutdown()
+        flush_reaper()
+
+        # THEN
+        container.stop.assert_called_once_with(timeout=10)
+        self.assertEqual(docker_container._idle, [], 'Container should not be kept alive')
+
+    def test_shutdown_at_exit_container_removed(self):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', keep_alive=True)
+        removed = mock.MagicMock(status='running', id='c5f0cad13259')
+        removed.reload.side_effect = docker.errors.NotFound('No such container')
+        container = mock.MagicMock(status='running', id='55ee6c79294f')
+        for idle in (removed, container):
+            docker_container._container = idle
+            docker_container.shutdown()
+            docker_container._state.push()
+
+        # WHEN
+        docker_container._shutdown_at_exit()
+
+        # THEN
+        removed.stop.assert_not_called()
+        container.stop.assert_called_once_with(timeout=10)
+        self.assertEqual(docker_container._idle, [])
+
+    @mock.patch(target='threading.Timer')
+    def test_shutdown_keep_alive_idle_ttl(self, timer_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', keep_alive=True, idle_ttl=30)
+        container = mock.MagicMock(status='running', id='c5f0cad13259')
+        docker_container._container = container
+
+        # WHEN
+        docker_container.shutdown()
+        container.stop.assert_not_called()
+        timer_mock.call_args[0][1](*timer_mock.call_args[1]['args'])
+        flush_reaper()
+
+        # THEN
+        timer_mock.assert_called_once_with(30.0, docker_container._idle_shutdown, args=mock.ANY)
+        timer_mock.return_value.start.assert_called_once_with()
+        container.stop.assert_called_once_with(timeout=10)
+        self.assertEqual(docker_container._idle, [], 'Container should have been released')
+
+    @mock.patch(target='threading.Timer')
+    def test_shutdown_keep_alive_idle_timer_outdated(self, timer_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', keep_alive=True, idle_ttl=30)
+        container = mock.MagicMock(status='running', id='c5f0cad13259')
+        docker_container._container = container
+
+        # WHEN
+        docker_container.shutdown()
+        docker_container.start()
+        timer_mock.call_args[0][1](*timer_mock.call_args[1]['args'])
+
+        # THEN
+        timer_mock.return_value.cancel.assert_called_once_with()
+        container.stop.assert_not_called()
+        self.assertIs(docker_container._container, container, 'Container should still be kept alive')
+
+    @mock.patch(target='docker.from_env')
+    def test_start_concurrent_calls(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine')
+        docker_mock.return_value.containers.run.side_effect = lambda **kwargs: mock.MagicMock(status='running')
+        started, stopped, ready = [], [], threading.Event()
+
+        def _call():
+            started.append(docker_container.start())
+            ready.wait(timeout=5)
+            container = docker_container.get_args()[0]
+            docker_container.shutdown()
+            stopped.append(container)
+
+        # WHEN
+        threads = [threading.Thread(target=_call) for _ in range(2)]
+        [t.start() for t in threads]
+        while len(started) < 2:
+            time.sleep(0.01)
+        ready.set()
+        [t.join(timeout=5) for t in threads]
+        flush_reaper()
+
+        # THEN
+        self.assertIsNot(started[0], started[1], 'Each call should have its own container')
+        self.assertEqual(set(started), set(stopped), 'Each call should shutdown its own container')
+        [c.stop.assert_called_once_with(timeout=10) for c in started]
+
+    @mock.patch(target='docker.from_env')
+    def test_start_nested_calls(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine')
+        outer, inner = mock.MagicMock(status='running'), mock.MagicMock(status='running')
+        docker_mock.return_value.containers.run.side_effect = [outer, inner]
+
+        # WHEN
+        docker_container.start()
+        docker_container.start()
+        docker_container.shutdown()
+        output = docker_container.get_args()
+        flush_reaper()
+
+        # THEN
+        inner.stop.assert_called_once_with(timeout=10)
+        outer.stop.assert_not_called()
+        self.assertEqual(output, [outer], 'Outer call should get back its container')
+
+    @mock.patch(target='docker.from_env')
+    def test_start_container_dies_while_waiting_port(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', wait_for_port=1234)
+        client = docker_mock.return_value
+        client.events.return_value = iter([{'Action': 'die', 'Actor': {'Attributes': {'exitCode': '1'}}}])
+        client.containers.get.return_value.attrs = dict(NetworkSettings=dict(IPAddress='172.10.0.2'))
+        container = client.containers.run.return_value
+        container.id = 'c5f0cad13259'
+        container.logs.return_value = [b'container failed to start']
+
+        # WHEN
+        with mock.patch(target='socket.socket') as socket_mock:
+            socket_mock.return_value.connect_ex.return_value = errno.ECONNREFUSED
+            with self.assertRaises(DockerContainerError) as cm:
+                docker_container.start()
+
+        # THEN
+        self.assertEqual(
+            str(cm.exception),
+            '[alpine] Container c5f0cad13259 exits (die (exit code 1)) before being ready. Container logs :\n'
+            'container failed to start'
+        )
+        client.events.assert_called_once_with(since=mock.ANY, decode=True, filters={'container': 'c5f0cad13259'})
+
+    @mock.patch(target='docker.from_env')
+    def test_start_wait_for_healthy(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', wait_for_healthy=True)
+        client = docker_mock.return_value
+        client.events.return_value = iter([{'Action': 'health_status: healthy'}])
+        container = client.containers.run.return_value
+        container.attrs = dict(State=dict(Health=dict(Status='starting')))
+
+        # WHEN
+        output = docker_container.start()
+
+        # THEN
+        self.assertEqual(output, container)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_wait_for_healthy_without_healthcheck(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', wait_for_healthy=True)
+        docker_mock.return_value.events.return_value = iter([])
+        docker_mock.return_value.containers.run.return_value.attrs = dict(State=dict(Status='running'))
+
+        # WHEN
+        with self.assertRaises(DockerContainerError) as cm:
+            docker_container.start()
+
+        # THEN
+        self.assertEqual(str(cm.exception), '[alpine] Image has no HEALTHCHECK to wait for')
+
     def test__wait_for_log_with_log_specified(self):
         # GIVEN
         docker_container = DockerContainer(
@@ -180,6 +564,91 @@ class TestDockerContainer(unittest.TestCase):
         # THEN
         docker_container._container.logs.assert_called_once_with(stream=True)
 
+    def test__wait_for_log_with_regex(self):
+        # GIVEN
+        docker_container = DockerContainer(
+            image='alpine',
+            wait_for_log='wait for log',
+            wait_for_log_regex=r'started in \d+ms',
+        )
+
+        docker_container._state.push(dict(since=1500000000))
+        docker_container._container = mock.MagicMock()
+        docker_container._container.logs.return_value = [
+            b'wait for',
+            b' log\nstarted in 1',
+            b'2ms\n',
+            b'never read',
+        ]
+
+        # WHEN
+        docker_container._wait_for_log()
+
+        # THEN
+        docker_container._container.logs.assert_called_once_with(stream=True)
+
+    def test__wait_for_log_stream_end(self):
+        # GIVEN
+        docker_container = DockerContainer(
+            image='alpine',
+            wait_for_log=['wait for log', 'other log'],
+        )
+
+        docker_container._container = mock.MagicMock(id='c5f0cad13259')
+        docker_container._container.logs.return_value = [b'wait for log\n']
+        docker_container._check_not_failed = mock.MagicMock()
+
+        # WHEN
+        with self.assertRaises(DockerContainerError) as cm:
+            docker_container._wait_for_log()
+
+        # THEN
+        self.assertEqual(str(cm.exception), "[alpine] Logs of container c5f0cad13259 end before 'other log' appears")
+
+    @mock.patch(target='docker.from_env')
+    def test_start_get_logs_from_capture(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='alpine', wait_for_log='ready', log_buffer_size=16)
+        container = docker_mock.return_value.containers.run.return_value
+        container.logs.return_value = [b'booting ...\n', b'server is ready\n']
+
+        # WHEN
+        docker_container.start()
+        docker_container._state.get('logs').join(1)
+        output = docker_container.get_logs()
+        docker_container.shutdown()
+
+        # THEN
+        self.assertEqual(output, 'server is ready\n')
+        container.logs.assert_called_once_with(stream=True, follow=True)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_snapshot(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='mysql', snapshot=True)
+        client = docker_mock.return_value
+        client.images.get.side_effect = [
+            mock.MagicMock(id='sha256:base'), docker.errors.ImageNotFound('Not found'),
+            mock.MagicMock(id='sha256:base'), mock.MagicMock(),
+        ]
+        client.images.list.return_value = []
+        container = client.containers.run.return_value
+        container.attrs = dict(Image='sha256:base')
+
+        # WHEN
+        docker_container.start()
+        docker_container.shutdown()
+        docker_container.start()
+        docker_container.shutdown()
+
+        # THEN
+        self.assertEqual(client.containers.run.call_args_list[0][1]['image'], 'mysql')
+        self.assertTrue(client.containers.run.call_args_list[1][1]['image'].startswith('docktors-snapshot:'))
+        container.commit.assert_called_once_with(
+            repository='docktors-snapshot', tag=client.containers.run.call_args_list[1][1]['image'].split(':')[1],
+            changes=mock.ANY
+        )
+
     def test__wait_for_log_without_log_specified(self):
         # GIVEN
         docker_container = DockerContainer(
@@ -195,8 +664,7 @@ class TestDockerContainer(unittest.TestCase):
         docker_container._container.logs.assert_not_called()
 
     @mock.patch(target='socket.socket')
-    @mock.patch(target='time.sleep')
-    def test__wait_for_port_with_port_specified(self, time_sleep_mock, socket_mock):
+    def test__wait_for_port_with_port_specified(self, socket_mock):
         # GIVEN
         docker_container = DockerContainer(
             image='alpine',
@@ -210,13 +678,15 @@ class TestDockerContainer(unittest.TestCase):
         docker_container._container = mock.MagicMock(id='c5f0cad13259')
 
         socket_mock.return_value.connect_ex.side_effect = [1, 1, 0]
+        socket_mock.return_value.getsockopt.return_value = 0
 
         # WHEN
         docker_container._wait_for_port()
 
         # THEN
-        time_sleep_mock.assert_called()
         socket_mock.assert_called_with(socket.AF_INET, socket.SOCK_STREAM)
+        self.assertEqual(socket_mock.call_count, 3, 'A new socket should be used for each attempt')
+        socket_mock.return_value.setblocking.assert_called_with(False)
         connect_ex_mock = socket_mock.return_value.connect_ex
         connect_ex_mock.assert_called_with(('172.10.0.2', 1234))
         self.assertEqual(connect_ex_mock.call_count, 3, 'Should have been called 3 times instead of {call_nb}'.format(
@@ -224,8 +694,115 @@ class TestDockerContainer(unittest.TestCase):
         ))
 
     @mock.patch(target='socket.socket')
-    @mock.patch(target='time.sleep')
-    def test__wait_for_port_with_unsupported_errors(self, time_sleep_mock, socket_mock):
+    def test__wait_for_port_published_port(self, socket_mock):
+        # GIVEN
+        docker_container = DockerContainer(
+            image='mysql',
+            publish_ports=3306,
+            wait_for_port=3306,
+        )
+
+        docker_container._client = mock.MagicMock()
+        docker_container._client.api.base_url = 'http+docker://localhost'
+        docker_container._client.containers.get.return_value.attrs = dict(NetworkSettings=dict(
+            IPAddress='172.10.0.2',
+            Ports={'3306/tcp': [dict(HostIp='0.0.0.0', HostPort='49153')], '33060/tcp': None}
+        ))
+        docker_container._container = mock.MagicMock(id='c5f0cad13259')
+
+        socket_mock.return_value.connect_ex.return_value = 0
+        socket_mock.return_value.getsockopt.return_value = 0
+
+        # WHEN
+        docker_container._wait_for_port()
+
+        # THEN
+        socket_mock.return_value.connect_ex.assert_called_once_with(('127.0.0.1', 49153))
+
+    @mock.patch(target='sys.platform', new='linux')
+    @mock.patch(target='socket.socket')
+    def test__wait_for_port_fixed_port(self, socket_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='mysql', ports={3306: 3306}, wait_for_port=3306)
+
+        docker_container._client = mock.MagicMock()
+        docker_container._client.api.base_url = 'http+docker://localhost'
+        docker_container._client.containers.get.return_value.attrs = dict(NetworkSettings=dict(
+            IPAddress='172.10.0.2',
+            Ports={'3306/tcp': [dict(HostIp='0.0.0.0', HostPort='3306')]}
+        ))
+        docker_container._container = mock.MagicMock(id='c5f0cad13259')
+
+        socket_mock.return_value.connect_ex.return_value = 0
+        socket_mock.return_value.getsockopt.return_value = 0
+
+        # WHEN
+        docker_container._wait_for_port()
+
+        # THEN
+        socket_mock.return_value.connect_ex.assert_called_once_with(('172.10.0.2', 3306))
+
+    @mock.patch(target='socket.socket')
+    def test__wait_for_port_fixed_port_remote_daemon(self, socket_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='mysql', ports={3306: 13306}, wait_for_port=3306)
+
+        docker_container._client = mock.MagicMock()
+        docker_container._client.api.base_url = 'https://docker.example.com:2376'
+        docker_container._client.containers.get.return_value.attrs = dict(NetworkSettings=dict(
+            IPAddress='172.10.0.2',
+            Ports={'3306/tcp': [dict(HostIp='0.0.0.0', HostPort='13306')]}
+        ))
+        docker_container._container = mock.MagicMock(id='c5f0cad13259')
+
+        socket_mock.return_value.connect_ex.return_value = 0
+        socket_mock.return_value.getsockopt.return_value = 0
+
+        # WHEN
+        docker_container._wait_for_port()
+
+        # THEN
+        socket_mock.return_value.connect_ex.assert_called_once_with(('docker.example.com', 13306))
+
+    @mock.patch(target='docker.from_env')
+    def test_start_publish_ports_from_range(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='mysql', ports={8080: 80}, publish_ports=[3306, 33060],
+                                           host_port_range=(41000, 41999))
+        client = docker_mock.return_value
+        container = client.containers.run.return_value
+        container.id = 'c5f0cad13259'
+        container.status = 'running'
+        client.containers.run.side_effect = [docker.errors.APIError('port is already allocated'), container]
+
+        # WHEN
+        output = docker_container.start()
+        bindings = client.containers.run.call_args[1]['ports']
+        container.attrs = dict(NetworkSettings=dict(Ports={
+            '3306/tcp': [dict(HostPort=str(bindings[3306]))], '33060/tcp': [dict(HostPort=str(bindings[33060]))]
+        }))
+        docker_container._container_ready()
+
+        # THEN
+        self.assertEqual(client.containers.run.call_count, 2, 'Start should be retried on other host ports')
+        self.assertEqual(bindings[8080], 80)
+        self.assertTrue(all(41000 <= bindings[p] <= 41999 for p in [3306, 33060]))
+        self.assertEqual(output.host_ports, {3306: bindings[3306], 33060: bindings[33060]})
+        self.assertEqual(docker_container.get_host_ports(), output.host_ports)
+
+    @mock.patch(target='docker.from_env')
+    def test_start_publish_ports_ephemeral(self, docker_mock):
+        # GIVEN
+        docker_container = DockerContainer(image='mysql', publish_ports=3306)
+
+        # WHEN
+        docker_container.start()
+
+        # THEN
+        self.assertEqual(docker_mock.return_value.containers.run.call_args[1]['ports'], {3306: None})
+
+    @mock.patch(target='socket.socket')
+    def test__wait_for_port_with_unsupported_errors(self, socket_mock):
         # GIVEN
         docker_container = DockerContainer(
             image='alpine',
@@ -255,7 +832,6 @@ class TestDockerContainer(unittest.TestCase):
             'container failed to start'
         ])
         self.assertEquals(str(cm.exception), expected_message, 'Message should be explicit: %s' % expected_message)
-        time_sleep_mock.assert_called()
         socket_mock.assert_called_with(socket.AF_INET, socket.SOCK_STREAM)
         connect_ex_mock = socket_mock.return_value.connect_ex
         connect_ex_mock.assert_called_with(('172.10.0.2', 1234))
@@ -264,6 +840,57 @@ class TestDockerContainer(unittest.TestCase):
             call_nb=connect_ex_mock.call_count
         ))
 
+    def test__wait_for_port_multiple_ports(self):
+        # GIVEN
+        servers = [socket.socket(socket.AF_INET, socket.SOCK_STREAM) for _ in range(2)]
+        [server.bind(('127.0.0.1', 0)) for server in servers]
+        ports = [server.getsockname()[1] for server in servers]
+        servers[0].listen(1)
+        docker_container = DockerContainer(image='alpine', wait_for_port=ports, wait_timeout=5)
+        docker_container._client = mock.MagicMock()
+        docker_container._client.containers.get.return_value.attrs = dict(
+            NetworkSettings=dict(IPAddress='127.0.0.1')
+        )
+        docker_container._container = mock.MagicMock(id='c5f0cad13259')
+        timer = threading.Timer(0.2, servers[1].listen, args=(1,))
+
+        # WHEN
+        timer.start()
+        try:
+            docker_container._wait_for_port()
+        finally:
+            timer.join()
+            [server.close() for server in servers]
+
+        # THEN
+        docker_container._container.logs.assert_not_called()
+
+    def test__wait_for_port_timeout(self):
+        # GIVEN
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        docker_container = DockerContainer(image='alpine', wait_for_port=port, wait_timeout=0.3)
+        docker_container._client = mock.MagicMock()
+        docker_container._client.containers.get.return_value.attrs = dict(
+            NetworkSettings=dict(IPAddress='127.0.0.1')
+        )
+        docker_container._container = mock.MagicMock(id='c5f0cad13259')
+        docker_container._container.logs.return_value = b'still starting'
+
+        # WHEN
+        try:
+            with self.assertRaises(DockerContainerError) as cm:
+                docker_container._wait_for_port()
+        finally:
+            server.close()
+
+        # THEN
+        self.assertEqual(
+            str(cm.exception),
+            '[alpine] Timeout after 0.3s waiting for tcp:%d. Container logs :\nstill starting' % port
+        )
+
 
 if __name__ == '__main__':
     unittest.main()